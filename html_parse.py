@@ -0,0 +1,411 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+import sqlite3
+import statistics
+import time
+from html import unescape
+from html.entities import html5 as HTML5_ENTITIES
+from bs4 import BeautifulSoup
+
+# Shared HTML parsing for the scrapers.
+#
+# Every module builds its soup through parse_html(), so the BeautifulSoup tree
+# builder is chosen in one place. The default stays html.parser, the backend
+# every scraper was written against. lxml (C, libxml2) is several times faster
+# but recovers malformed markup differently, so it is opt-in: running this file
+# times the backends (and selectolax, which has its own API) on recorded pages
+# and checks that they find the same content as html.parser; switch with
+# HTML_PARSER=lxml once it reports identical content on your corpus.
+#
+# Scrapers that only read one <pre> block use pre_text(), which cuts the block
+# out of the raw HTML and unescapes it without building a tree at all, and
+# parses the page only when the slice could come out differently (nested or
+# unusual markup, comments around it, bare '&', carriage returns, ...).
+#
+# Environment variables:
+#   HTML_PARSER       lxml, html.parser or html5lib (default: html.parser)
+#   PRE_SLICE_CHECK   set to 1 to also parse every page pre_text() slices and
+#                     report the speedup and whether the text matched
+
+BACKENDS = ('lxml', 'html.parser', 'html5lib')
+
+def _installed(backend):
+    module = {'lxml': 'lxml', 'html5lib': 'html5lib'}.get(backend)
+    if module is None:
+        return True
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+def default_backend():
+    """The configured backend: HTML_PARSER if set and installed, else html.parser."""
+    backend = os.environ.get('HTML_PARSER')
+    if backend:
+        if backend not in BACKENDS:
+            raise ValueError(f"HTML_PARSER must be one of {', '.join(BACKENDS)}, not {backend!r}")
+        if _installed(backend):
+            return backend
+        print(f"Warning: HTML_PARSER={backend} is not installed, using html.parser")
+        return 'html.parser'
+    return 'html.parser'
+
+_backend = None
+
+def parse_html(markup, backend=None):
+    """
+    Parses HTML with the selected BeautifulSoup backend.
+
+    Args:
+        markup (str or bytes): The page. Bytes are decoded by the parser
+                               (UTF-8 unless the page declares otherwise).
+        backend (str): 'lxml', 'html.parser' or 'html5lib'; defaults to
+                       default_backend().
+
+    Returns:
+        BeautifulSoup: The parsed document.
+    """
+    global _backend
+    if backend is None:
+        if _backend is None:
+            _backend = default_backend()
+        backend = _backend
+    return BeautifulSoup(markup, backend)
+
+def use_backend(backend):
+    """Makes parse_html() use this backend from now on in this process."""
+    global _backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown parser backend {backend!r}")
+    _backend = backend
+
+PRE_START = re.compile(rb'<pre\b(?:[^<>"\']|"[^"]*"|\'[^\']*\')*>', re.I)
+CONTENT_ID = re.compile(rb'\sid\s*=\s*(["\']?)content\1(?=[\s/>])', re.I)
+PRE_END = re.compile(rb'</pre\s*>', re.I)
+RAW_TEXT_OPEN = re.compile(rb'<(script|style|textarea|title)\b|<!--', re.I)
+DECLARED_CHARSET = re.compile(rb'<meta\b[^>]*charset\s*=\s*["\']?([-\w]+)', re.I)
+MARKUP_TOKEN = re.compile(r'<!--.*?-->|<(/?)([A-Za-z][A-Za-z0-9]*)\b(?:[^<>"\']|"[^"]*"|\'[^\']*\')*>', re.S)
+CHARACTER_REFERENCE = re.compile(r'&(?:#[0-9]+;|#[xX][0-9a-fA-F]+;|([A-Za-z][A-Za-z0-9]*;))?')
+HEADING_NAME = re.compile(r'\bitemprop\s*=\s*["\']?name\b', re.I)
+# Markup the parsers agree on inside a <pre>; anything else goes through the DOM
+PRE_INLINE_TAGS = {'a', 'abbr', 'b', 'big', 'br', 'em', 'font', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr',
+                   'i', 'img', 'small', 'span', 'strong', 'sub', 'sup', 'u'}
+
+def _inside_raw_text(lowered, position):
+    """True if position falls inside a comment or a script/style/textarea/title element."""
+    for opened in RAW_TEXT_OPEN.finditer(lowered, 0, position):
+        closer = b'-->' if opened.group(0) == b'<!--' else b'</' + opened.group(1)
+        if lowered.find(closer, opened.end(), position) == -1:
+            return True
+    return False
+
+def _slice_pre(markup, pre_id=None, separator='', strip=False, drop_heading=False):
+    """
+    Cuts the <pre> block out of the raw page and returns (text, None), or
+    (None, reason) when the slice could differ from what a parser would build.
+    """
+    if isinstance(markup, str):
+        data = markup.encode('utf-8')
+    else:
+        data = markup
+        charset = DECLARED_CHARSET.search(data, 0, 4096)
+        if charset is None or charset.group(1).lower().replace(b'_', b'-') not in (b'utf-8', b'utf8'):
+            return None, "no UTF-8 charset declared"
+
+    if pre_id not in (None, 'content'):
+        return None, f"pre id {pre_id!r} not supported"
+    # A <pre> inside a comment or a script isn't an element
+    lowered = data.lower()
+    starts = [match for match in PRE_START.finditer(data)
+              if (pre_id is None or CONTENT_ID.search(match.group(0))) and not _inside_raw_text(lowered, match.start())]
+    if not starts:
+        return None, "no <pre> found"
+    if pre_id == 'content' and len(starts) > 1:
+        return None, "several <pre id=content>"
+    start = starts[0]
+    end = PRE_END.search(data, start.end())
+    if end is None:
+        return None, "unclosed <pre>"
+    try:
+        inner = data[start.end():end.start()].decode('utf-8')
+    except UnicodeDecodeError:
+        return None, "invalid UTF-8"
+    if '\r' in inner:
+        return None, "carriage returns"
+
+    segments = []
+    position = 0
+    dropping = None
+    dropped = False
+    for token in MARKUP_TOKEN.finditer(inner):
+        if dropping is None:
+            segments.append(inner[position:token.start()])
+        position = token.end()
+        closing, tag = token.group(1), (token.group(2) or '').lower()
+        if tag and tag not in PRE_INLINE_TAGS:
+            return None, f"<{tag}> inside <pre>"
+        if dropping is not None:
+            if tag == dropping and closing:
+                dropping = None
+            elif tag == dropping:
+                return None, f"nested <{tag}>"
+        elif drop_heading and not dropped and tag == 'h2' and not closing and HEADING_NAME.search(token.group(0)):
+            dropping, dropped = 'h2', True
+    if dropping is not None:
+        return None, "unclosed heading"
+    segments.append(inner[position:])
+    if '<' in ''.join(segments):
+        return None, "stray '<'"
+
+    if not strip and default_backend() == 'html5lib' and segments[0].startswith('\n'):
+        # html5lib drops the newline right after <pre>, like browsers
+        segments[0] = segments[0][1:]
+    texts = []
+    for segment in segments:
+        for reference in CHARACTER_REFERENCE.finditer(segment):
+            if reference.group(0) == '&' or (reference.group(1) and reference.group(1) not in HTML5_ENTITIES):
+                return None, "bare '&' or unknown entity"
+        text = unescape(segment)
+        if strip:
+            text = text.strip()
+        if text:
+            texts.append(text)
+    return separator.join(texts), None
+
+def slice_pre_text(markup, pre_id=None, separator='', strip=False, drop_heading=False):
+    """
+    Returns the text of the page's first <pre> (or its <pre id="content">), cut
+    straight out of the raw HTML without building a tree, or None when the
+    slice is ambiguous (see pre_text).
+    """
+    return _slice_pre(markup, pre_id, separator, strip, drop_heading)[0]
+
+def pre_text(markup, pre_id=None, separator='', strip=False, drop_heading=False):
+    """
+    Returns the text of a page's <pre> block as pre.get_text(separator, strip)
+    would, slicing it out of the raw HTML when that is unambiguous and parsing
+    the page otherwise. Prints how the document was read; with PRE_SLICE_CHECK=1
+    it also parses the page, reports the speedup and uses the DOM text if the
+    two differ.
+
+    Args:
+        markup (str or bytes): The page.
+        pre_id (str): Only 'content' (the site's <pre id="content">) or None for
+                      the first <pre> on the page.
+        separator (str): Joins the text of the pieces between tags.
+        strip (bool): Strip each piece and drop empty ones.
+        drop_heading (bool): Leave out the <h2 itemprop="name"> title the site
+                             puts inside <pre id="content">.
+
+    Returns:
+        str: The text, or None if the page has no such <pre>.
+    """
+    start = time.perf_counter()
+    text, reason = _slice_pre(markup, pre_id, separator, strip, drop_heading)
+    slice_ms = (time.perf_counter() - start) * 1000
+    if text is not None and os.environ.get('PRE_SLICE_CHECK', '') in ('', '0'):
+        print(f"Read <pre> from the raw HTML in {slice_ms:.2f} ms")
+        return text
+
+    start = time.perf_counter()
+    dom_text = _dom_pre_text(markup, pre_id, separator, strip, drop_heading)
+    dom_ms = (time.perf_counter() - start) * 1000
+    if text is None:
+        print(f"Read <pre> through the DOM in {dom_ms:.2f} ms ({reason})")
+        return dom_text
+    parity = "same text" if text == dom_text else "TEXT DIFFERS, using the DOM text"
+    print(f"Read <pre> from the raw HTML in {slice_ms:.2f} ms vs {dom_ms:.2f} ms through the DOM "
+          f"({dom_ms / max(slice_ms, 1e-6):.0f}x faster, {parity})")
+    return text if text == dom_text else dom_text
+
+def _dom_pre_text(markup, pre_id=None, separator='', strip=False, drop_heading=False):
+    soup = parse_html(markup)
+    pre = soup.find('pre', id=pre_id) if pre_id else soup.find('pre')
+    if pre is None:
+        return None
+    if drop_heading:
+        heading = pre.find('h2', attrs={'itemprop': 'name'})
+        if heading:
+            heading.decompose()
+    return pre.get_text(separator=separator, strip=strip)
+
+def load_recorded_pages(cache_dir=None, fixture_dir=None, files=(), limit=None):
+    """
+    Collects recorded HTML pages for the benchmark: the bodies in the HTTP
+    response cache and/or a replay fixture directory, plus any HTML files.
+
+    Returns:
+        list: (name, html) pairs.
+    """
+    pages = []
+    if cache_dir and os.path.exists(os.path.join(cache_dir, 'index.sqlite')):
+        db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'))
+        for url, digest, headers in db.execute('SELECT url, digest, headers FROM responses ORDER BY url'):
+            if 'html' not in json.loads(headers).get('Content-Type', 'text/html'):
+                continue
+            try:
+                with gzip.open(os.path.join(cache_dir, 'objects', digest[:2], f'{digest}.gz'), 'rb') as f:
+                    pages.append((url, f.read().decode('utf-8', errors='replace')))
+            except OSError:
+                continue
+        db.close()
+    if fixture_dir and os.path.exists(os.path.join(fixture_dir, 'index.json')):
+        with open(os.path.join(fixture_dir, 'index.json'), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        for path, entry in sorted(index.items()):
+            if 'html' in entry['headers'].get('Content-Type', 'text/html'):
+                with open(os.path.join(fixture_dir, 'bodies', entry['body']), 'rb') as f:
+                    pages.append((path, f.read().decode('utf-8', errors='replace')))
+    for pattern in files:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                pages.append((path, f.read()))
+    return pages[:limit] if limit else pages
+
+def content_signature(soup):
+    """
+    What the extractors read from a page: the heading (h2 > h1 > title), the
+    text of the first div containing a danda and the text of pre#content.
+    """
+    heading_tag = soup.find('h2') or soup.find('h1') or soup.title
+    heading = heading_tag.get_text(strip=True) if heading_tag else None
+    content = next((div for div in soup.find_all('div') if '॥' in div.get_text()), None)
+    pre = soup.find('pre', id='content')
+    return (heading, content.get_text(separator='\n', strip=True) if content else None,
+            pre.get_text() if pre else None)
+
+def selectolax_signature(html):
+    """content_signature() computed with selectolax (its own API, not a BeautifulSoup tree)."""
+    try:
+        from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    except ImportError:
+        # selectolax < 0.3.13 only has the Modest engine
+        from selectolax.parser import HTMLParser
+
+    tree = HTMLParser(html)
+    heading_node = tree.css_first('h2') or tree.css_first('h1') or tree.css_first('title')
+    heading = heading_node.text(strip=True) if heading_node else None
+    content = next((div for div in tree.css('div') if '॥' in div.text()), None)
+    pre = tree.css_first('pre#content')
+    return (heading, content.text(separator='\n', strip=True) if content else None,
+            pre.text() if pre else None)
+
+def benchmark(pages, repeat=3):
+    """
+    Times parsing + content lookup per document for every installed backend
+    and compares what each finds with html.parser (the historical backend).
+
+    Returns:
+        str: The fastest backend whose content matched html.parser on every page,
+             or None when there were no pages or no backend matched.
+    """
+    if not pages:
+        print("No pages to benchmark.")
+        return None
+    total_bytes = sum(len(html.encode('utf-8')) for _, html in pages)
+    print(f"Benchmark corpus: {len(pages)} pages, {total_bytes / 1e6:.2f} MB")
+
+    runners = {backend: (lambda html, backend=backend: content_signature(BeautifulSoup(html, backend)))
+               for backend in BACKENDS if _installed(backend)}
+    try:
+        import selectolax  # noqa: F401
+        runners['selectolax'] = selectolax_signature
+    except ImportError:
+        pass
+
+    reference = [content_signature(BeautifulSoup(html, 'html.parser')) for _, html in pages]
+    results = {}
+    for name, run in runners.items():
+        per_page = []
+        mismatches = []
+        for (page_name, html), expected in zip(pages, reference):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                signature = run(html)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            per_page.append(best)
+            if signature != expected:
+                mismatches.append(page_name)
+        results[name] = (per_page, mismatches)
+
+    baseline = statistics.mean(results['html.parser'][0])
+    print(f"\n{'backend':<12} {'mean ms/doc':>12} {'median':>9} {'max':>9} {'speedup':>8}  content vs html.parser")
+    for name, (per_page, mismatches) in results.items():
+        mean = statistics.mean(per_page)
+        parity = "identical" if not mismatches else f"{len(mismatches)} pages differ"
+        print(f"{name:<12} {mean * 1000:12.2f} {statistics.median(per_page) * 1000:9.2f} "
+              f"{max(per_page) * 1000:9.2f} {baseline / mean:7.1f}x  {parity}")
+        for page_name in mismatches[:5]:
+            print(f"    differs on {page_name}")
+
+    candidates = [name for name in BACKENDS if name in results and not results[name][1]]
+    if not candidates:
+        print("\nNo backend matched html.parser's content on every page; keep the current one "
+              f"({default_backend()}).")
+        return None
+    fastest = min(candidates, key=lambda name: statistics.mean(results[name][0]))
+    print(f"\nFastest BeautifulSoup backend with identical content: {fastest} (current: {default_backend()})")
+    if fastest != default_backend():
+        print(f"Set HTML_PARSER={fastest} to use it.")
+    return fastest
+
+def benchmark_pre(pages, repeat=3):
+    """
+    Times pre_text()'s raw-HTML slice against the DOM for each page's
+    <pre id="content"> (or first <pre>) and prints the speedup per document.
+    """
+    print(f"\n{'document':<60} {'slice ms':>9} {'DOM ms':>9} {'speedup':>8}  result")
+    speedups = []
+    for name, html in pages:
+        pre_id = 'content' if _slice_pre(html, 'content')[1] != "no <pre> found" else None
+        timings = {}
+        for label, read in (('slice', _slice_pre), ('dom', _dom_pre_text)):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = read(html, pre_id, drop_heading=pre_id == 'content')
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings[label] = (best, result)
+        (slice_time, (text, reason)), (dom_time, dom_text) = timings['slice'], timings['dom']
+        if dom_text is None:
+            continue
+        if text is None:
+            result = f"DOM fallback ({reason})"
+        else:
+            speedups.append(dom_time / slice_time)
+            result = "same text" if text == dom_text else "TEXT DIFFERS"
+        speedup = f"{dom_time / slice_time:7.1f}x" if text is not None else f"{'-':>8}"
+        print(f"{name[-60:]:<60} {slice_time * 1000:9.2f} {dom_time * 1000:9.2f} {speedup}  {result}")
+    if speedups:
+        print(f"\nSliced {len(speedups)} documents, median speedup {statistics.median(speedups):.1f}x")
+
+if __name__ == "__main__":
+    repo_root = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Benchmark the HTML parser backends on recorded pages.")
+    parser.add_argument("files", nargs="*", help="HTML files (glob patterns) to add to the corpus")
+    parser.add_argument("--cache-dir", default=os.environ.get('HTTP_CACHE_DIR', os.path.join(repo_root, '.http_cache')),
+                        help="Response cache to read recorded pages from (default: the shared cache)")
+    parser.add_argument("--fixtures", default=os.path.join(repo_root, 'replay_fixtures'),
+                        help="Replay fixture directory to read recorded pages from")
+    parser.add_argument("--limit", type=int, default=None, help="Use at most this many pages")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per page, best one counts (default: 3)")
+    parser.add_argument("--pre", action="store_true",
+                        help="Time pre_text()'s raw-HTML slicing against the DOM per document instead")
+    args = parser.parse_args()
+
+    corpus = load_recorded_pages(args.cache_dir, args.fixtures, args.files, args.limit)
+    if not corpus:
+        raise SystemExit("No recorded pages found: run a scraper first (it fills the response cache), "
+                         "record fixtures with replay_server.py --record, or pass HTML files.")
+    if args.pre:
+        benchmark_pre(corpus, args.repeat)
+    else:
+        benchmark(corpus, args.repeat)
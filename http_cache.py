@@ -0,0 +1,280 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import requests
+from requests.structures import CaseInsensitiveDict
+from rate_limiter import get_limiter
+from replay_server import rewrite_url
+
+# Shared on-disk response cache for the scrapers.
+#
+# Bodies are stored gzip-compressed under objects/<aa>/<sha256>.gz, so identical
+# pages fetched from different URLs are stored once. A small SQLite index maps
+# each URL to its body digest plus the status, headers and fetch time.
+#
+# Environment variables:
+#   HTTP_CACHE_DIR       cache location (default: .http_cache at the repo root)
+#   HTTP_CACHE_TTL       seconds before an entry is refetched (default: never;
+#                        document pages don't change once published)
+#   HTTP_CACHE_LISTING_TTL  the same for listing and index pages, which gain
+#                        links as documents are added (default: 86400, a day)
+#   HTTP_CACHE_MAX_MB    size budget for stored bodies (default: 500)
+#   HTTP_CACHE_OFFLINE   set to 1 to serve only from the cache, never the network
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.http_cache')
+DEFAULT_LISTING_TTL = 24 * 60 * 60
+
+class CacheMiss(requests.RequestException):
+    """Raised in offline mode when a URL is not in the cache."""
+
+class CachedResponse:
+    """
+    A minimal stand-in for requests.Response backed by a cache entry.
+
+    Supports the attributes the scrapers use: status_code, headers, content,
+    text, encoding (settable, as with requests), url and raise_for_status().
+    """
+
+    def __init__(self, url, status_code, headers, content, encoding, from_cache):
+        self.url = url
+        self.status_code = status_code
+        # Case-insensitive lookups, as with requests ('content-type')
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.encoding = encoding
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+class ResponseCache:
+    """
+    Content-addressed, compressed response cache keyed by URL.
+
+    Args:
+        cache_dir (str): Directory holding the index and the compressed bodies.
+        ttl (float): Seconds an entry stays fresh; None means entries never expire.
+        max_bytes (int): Budget for compressed bodies; least recently used
+                         entries are evicted once it is exceeded.
+        offline (bool): Never touch the network; misses raise CacheMiss.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=None, max_bytes=500 * 1024 * 1024, offline=False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._stored_bytes = None   # running total of body sizes, computed on first put
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' url TEXT PRIMARY KEY, digest TEXT NOT NULL, status INTEGER NOT NULL,'
+            ' headers TEXT NOT NULL, encoding TEXT, fetched_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL, size INTEGER NOT NULL)'
+        )
+        self._db.commit()
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, 'objects', digest[:2], f'{digest}.gz')
+
+    def _is_fresh(self, fetched_at, ttl):
+        return ttl is None or time.time() - fetched_at < ttl
+
+    def _total_bytes(self):
+        """Size of the stored bodies; bodies shared by several URLs count once."""
+        row = self._db.execute(
+            'SELECT SUM(size) FROM (SELECT MAX(size) AS size FROM responses GROUP BY digest)').fetchone()
+        return row[0] or 0
+
+    def get(self, url, ttl=False):
+        """
+        Returns the cached response for a URL, or None if it is missing or stale.
+        Stale entries are still served in offline mode.
+
+        Args:
+            ttl (float): Freshness for this lookup instead of the cache's TTL
+                         (None: never stale).
+        """
+        ttl = self.ttl if ttl is False else ttl
+        with self._lock:
+            row = self._db.execute(
+                'SELECT digest, status, headers, encoding, fetched_at FROM responses WHERE url = ?', (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            digest, status, headers, encoding, fetched_at = row
+            if not self.offline and not self._is_fresh(fetched_at, ttl):
+                return None
+            try:
+                with gzip.open(self._object_path(digest), 'rb') as f:
+                    content = f.read()
+            except FileNotFoundError:
+                self._db.execute('DELETE FROM responses WHERE url = ?', (url,))
+                self._db.commit()
+                return None
+            self._db.execute('UPDATE responses SET accessed_at = ? WHERE url = ?', (time.time(), url))
+            self._db.commit()
+        return CachedResponse(url, status, json.loads(headers), content, encoding, from_cache=True)
+
+    def body_size(self, url):
+        """
+        Returns the uncompressed size of the cached body for a URL (fresh or
+        not), or None if it isn't cached. Reads only the gzip trailer.
+        """
+        url = rewrite_url(url)
+        with self._lock:
+            row = self._db.execute('SELECT digest FROM responses WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(self._object_path(row[0]), 'rb') as f:
+                f.seek(-4, os.SEEK_END)
+                # ISIZE: uncompressed length modulo 2**32, far above any page
+                return int.from_bytes(f.read(4), 'little')
+        except OSError:
+            return None
+
+    def put(self, url, status_code, headers, content, encoding=None):
+        """
+        Stores a response body and its metadata. The size budget is enforced
+        (evict()) only once the running total of stored bytes crosses it.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._object_path(digest)
+        with self._lock:
+            if self._stored_bytes is None:
+                self._stored_bytes = self._total_bytes()
+            known = self._db.execute('SELECT 1 FROM responses WHERE digest = ? LIMIT 1', (digest,)).fetchone()
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Worker processes share the cache, and thread idents repeat across processes
+                tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with gzip.open(tmp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            now = time.time()
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, digest, status_code, json.dumps(dict(headers)), encoding, now, now, os.path.getsize(path)),
+            )
+            self._db.commit()
+            if known is None:
+                self._stored_bytes += os.path.getsize(path)
+            over_budget = self._stored_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """Drops expired entries, then least recently used ones until under max_bytes."""
+        with self._lock:
+            removed = set()
+            if self.ttl is not None and not self.offline:
+                cutoff = time.time() - self.ttl
+                removed.update(digest for (digest,) in self._db.execute(
+                    'SELECT DISTINCT digest FROM responses WHERE fetched_at < ?', (cutoff,)))
+                self._db.execute('DELETE FROM responses WHERE fetched_at < ?', (cutoff,))
+            # Bodies shared by several URLs count once towards the budget
+            rows = self._db.execute(
+                'SELECT digest, MAX(accessed_at), MAX(size) FROM responses GROUP BY digest ORDER BY MAX(accessed_at)'
+            ).fetchall()
+            total = sum(size for _, _, size in rows)
+            for digest, _, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._db.execute('DELETE FROM responses WHERE digest = ?', (digest,))
+                removed.add(digest)
+                total -= size
+            self._db.commit()
+            self._stored_bytes = total
+            for digest in removed:
+                if self._db.execute('SELECT 1 FROM responses WHERE digest = ? LIMIT 1', (digest,)).fetchone() is None:
+                    try:
+                        os.remove(self._object_path(digest))
+                    except FileNotFoundError:
+                        pass
+
+    def fetch(self, url, headers=None, timeout=None, session=None, ttl=False):
+        """
+        Returns the response for a URL, from the cache if possible (fresh
+        within ttl, default: the cache's TTL).
+
+        Only successful (2xx) responses are stored. In offline mode a miss
+        raises CacheMiss, which scrapers already handle as a RequestException.
+        With SCRAPER_BASE_URL set the request goes to the replay server and is
+        cached under the replay URL, separate from the real site's pages.
+        """
+        url = rewrite_url(url)
+        cached = self.get(url, ttl)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        if self.offline:
+            raise CacheMiss(f"{url} is not in the cache (offline mode)")
+
+        with get_limiter().request(url) as outcome:
+            response = (session or requests).get(url, headers=headers, timeout=timeout)
+            outcome.status = response.status_code
+            outcome.retry_after = response.headers.get('Retry-After')
+        encoding = response.encoding or response.apparent_encoding
+        if 200 <= response.status_code < 300:
+            self.put(url, response.status_code, response.headers, response.content, encoding)
+        return CachedResponse(url, response.status_code, response.headers, response.content, encoding, from_cache=False)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache():
+    """Returns the process-wide cache configured from the HTTP_CACHE_* environment variables."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            ttl = os.environ.get('HTTP_CACHE_TTL')
+            _default_cache = ResponseCache(
+                cache_dir=os.environ.get('HTTP_CACHE_DIR', DEFAULT_CACHE_DIR),
+                ttl=float(ttl) if ttl else None,
+                max_bytes=int(float(os.environ.get('HTTP_CACHE_MAX_MB', '500')) * 1024 * 1024),
+                offline=os.environ.get('HTTP_CACHE_OFFLINE', '') not in ('', '0'),
+            )
+        return _default_cache
+
+def listing_ttl():
+    """Freshness of cached listing and index pages: HTTP_CACHE_LISTING_TTL seconds (default: a day)."""
+    return float(os.environ.get('HTTP_CACHE_LISTING_TTL', DEFAULT_LISTING_TTL))
+
+def cached_get(url, headers=None, timeout=None, session=None, listing=False):
+    """
+    Drop-in replacement for requests.get(url, headers=...) that goes through
+    the shared response cache.
+
+    Args:
+        listing (bool): The URL is a listing or index page; it is refetched
+                        after listing_ttl() (or HTTP_CACHE_TTL if shorter) so
+                        new documents show up.
+    """
+    cache = get_default_cache()
+    ttl = False
+    if listing:
+        ttl = listing_ttl() if cache.ttl is None else min(listing_ttl(), cache.ttl)
+    return cache.fetch(url, headers=headers, timeout=timeout, session=session, ttl=ttl)
@@ -0,0 +1,307 @@
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Table-driven ITRANS -> Devanagari transcoder.
+#
+# Every ITRANS token (including the alternate spellings such as aa/A, sh/Sh/shh,
+# .n/.m/M) goes into one trie, which is compiled into a single regular
+# expression. Because each trie node tries its longer continuations first, the
+# expression always takes the longest token at a position, exactly like
+# indic_transliteration's ITRANS reader, so a whole document is tokenised in
+# one C-level pass and only the consonant/vowel-sign bookkeeping runs in Python.
+
+VOWEL, CONSONANT, OTHER, HALANT = 0, 1, 2, 3
+VIRAMA = '्'
+
+# The tables cover every token of indic_transliteration's ITRANS scheme plus
+# the explicit halant .h, which hand-typed .itx sources use for word-final
+# consonants (tat.h, vAk.h) and which it would read as a danda followed by h.
+
+# token: (independent vowel, vowel sign); 'a' is inherent and has no sign
+VOWELS = {
+    'a': ('अ', ''), 'A': ('आ', 'ा'), 'aa': ('आ', 'ा'),
+    'i': ('इ', 'ि'), 'I': ('ई', 'ी'), 'ii': ('ई', 'ी'), 'ee': ('ई', 'ी'),
+    'u': ('उ', 'ु'), 'U': ('ऊ', 'ू'), 'uu': ('ऊ', 'ू'), 'oo': ('ऊ', 'ू'),
+    'RRi': ('ऋ', 'ृ'), 'R^i': ('ऋ', 'ृ'), 'RRI': ('ॠ', 'ॄ'), 'R^I': ('ॠ', 'ॄ'),
+    'LLi': ('ऌ', 'ॢ'), 'L^i': ('ऌ', 'ॢ'), 'LLI': ('ॡ', 'ॣ'), 'L^I': ('ॡ', 'ॣ'),
+    'è': ('ऎ', 'ॆ'), 'e': ('ए', 'े'), 'ai': ('ऐ', 'ै'),
+    'ò': ('ऒ', 'ॊ'), 'o': ('ओ', 'ो'), 'au': ('औ', 'ौ'),
+}
+
+CONSONANTS = {
+    'k': 'क', 'kh': 'ख', 'g': 'ग', 'gh': 'घ', '~N': 'ङ', 'N^': 'ङ',
+    'ch': 'च', 'c': 'च', 'Ch': 'छ', 'C': 'छ', 'chh': 'छ', 'j': 'ज', 'jh': 'झ', '~n': 'ञ', 'JN': 'ञ',
+    'T': 'ट', 'Th': 'ठ', 'D': 'ड', 'Dh': 'ढ', 'N': 'ण',
+    't': 'त', 'th': 'थ', 'd': 'द', 'dh': 'ध', 'n': 'न',
+    'p': 'प', 'ph': 'फ', 'b': 'ब', 'bh': 'भ', 'm': 'म',
+    'y': 'य', 'r': 'र', 'l': 'ल', 'v': 'व', 'w': 'व',
+    'sh': 'श', 'Sh': 'ष', 'S': 'ष', 'shh': 'ष', 's': 'स', 'h': 'ह', 'L': 'ळ',
+    'kSh': 'क्ष', 'kS': 'क्ष', 'x': 'क्ष', 'j~n': 'ज्ञ', 'GY': 'ज्ञ', 'dny': 'ज्ञ',
+    # Nukta consonants use the precomposed code points where Unicode has them
+    'q': '\u0958', 'K': '\u0959', 'G': '\u095a', 'z': '\u095b', 'J': '\u095b',
+    '.D': '\u095c', '.Dh': '\u0922\u093c', 'f': '\u095e', 'Y': '\u095f', 'R': '\u0931', 'zh': '\u0934',
+}
+
+OTHERS = {
+    'M': 'ं', '.m': 'ं', '.n': 'ं', 'H': 'ः', '.N': 'ँ', '.c': 'ॅ',
+    'OM': 'ॐ', 'AUM': 'ॐ', '.a': 'ऽ', '~': 'ऽ',
+    '|': '।', '.': '।', '||': '॥', '..': '॥',
+    '{}': '\u200d', '_': '',
+    "\\'": '॑', '\\_': '॒', '\\`': '॒',
+}
+OTHERS.update({str(d): chr(0x0966 + d) for d in range(10)})
+# Explicit halant: closes the consonant before it, or stands alone
+HALANTS = {'.h': VIRAMA}
+
+DEVANAGARI_DIGITS = str.maketrans('0123456789', '०१२३४५६७८९')
+# Accents are written after the anusvara/visarga they follow in ITRANS
+ACCENT_ORDER_PATTERN = re.compile('([॒॑])([ँंःᳵᳶꣳ])')
+
+def _build_table():
+    table = {}
+    for token, (vowel, mark) in VOWELS.items():
+        table[token] = (VOWEL, vowel, mark)
+    for token, consonant in CONSONANTS.items():
+        table[token] = (CONSONANT, consonant, None)
+    for token, symbol in OTHERS.items():
+        table[token] = (OTHER, symbol, None)
+    for token, symbol in HALANTS.items():
+        table[token] = (HALANT, symbol, None)
+    return table
+
+def _build_trie(tokens):
+    trie = {}
+    for token in tokens:
+        node = trie
+        for char in token:
+            node = node.setdefault(char, {})
+        node[''] = True
+    return trie
+
+def _trie_pattern(node):
+    """
+    Compiles a trie node into a regex fragment that matches the longest token
+    below it: each continuation is tried before stopping at the node.
+    """
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    group = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        return ('(?:' + group + ')?') if len(branches) == 1 else group + '?'
+    return group
+
+TOKEN_TABLE = _build_table()
+TOKEN_TRIE = _build_trie(TOKEN_TABLE)
+TOKEN_PATTERN = re.compile(_trie_pattern(TOKEN_TRIE) + '|.', re.DOTALL)
+# Variant that keeps verse numbers such as 1.12 whole instead of reading '.' as a danda
+NUMBER_TOKEN_PATTERN = re.compile(r'\d+(?:\.\d+)+|' + TOKEN_PATTERN.pattern, re.DOTALL)
+
+def transcode(text, keep_number_dots=False):
+    """
+    Converts ITRANS text to Devanagari in one pass.
+
+    Args:
+        text (str): ITRANS text (a line or a whole document).
+        keep_number_dots (bool): Keep numbers like 1.12 as १.१२ instead of
+                                 reading the '.' as a danda.
+
+    Returns:
+        str: The Devanagari text.
+    """
+    table = TOKEN_TABLE
+    pattern = NUMBER_TOKEN_PATTERN if keep_number_dots else TOKEN_PATTERN
+    out = []
+    append = out.append
+    had_consonant = False
+    for token in pattern.findall(text):
+        entry = table.get(token)
+        if entry is None:
+            # Not ITRANS (spaces, punctuation, other scripts) or a dotted number
+            if had_consonant:
+                append(VIRAMA)
+                had_consonant = False
+            append(token.translate(DEVANAGARI_DIGITS) if len(token) > 1 else token)
+            continue
+        kind, char, mark = entry
+        if kind == HALANT:
+            append(char)
+            had_consonant = False
+            continue
+        if had_consonant:
+            if kind == VOWEL:
+                append(mark)
+                had_consonant = False
+                continue
+            append(VIRAMA)
+        append(char)
+        had_consonant = kind == CONSONANT
+    if had_consonant:
+        append(VIRAMA)
+
+    result = ''.join(out)
+    if '॑' in result or '॒' in result:
+        result = ACCENT_ORDER_PATTERN.sub(r'\2\1', result)
+    return result
+
+def _transcode_numbered(text):
+    return transcode(text, keep_number_dots=True)
+
+def transcode_many(texts, workers=None, keep_number_dots=False, chunksize=16):
+    """
+    Converts a batch of documents, spread across a process pool.
+
+    Args:
+        texts (list): ITRANS documents.
+        workers (int): Processes to use (default: all cores); 1 converts in this process.
+        keep_number_dots (bool): See transcode().
+        chunksize (int): Documents handed to a worker at a time.
+
+    Returns:
+        list: The Devanagari documents, in input order.
+    """
+    func = _transcode_numbered if keep_number_dots else transcode
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(texts) < 2:
+        return [func(text) for text in texts]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, texts, chunksize=chunksize))
+
+def load_repo_corpus(root=None):
+    """
+    Builds an ITRANS benchmark corpus from the verses already extracted in the
+    repository (every output.json), transliterated back to ITRANS with
+    indic_transliteration. Returns one document per output file.
+    """
+    from indic_transliteration import sanscript
+
+    root = root or os.path.dirname(os.path.abspath(__file__))
+    documents = []
+    for path in sorted(glob.glob(os.path.join(root, '**', 'output.json'), recursive=True)):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        verses = [item.get('verse') or item.get('text') or '' for item in data if isinstance(item, dict)]
+        text = '\n\n'.join(verse for verse in verses if verse)
+        if text:
+            itrans = sanscript.transliterate(text, sanscript.DEVANAGARI, sanscript.ITRANS)
+            # A danda or full stop written before h would read back as the halant .h
+            documents.append(itrans.replace('.h', '._h'))
+    return documents
+
+def load_itx_samples(root=None):
+    """
+    Loads the hand-checked .itx sources in itx_samples/: real-world ITRANS as
+    typed on the site (.h halants, ## pass-through blocks, dotted verse
+    numbers), which a corpus transliterated from Devanagari never contains.
+
+    Returns:
+        list: (name, itx text, expected Devanagari) for every sample with a .dev.txt.
+    """
+    root = root or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'itx_samples')
+    samples = []
+    for path in sorted(glob.glob(os.path.join(root, '*.itx'))):
+        expected_file = os.path.splitext(path)[0] + '.dev.txt'
+        if not os.path.exists(expected_file):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            itx_text = f.read()
+        with open(expected_file, 'r', encoding='utf-8') as f:
+            expected = f.read()
+        samples.append((os.path.basename(path), itx_text, expected))
+    return samples
+
+def check_itx_samples(samples):
+    """
+    Converts each .itx sample the way itx_source does and compares it with its
+    hand-checked Devanagari.
+
+    Returns:
+        bool: True if every sample converted as expected.
+    """
+    from itx_source import parse_itx, transliterate_itrans
+
+    failed = 0
+    for name, itx_text, expected in samples:
+        title, body = parse_itx(itx_text)
+        converted = transliterate_itrans(title) + '\n\n' + transliterate_itrans(body) + '\n'
+        if converted != expected:
+            failed += 1
+            print(f"  [{name} differs from its expected Devanagari]")
+    print(f"Real .itx samples: {len(samples) - failed}/{len(samples)} match their hand-checked Devanagari")
+    return not failed
+
+def benchmark(documents, workers=None):
+    """
+    Times this transcoder against indic_transliteration on the same documents
+    and checks that both produce identical output.
+
+    Returns:
+        bool: True if every document converted identically.
+    """
+    from indic_transliteration import sanscript
+
+    total_chars = sum(len(text) for text in documents)
+    print(f"Benchmark corpus: {len(documents)} documents, {total_chars / 1e6:.2f}M characters")
+
+    start = time.perf_counter()
+    reference = [sanscript.transliterate(text, sanscript.ITRANS, sanscript.DEVANAGARI) for text in documents]
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ours = [transcode(text) for text in documents]
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pooled = transcode_many(documents, workers=workers)
+    pool_time = time.perf_counter() - start
+
+    print(f"indic_transliteration:        {reference_time:7.3f}s  ({total_chars / reference_time / 1e6:.2f}M chars/s)")
+    print(f"trie transcoder (1 process):  {serial_time:7.3f}s  ({total_chars / serial_time / 1e6:.2f}M chars/s, "
+          f"{reference_time / serial_time:.1f}x)")
+    print(f"trie transcoder (pool):       {pool_time:7.3f}s  ({total_chars / pool_time / 1e6:.2f}M chars/s, "
+          f"{reference_time / pool_time:.1f}x)")
+
+    mismatches = [i for i, (a, b) in enumerate(zip(reference, ours)) if a != b]
+    if pooled != ours:
+        print("Parity: pooled output differs from the serial output")
+        return False
+    if mismatches:
+        print(f"Parity: {len(mismatches)} of {len(documents)} documents differ from indic_transliteration")
+        return False
+    print("Parity: output identical to indic_transliteration on every document")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert ITRANS text to Devanagari.")
+    parser.add_argument("files", nargs="*", help="ITRANS files to convert (written next to them as .dev.txt)")
+    parser.add_argument("--workers", type=int, default=None, help="Processes to use (default: all cores)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Compare speed and output with indic_transliteration on the repository's texts, "
+                             "and check the real .itx samples in itx_samples/")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        parity = benchmark(load_repo_corpus(), workers=args.workers)
+        samples_ok = check_itx_samples(load_itx_samples())
+        sys.exit(0 if parity and samples_ok else 1)
+
+    if not args.files:
+        parser.error("give ITRANS files to convert, or --benchmark")
+    texts = []
+    for path in args.files:
+        with open(path, 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+    for path, converted in zip(args.files, transcode_many(texts, workers=args.workers)):
+        output_file = os.path.splitext(path)[0] + '.dev.txt'
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(converted)
+        print(f"Converted {path} -> {output_file}")
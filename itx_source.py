@@ -0,0 +1,123 @@
+import html
+import os
+import re
+from urllib.parse import urlsplit, urlunsplit
+from http_cache import CachedResponse, cached_get
+from itrans_transcoder import transcode
+
+# ITRANS (.itx) sources for sanskritdocuments.org pages.
+#
+# Every document page (.../name.html) is generated from a plain-text ITRANS
+# source at .../name.itx. The source is a fraction of the size of the page and
+# has no navigation, script selector or other boilerplate, so the scrapers can
+# read it instead of the HTML and transliterate it to Devanagari locally
+# (with the in-house trie transcoder in itrans_transcoder.py).
+#
+# Environment variables:
+#   SCRAPER_SOURCE   set to itx to make fetch_page() read ITRANS sources
+#                    (default: html)
+
+TITLE_PATTERN = re.compile(r'\\itxtitle\{(.*?)\}', re.DOTALL)
+# ## toggles between ITRANS and pass-through (English) text
+PASSTHROUGH_PATTERN = re.compile(r'##.*?##', re.DOTALL)
+COMMAND_PATTERN = re.compile(r'\\[A-Za-z]+\*?(\[[^\]]*\])?')
+# Braces left by TeX-style commands; an empty {} is ITRANS's letter separator
+BRACE_PATTERN = re.compile(r'\{\}|[{}]')
+
+def itx_url_for(page_url):
+    """Returns the .itx source URL for a document page URL, or None if it isn't an .html page."""
+    parts = urlsplit(page_url)
+    path = re.sub(r'\.html?$', '.itx', parts.path)
+    if path == parts.path:
+        return None
+    return urlunsplit((parts.scheme, parts.netloc, path, '', ''))
+
+def parse_itx(itx_text):
+    """
+    Splits an ITRANS source into its title and verse text, both still in ITRANS.
+
+    Comment lines (%), pass-through ## ... ## blocks, the #indian / #endindian
+    markers and TeX-style commands (with their braces) are dropped. The {}
+    separator, which keeps two letters from joining, is left for the transcoder.
+
+    Returns:
+        tuple: (title, body)
+    """
+    lines = [line for line in itx_text.splitlines() if not line.lstrip().startswith('%')]
+    text = '\n'.join(lines)
+
+    title_match = TITLE_PATTERN.search(text)
+    title = title_match.group(1) if title_match else ''
+    title = title.replace('..', '').strip()
+    if title_match:
+        text = text[:title_match.start()] + text[title_match.end():]
+
+    text = PASSTHROUGH_PATTERN.sub('', text)
+    text = text.replace('#indian', '').replace('#endindian', '')
+    text = COMMAND_PATTERN.sub('', text)
+    text = BRACE_PATTERN.sub(lambda match: match.group(0) if match.group(0) == '{}' else '', text)
+
+    body_lines = [line.rstrip() for line in text.splitlines()]
+    body = '\n'.join(body_lines).strip()
+    return title, body
+
+def transliterate_itrans(text):
+    """Transliterates ITRANS text to Devanagari, keeping verse numbers like 1.12 intact."""
+    return transcode(text, keep_number_dots=True)
+
+def fetch_itx(page_url, headers=None, timeout=None):
+    """
+    Downloads the ITRANS source of a document page and converts it to Devanagari.
+
+    Args:
+        page_url (str): URL of the .html document page.
+
+    Returns:
+        tuple: (title, body) in Devanagari.
+
+    Raises:
+        ValueError: If the URL isn't a document page.
+        requests.RequestException: If the source could not be downloaded.
+    """
+    itx_url = itx_url_for(page_url)
+    if itx_url is None:
+        raise ValueError(f"No .itx source for {page_url}")
+    response = cached_get(itx_url, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    title, body = parse_itx(response.content.decode('utf-8', errors='replace'))
+    return transliterate_itrans(title), transliterate_itrans(body)
+
+def itx_page_response(page_url, headers=None, timeout=None):
+    """
+    Returns a response whose HTML is rebuilt from the page's ITRANS source.
+
+    The body mirrors the parts of a document page the scrapers read: the title
+    as <h2 itemprop="name"> inside <pre id="content">, followed by the verses.
+    """
+    title, body = fetch_itx(page_url, headers=headers, timeout=timeout)
+    page = (
+        f'<html><head><meta charset="utf-8"><title>{html.escape(title)}</title></head><body>'
+        f'<pre id="content"><h2 itemprop="name">{html.escape(title)}</h2>\n{html.escape(body)}\n</pre>'
+        '</body></html>'
+    )
+    return CachedResponse(page_url, 200, {'Content-Type': 'text/html; charset=utf-8'},
+                          page.encode('utf-8'), 'utf-8', from_cache=False)
+
+def use_itx_source():
+    """True when SCRAPER_SOURCE=itx asks the scrapers to read ITRANS sources."""
+    return os.environ.get('SCRAPER_SOURCE', 'html').lower() == 'itx'
+
+def fetch_page(url, headers=None, timeout=None):
+    """
+    Drop-in replacement for cached_get() in the document scrapers.
+
+    With SCRAPER_SOURCE=itx the page is rebuilt from its ITRANS source (falling
+    back to the HTML page if there is none); otherwise the HTML page is fetched
+    through the response cache as before.
+    """
+    if use_itx_source():
+        try:
+            return itx_page_response(url, headers=headers, timeout=timeout)
+        except Exception as e:
+            print(f"No usable .itx source for {url} ({e}), reading the HTML page instead")
+    return cached_get(url, headers=headers, timeout=timeout)
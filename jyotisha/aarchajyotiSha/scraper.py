@@ -4,6 +4,11 @@ from typing import Optional, List, Dict
 import re
 import json
 from datetime import datetime
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from html_parse import parse_html
+from itx_source import fetch_page
 
 def devanagari_to_english(number: str) -> str:
     """
@@ -37,11 +42,11 @@ def scrape_webpage(url: str) -> Optional[BeautifulSoup]:
         }
         
         # Send GET request to the URL with headers
-        response = requests.get(url, headers=headers)
+        response = fetch_page(url, headers=headers)
         response.raise_for_status()
         
         # Parse the HTML content
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text)
         return soup
         
     except requests.RequestException as e:
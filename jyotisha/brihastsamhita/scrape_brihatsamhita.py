@@ -1,8 +1,11 @@
 import requests
-from bs4 import BeautifulSoup
 import re
 import json
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from html_parse import pre_text
+from itx_source import fetch_page
 
 # Configuration
 URL = "https://sanskritdocuments.org/doc_z_misc_sociology_astrology/bRRihatsaMhitA.html"
@@ -29,26 +32,19 @@ headers = {
 # Fetch HTML content
 print(f"Fetching content from {URL}...")
 try:
-    response = requests.get(URL, headers=headers)
+    response = fetch_page(URL, headers=headers)
     response.raise_for_status()
     print("Content fetched successfully.")
 except requests.exceptions.RequestException as e:
     print(f"Error fetching URL {URL}: {e}")
     exit(1)
 
-# Parse HTML
-print("Parsing HTML content...")
-soup = BeautifulSoup(response.content, 'html.parser')
-
-# Find the <pre> tag
-pre_tag = soup.find('pre')
-if not pre_tag:
+# Extract text from the <pre> tag (sliced from the raw HTML, or parsed if that's ambiguous)
+text = pre_text(response.content, separator='\n')
+if text is None:
     print("Error: Could not find the <pre> tag containing the text.")
     exit(1)
-
-# Extract text from the <pre> tag
-pre_text = pre_tag.get_text(separator='\n')
-lines = pre_text.splitlines()
+lines = text.splitlines()
 print("Extracted text from <pre> tag.")
 
 # Process lines to extract verses
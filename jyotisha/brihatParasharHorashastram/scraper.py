@@ -5,6 +5,10 @@ import re
 import json
 from datetime import datetime
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from html_parse import parse_html, pre_text
+from itx_source import fetch_page
 
 def devanagari_to_english(number: str) -> str:
     """
@@ -30,7 +34,7 @@ def scrape_webpage(url):
             'Accept-Encoding': 'gzip, deflate, br',
             'Connection': 'keep-alive'
         }
-        response = requests.get(url, headers=headers)
+        response = fetch_page(url, headers=headers)
         response.raise_for_status()
         return response.text
     except requests.RequestException as e:
@@ -143,11 +147,13 @@ def extract_verses(url, html_content):
     current_adhyaya_title = "Unknown Adhyaya" # Default title
     verse_buffer = []
     
-    soup = BeautifulSoup(html_content, 'html.parser')
     # Try to find a main content area if possible, otherwise use whole text
     # This might need adjustment based on actual page structure
-    content_area = soup.find('pre') or soup.find('body') or soup 
-    text = content_area.get_text('\n', strip=True)
+    text = pre_text(html_content, separator='\n', strip=True)
+    if text is None:
+        soup = parse_html(html_content)
+        content_area = soup.find('body') or soup
+        text = content_area.get_text('\n', strip=True)
     lines = [line.strip() for line in text.split('\n') if line.strip()]
 
     # Debug: Print first few lines to check content extraction
@@ -1,8 +1,11 @@
 import requests
-from bs4 import BeautifulSoup
 import re
 import json
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from html_parse import pre_text
+from itx_source import fetch_page
 
 # Helper function to convert Sanskrit numerals (Devanagari) to English numerals
 def sanskrit_numeral_to_english(num_str):
@@ -50,26 +53,19 @@ headers = {
 # Fetch HTML content
 print(f"Fetching content from {url}...")
 try:
-    response = requests.get(url, headers=headers)
+    response = fetch_page(url, headers=headers)
     response.raise_for_status()
     print("Content fetched successfully.")
 except requests.exceptions.RequestException as e:
     print(f"Error fetching URL {url}: {e}")
     exit(1)
 
-# Parse HTML
-print("Parsing HTML content...")
-soup = BeautifulSoup(response.content, 'html.parser')
-
-# Find the <pre> tag
-pre_tag = soup.find('pre')
-if not pre_tag:
+# Extract text from the <pre> tag (sliced from the raw HTML, or parsed if that's ambiguous)
+text = pre_text(response.content, separator='\n')
+if text is None:
     print("Error: Could not find the <pre> tag containing the text.")
     exit(1)
-
-# Extract text from the <pre> tag
-pre_text = pre_tag.get_text(separator='\n')
-lines = pre_text.splitlines()
+lines = text.splitlines()
 print("Extracted text from <pre> tag.")
 
 # Process lines to extract verses
@@ -1,8 +1,11 @@
 import requests
-from bs4 import BeautifulSoup
 import re
 import json
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from html_parse import parse_html
+from itx_source import fetch_page
 
 # Configuration
 URL = "https://sanskritdocuments.org/doc_z_misc_sociology_astrology/ShaTpanchAshikA.html"
@@ -29,7 +32,7 @@ def scrape_shatpanchashika(url, output_file):
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
     }
     try:
-        response = requests.get(url, headers=headers)
+        response = fetch_page(url, headers=headers)
         response.raise_for_status()
         response.encoding = 'utf-8'
         html_content = response.text
@@ -39,7 +42,7 @@ def scrape_shatpanchashika(url, output_file):
         exit(1)
 
     print("Parsing HTML content...")
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = parse_html(html_content)
 
     # Extract text content (similar strategy as before)
     content_area = soup.body
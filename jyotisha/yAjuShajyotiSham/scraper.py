@@ -1,8 +1,11 @@
 import requests
-from bs4 import BeautifulSoup
 import json
 import re
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from html_parse import pre_text
+from itx_source import fetch_page
 
 # Function to convert Devanagari numerals to English numerals
 def devanagari_to_english(num_str):
@@ -19,13 +22,12 @@ def extract_verses(url, html_content):
     text_title = "याजुषज्योतिषम्" # Use Devanagari title
     verse_buffer = []
 
-    soup = BeautifulSoup(html_content, 'html.parser')
-    content_area = soup.find('pre')
-    if not content_area:
+    # Keep original spacing for line breaks; sliced from the raw HTML when unambiguous
+    text = pre_text(html_content, separator='\n')
+    if text is None:
         print("Could not find <pre> tag containing the text.")
         return []
 
-    text = content_area.get_text('\n', strip=False) # Keep original spacing for line breaks
     lines = text.split('\n') # Split by newline
 
     print(f"--- Start of Text Processing for {text_title} ---")
@@ -124,7 +126,7 @@ def main():
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = fetch_page(url, headers=headers, timeout=10)
         response.raise_for_status() # Raise an exception for bad status codes
         response.encoding = 'utf-8' # Ensure correct encoding
         html_content = response.text
@@ -1,19 +1,23 @@
 import requests
-from bs4 import BeautifulSoup
 from typing import Optional, List, Dict
 import re
 import json
 from datetime import datetime
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from html_parse import pre_text
+from itx_source import fetch_page
 
-def scrape_webpage(url: str) -> Optional[BeautifulSoup]:
+def scrape_webpage(url: str) -> Optional[bytes]:
     """
-    Scrape a webpage and return its parsed content.
+    Scrape a webpage and return its raw HTML.
     
     Args:
         url (str): The URL of the webpage to scrape
         
     Returns:
-        Optional[BeautifulSoup]: Parsed HTML content if successful, None otherwise
+        Optional[bytes]: The page's HTML if successful, None otherwise
     """
     try:
         # Add headers to mimic a browser request
@@ -25,42 +29,34 @@ def scrape_webpage(url: str) -> Optional[BeautifulSoup]:
         }
         
         # Send GET request to the URL with headers
-        response = requests.get(url, headers=headers)
+        response = fetch_page(url, headers=headers)
         response.raise_for_status()  # Raise an exception for bad status codes
         
-        # Parse the HTML content
-        soup = BeautifulSoup(response.text, 'lxml')
-        return soup
+        # The verses are read straight from the raw bytes, see extract_verses
+        return response.content
         
     except requests.RequestException as e:
         print(f"Error fetching the webpage {url}: {e}")
         return None
 
-def extract_verses(soup: BeautifulSoup) -> List[Dict[str, str]]:
+def extract_verses(html: bytes) -> List[Dict[str, str]]:
     """
     Extract verses from the Navaratnamala webpage.
     
     Args:
-        soup (BeautifulSoup): Parsed HTML content
+        html (bytes): The page's raw HTML
         
     Returns:
         List[Dict[str, str]]: List of verses with their numbers and content
     """
     verses = []
     
-    # Find the pre tag with id="content"
-    content = soup.find('pre', id='content')
-    if not content:
+    # Text of the pre tag with id="content", without the h2 tag with
+    # itemprop="name" (sliced from the raw HTML, or parsed if that's ambiguous)
+    text_content = pre_text(html, pre_id='content', drop_heading=True)
+    if text_content is None:
         print("Could not find content tag")
         return verses
-        
-    # Remove the h2 tag with itemprop="name" if it exists
-    h2_tag = content.find('h2', attrs={'itemprop': 'name'})
-    if h2_tag:
-        h2_tag.decompose()
-        
-    # Get text content
-    text_content = content.get_text()
     
     # Find all text that matches the verse pattern (e.g., "॥ १॥")
     verse_pattern = re.compile(r'॥\s*(\d+)\s*॥')
@@ -150,11 +146,11 @@ def process_url(url: str) -> List[Dict[str, str]]:
     Returns:
         List[Dict[str, str]]: List of formatted verses
     """
-    soup = scrape_webpage(url)
-    if not soup:
+    html = scrape_webpage(url)
+    if not html:
         return []
         
-    verses = extract_verses(soup)
+    verses = extract_verses(html)
     formatted_verses = []
     
     for verse in verses:
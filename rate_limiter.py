@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# Per-host adaptive rate limiter shared by every fetch path.
+#
+# Each host gets a token bucket. The rate grows additively while the host
+# answers quickly and is cut multiplicatively when it slows down or answers
+# 429/503; a Retry-After header pauses the host for as long as it asks.
+#
+# "Slows down" compares a short latency average with the host's baseline, a
+# slow moving average over many requests (the plain mean of the first ones).
+# Load times vary with page size, so the baseline has to be the host's usual
+# latency rather than its fastest: against the fastest, every ordinary page
+# after one small one would look like overload.
+#
+# Environment variables:
+#   RATE_LIMIT_INITIAL   starting requests/sec per host (default: 2)
+#   RATE_LIMIT_MIN       floor for the adaptive rate (default: 0.2)
+#   RATE_LIMIT_MAX       ceiling for the adaptive rate (default: 10)
+#
+# python rate_limiter.py --check replays deterministic latency streams through
+# the limiter (a healthy host with varied page sizes, a slowdown, a 429).
+
+THROTTLE_STATUSES = (429, 503)
+# Weight of the newest latency in the short and baseline averages
+SHORT_LATENCY_WEIGHT = 0.2
+BASELINE_LATENCY_WEIGHT = 0.02
+# Requests averaged into the baseline before slowdowns are judged
+BASELINE_WARMUP = 10
+
+def parse_retry_after(value):
+    """Returns the delay in seconds from a Retry-After header (seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class _HostBucket:
+    """Token bucket and latency statistics for one host."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = 1.0
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.waiting = 0
+        self.latency_ewma = None
+        self.baseline_latency = None
+        self.requests = 0
+        self.throttled = 0
+
+class _RequestRecord:
+    """Filled in by the caller of HostRateLimiter.request() with what the server said."""
+
+    def __init__(self):
+        self.status = None
+        self.retry_after = None
+
+class HostRateLimiter:
+    """
+    Adaptive per-host token-bucket limiter.
+
+    Args:
+        initial_rate (float): Starting requests/sec for a host.
+        min_rate (float): The rate is never cut below this.
+        max_rate (float): The rate never grows above this.
+        burst (float): Bucket capacity, i.e. requests allowed back to back.
+        increase (float): Requests/sec added after each fast, successful response.
+        decrease (float): Factor applied to the rate on 429/503.
+        slow_factor (float): A short latency average above this multiple of the
+                             host's baseline latency counts as a sign of overload.
+    """
+
+    def __init__(self, initial_rate=2.0, min_rate=0.2, max_rate=10.0, burst=1.0,
+                 increase=0.1, decrease=0.5, slow_factor=2.0):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_factor = slow_factor
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    @staticmethod
+    def host_of(url):
+        return urlsplit(url).netloc.lower()
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _HostBucket(self.initial_rate)
+        return bucket
+
+    def _reserve(self, url):
+        """Takes a token for the URL's host and returns how long the caller must wait for it."""
+        with self._lock:
+            bucket = self._bucket(self.host_of(url))
+            now = time.monotonic()
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated_at) * bucket.rate)
+            bucket.updated_at = now
+            # Going below zero reserves a future slot, which keeps waiters in FIFO order
+            bucket.tokens -= 1.0
+            delay = max(0.0, -bucket.tokens / bucket.rate, bucket.paused_until - now)
+            if delay > 0:
+                bucket.waiting += 1
+            return bucket, delay
+
+    def _done_waiting(self, bucket):
+        with self._lock:
+            bucket.waiting -= 1
+
+    def wait(self, url):
+        """Blocks until a request to the URL's host is allowed."""
+        bucket, delay = self._reserve(url)
+        if delay > 0:
+            try:
+                time.sleep(delay)
+            finally:
+                self._done_waiting(bucket)
+
+    async def wait_async(self, url):
+        """asyncio counterpart of wait()."""
+        bucket, delay = self._reserve(url)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._done_waiting(bucket)
+
+    def record(self, url, latency, status=None, retry_after=None):
+        """
+        Feeds the outcome of a request back into the host's rate.
+
+        Args:
+            url (str): The requested URL.
+            latency (float): Seconds the request took.
+            status (int): HTTP status, or None when unknown (e.g. Selenium loads).
+            retry_after (str | float): Retry-After header value, if any.
+        """
+        with self._lock:
+            bucket = self._bucket(self.host_of(url))
+            bucket.requests += 1
+            delay = parse_retry_after(retry_after) if isinstance(retry_after, str) else retry_after
+            if delay:
+                bucket.paused_until = max(bucket.paused_until, time.monotonic() + delay)
+
+            if status in THROTTLE_STATUSES:
+                bucket.throttled += 1
+                bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+                return
+
+            samples = bucket.requests - bucket.throttled
+            if bucket.latency_ewma is None:
+                bucket.latency_ewma = bucket.baseline_latency = latency
+            else:
+                bucket.latency_ewma += SHORT_LATENCY_WEIGHT * (latency - bucket.latency_ewma)
+                weight = 1.0 / samples if samples <= BASELINE_WARMUP else BASELINE_LATENCY_WEIGHT
+                bucket.baseline_latency += weight * (latency - bucket.baseline_latency)
+
+            slow = (samples > BASELINE_WARMUP and bucket.latency_ewma > 0.05
+                    and bucket.latency_ewma > self.slow_factor * bucket.baseline_latency)
+            if slow:
+                bucket.rate = max(self.min_rate, bucket.rate * 0.9)
+            elif status is None or status < 400:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase)
+
+    @contextmanager
+    def request(self, url):
+        """
+        Waits for a slot, times the block and records the outcome.
+
+        Usage:
+            with limiter.request(url) as outcome:
+                response = session.get(url)
+                outcome.status = response.status_code
+                outcome.retry_after = response.headers.get('Retry-After')
+        """
+        self.wait(url)
+        outcome = _RequestRecord()
+        start = time.monotonic()
+        try:
+            yield outcome
+        finally:
+            self.record(url, time.monotonic() - start, outcome.status, outcome.retry_after)
+
+    def stats(self):
+        """Returns {host: {rate, queue_depth, latency, requests, throttled}} for every host seen."""
+        with self._lock:
+            return {
+                host: {
+                    'rate': bucket.rate,
+                    'queue_depth': bucket.waiting,
+                    'latency': bucket.latency_ewma,
+                    'requests': bucket.requests,
+                    'throttled': bucket.throttled,
+                }
+                for host, bucket in self._buckets.items()
+            }
+
+    def report(self):
+        """Prints the current rate and queue depth of every host."""
+        for host, stat in self.stats().items():
+            latency = f"{stat['latency']:.2f}s" if stat['latency'] is not None else "n/a"
+            print(f"Rate limiter [{host}]: {stat['rate']:.2f} req/s, queue depth {stat['queue_depth']}, "
+                  f"latency {latency}, {stat['requests']} requests, {stat['throttled']} throttled")
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def _limiter_from_env(share=1):
+    return HostRateLimiter(
+        initial_rate=float(os.environ.get('RATE_LIMIT_INITIAL', '2')) / share,
+        min_rate=float(os.environ.get('RATE_LIMIT_MIN', '0.2')) / share,
+        max_rate=float(os.environ.get('RATE_LIMIT_MAX', '10')) / share,
+    )
+
+def get_limiter():
+    """Returns the process-wide limiter configured from the RATE_LIMIT_* environment variables."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = _limiter_from_env()
+        return _limiter
+
+def use_rate_share(processes):
+    """
+    Worker process setup: replaces this process's limiter with one that gets
+    1/processes of the RATE_LIMIT_* rates, so that many workers fetching from
+    the same hosts together stay within one host's budget.
+    """
+    global _limiter
+    with _limiter_lock:
+        _limiter = _limiter_from_env(max(1, processes))
+
+def combine_stats(per_process_stats):
+    """
+    Adds up the stats() of several worker processes into one per-host view.
+
+    Returns:
+        dict: {host: {rate, requests, throttled}}
+    """
+    combined = {}
+    for stats in per_process_stats:
+        for host, stat in stats.items():
+            total = combined.setdefault(host, {'rate': 0.0, 'requests': 0, 'throttled': 0})
+            total['rate'] += stat['rate']
+            total['requests'] += stat['requests']
+            total['throttled'] += stat['throttled']
+    return combined
+
+def report_combined(per_process_stats):
+    """Prints the combined rate of worker processes per host."""
+    for host, stat in combine_stats(per_process_stats).items():
+        print(f"Rate limiter [{host}]: {stat['rate']:.2f} req/s across {len(per_process_stats)} processes, "
+              f"{stat['requests']} requests, {stat['throttled']} throttled")
+
+def check_steady_latency(requests=500, low=0.3, high=1.5, seed=0):
+    """
+    Deterministic check: a healthy host whose load times vary between low and
+    high seconds (pages of very different sizes) must never have its rate cut.
+
+    Returns:
+        bool: True if the rate never went down.
+    """
+    rng = random.Random(seed)
+    limiter = HostRateLimiter()
+    url = 'https://example.org/'
+    previous = limiter.initial_rate
+    for index in range(requests):
+        limiter.record(url, rng.uniform(low, high), 200)
+        rate = limiter.stats()[limiter.host_of(url)]['rate']
+        if rate < previous:
+            print(f"Rate cut from {previous:.2f} to {rate:.2f} req/s at request {index + 1} "
+                  f"of a steady {low}-{high}s stream")
+            return False
+        previous = rate
+    print(f"Steady {low}-{high}s stream: rate never cut, {previous:.2f} req/s after {requests} requests")
+    return True
+
+def check_throttling(requests=20):
+    """Deterministic check: a host that slows down five-fold, then answers 429, gets its rate cut."""
+    limiter = HostRateLimiter()
+    url = 'https://example.org/'
+    host = limiter.host_of(url)
+    for _ in range(requests):
+        limiter.record(url, 0.5, 200)
+    healthy = limiter.stats()[host]['rate']
+    for _ in range(requests):
+        limiter.record(url, 2.5, 200)
+    slowed = limiter.stats()[host]['rate']
+    limiter.record(url, 0.5, 429)
+    throttled = limiter.stats()[host]['rate']
+    ok = slowed < healthy and throttled < slowed
+    print(f"Slowdown and 429: {healthy:.2f} -> {slowed:.2f} -> {throttled:.2f} req/s "
+          f"({'cut as expected' if ok else 'NOT cut'})")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-host adaptive rate limiter.")
+    parser.add_argument("--check", action="store_true",
+                        help="Replay deterministic latency streams through the limiter and check how it reacts")
+    args = parser.parse_args()
+    if not args.check:
+        parser.error("nothing to do; use --check")
+    results = [check_steady_latency(), check_throttling()]
+    sys.exit(0 if all(results) else 1)
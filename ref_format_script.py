@@ -77,6 +77,7 @@ def traverse_and_process(directory):
                 process_json_file(file_path)
 
 # Replace 'your_directory_path' with the actual root directory containing nested folders
-traverse_and_process("/Users/arpansrivastava/Development/BHERI-scrapper/sanskrit-text-extraction")
+if __name__ == "__main__":
+    traverse_and_process("/Users/arpansrivastava/Development/BHERI-scrapper/sanskrit-text-extraction")
 
 
@@ -0,0 +1,259 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+import requests
+
+# Record/replay stand-in for sanskritdocuments.org.
+#
+# Recorded responses live in a fixture directory (index.json plus one body file
+# per distinct page). The server replays them with configurable latency and
+# bandwidth so scraper throughput can be measured offline and repeatably.
+# With --record, requests that aren't recorded yet are fetched from the real
+# site and saved, so running a scraper once against the server captures every
+# page it needs.
+#
+# Scrapers are pointed at the server through one environment variable:
+#   SCRAPER_BASE_URL     e.g. http://127.0.0.1:8800; every fetch of a
+#                        sanskritdocuments.org URL goes there instead
+
+SITE_ROOT = 'https://sanskritdocuments.org'
+SITE_HOSTS = ('sanskritdocuments.org', 'www.sanskritdocuments.org')
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'replay_fixtures')
+# Response headers worth replaying (content type and the recrawl validators)
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+CHUNK_SIZE = 16 * 1024
+
+def rewrite_url(url):
+    """
+    Returns the URL to actually fetch: sanskritdocuments.org URLs are moved to
+    SCRAPER_BASE_URL when it is set, everything else is returned unchanged.
+    """
+    base_url = os.environ.get('SCRAPER_BASE_URL')
+    if not base_url:
+        return url
+    parts = urlsplit(url)
+    if parts.netloc.lower() not in SITE_HOSTS:
+        return url
+    target = base_url.rstrip('/') + (parts.path or '/')
+    if parts.query:
+        target += '?' + parts.query
+    return target
+
+class FixtureStore:
+    """
+    Recorded responses keyed by request path (path plus query string).
+
+    Args:
+        fixture_dir (str): Directory holding index.json and the body files.
+    """
+
+    def __init__(self, fixture_dir=DEFAULT_FIXTURE_DIR):
+        self.fixture_dir = fixture_dir
+        self.index_file = os.path.join(fixture_dir, 'index.json')
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(fixture_dir, 'bodies'), exist_ok=True)
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        except FileNotFoundError:
+            self.index = {}
+
+    def get(self, path):
+        """Returns (status, headers, body) for a recorded path, or None."""
+        with self._lock:
+            entry = self.index.get(path)
+        if entry is None:
+            return None
+        with open(os.path.join(self.fixture_dir, 'bodies', entry['body']), 'rb') as f:
+            body = f.read()
+        return entry['status'], entry['headers'], body
+
+    def put(self, path, status, headers, body):
+        """Records one response; identical bodies are stored once."""
+        digest = hashlib.sha256(body).hexdigest()
+        body_file = os.path.join(self.fixture_dir, 'bodies', digest)
+        if not os.path.exists(body_file):
+            with open(body_file, 'wb') as f:
+                f.write(body)
+        kept = {name: headers[name] for name in KEPT_HEADERS if name in headers}
+        with self._lock:
+            self.index[path] = {'status': status, 'headers': kept, 'body': digest}
+            self.save()
+
+    def save(self):
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_file, self.index_file)
+
+    def __len__(self):
+        return len(self.index)
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Serves recorded responses, recording misses from upstream when enabled."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        # The size scheduler asks for Content-Length before fetching
+        self._respond(send_body=False)
+
+    def _respond(self, send_body):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        recorded = server.store.get(self.path)
+        if recorded is None and server.upstream:
+            recorded = self._record()
+        if recorded is None:
+            server.count('missing')
+            self._send(404, {'Content-Type': 'text/plain'}, b'Not recorded\n', send_body)
+            return
+
+        status, headers, body = recorded
+        etag = headers.get('ETag')
+        if status == 200 and etag and self.headers.get('If-None-Match') == etag:
+            server.count('not_modified')
+            self._send(304, {'ETag': etag}, b'', send_body)
+            return
+        server.count('served' if send_body else 'head')
+        self._send(status, headers, body, send_body)
+
+    def _record(self):
+        url = self.server.upstream.rstrip('/') + self.path
+        try:
+            response = requests.get(url, headers={'User-Agent': self.headers.get('User-Agent', '')}, timeout=30)
+        except requests.RequestException as e:
+            print(f"[ERROR recording {url}: {e}]")
+            return None
+        self.server.store.put(self.path, response.status_code, response.headers, response.content)
+        self.server.count('recorded')
+        return self.server.store.get(self.path)
+
+    def _send(self, status, headers, body, send_body=True):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not send_body:
+            return
+        bandwidth = self.server.bandwidth
+        try:
+            for start in range(0, len(body), CHUNK_SIZE):
+                chunk = body[start:start + CHUNK_SIZE]
+                if bandwidth:
+                    time.sleep(len(chunk) / bandwidth)
+                self.wfile.write(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            # Streaming classifiers hang up as soon as they have seen enough
+            pass
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server replaying a FixtureStore.
+
+    Args:
+        address (tuple): (host, port) to listen on.
+        store (FixtureStore): Recorded responses.
+        latency (float): Seconds to wait before answering each request.
+        bandwidth (float): Bytes/sec per response, or None for unlimited.
+        upstream (str): Site to record misses from, or None to replay only.
+        verbose (bool): Log every request.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, store, latency=0.0, bandwidth=None, upstream=None, verbose=False):
+        super().__init__(address, ReplayHandler)
+        self.store = store
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.upstream = upstream
+        self.verbose = verbose
+        self.counts = {}
+        self._counts_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, what):
+        with self._counts_lock:
+            self.counts[what] = self.counts.get(what, 0) + 1
+
+    def report(self):
+        summary = ", ".join(f"{count} {what}" for what, count in sorted(self.counts.items())) or "no requests"
+        print(f"Replay server: {summary} ({len(self.store)} pages recorded)")
+
+def start_server(store, host='127.0.0.1', port=0, **options):
+    """Starts a ReplayServer in a background thread and returns it."""
+    server = ReplayServer((host, port), store, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run_benchmark(command, server):
+    """
+    Runs a scraper command against the server and prints how long it took.
+
+    The command inherits SCRAPER_BASE_URL, and HTTP_CACHE_TTL=0 so the shared
+    response cache doesn't answer in place of the server.
+    """
+    env = dict(os.environ, SCRAPER_BASE_URL=server.base_url, HTTP_CACHE_TTL='0')
+    print(f"Running {' '.join(command)} against {server.base_url}")
+    start_time = time.time()
+    returncode = subprocess.call(command, env=env)
+    elapsed = time.time() - start_time
+    print(f"\nBenchmark: {elapsed:.2f}s, exit code {returncode}")
+    server.report()
+    return returncode
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record and replay sanskritdocuments.org pages for offline benchmarks.")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURE_DIR, help="Fixture directory (default: replay_fixtures)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay per response (default: 0)")
+    parser.add_argument("--bandwidth", type=float, default=None, help="Bytes/sec per response (default: unlimited)")
+    parser.add_argument("--record", action="store_true",
+                        help=f"Fetch pages that aren't recorded yet from {SITE_ROOT} and save them")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    parser.add_argument("command", nargs=argparse.REMAINDER,
+                        help="Optional scraper command to run and time against the server (after --)")
+    args = parser.parse_args()
+
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+    store = FixtureStore(args.fixtures)
+    options = dict(latency=args.latency, bandwidth=args.bandwidth,
+                   upstream=SITE_ROOT if args.record else None, verbose=args.verbose)
+
+    if command:
+        server = start_server(store, args.host, args.port, **options)
+        sys.exit(run_benchmark(command, server))
+
+    server = ReplayServer((args.host, args.port), store, **options)
+    mode = "recording + replaying" if args.record else "replaying"
+    print(f"{mode} {len(store)} pages from '{args.fixtures}' on {server.base_url}")
+    print(f"Point the scrapers at it with: export SCRAPER_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.report()
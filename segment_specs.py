@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import time
+from text_segmenter import compile_spec
+
+# Segmentation specs for the sutra and smriti texts (format: text_segmenter.py).
+#
+# Each spec reproduces what the text's own script used to do with its chain of
+# split functions, down to the refs in the committed output.json. Running this
+# file with --check segments every text and compares the result with that
+# output.json, after the same ref formatting ref_format_script.py applies
+# (ASCII digits, Devanagari text names).
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# A verse ends at the number after it: ' १२'
+NUMBERED = {'end': r'\s(\d+)'}
+DEVANAGARI_NUMBERED = {'end': r'\s({numeral})'}
+# A khanda ends at a line holding only its number
+NUMERAL_LINE = r'\n({numeral})\s*(?:\n|{end})'
+
+SPECS = {
+    'gobhila_grihya_sutra': {
+        'source': 'gRhyam/gobhila_grihya_sutra/gobhila_grihya_sutra.md',
+        'levels': [
+            {'closing': r'\s*इति\s*{ordinal}\s+प्रपाठकः\s*(?:\n|{end})'},
+            {'closing': NUMERAL_LINE, 'tail': True},
+        ],
+        'verses': DEVANAGARI_NUMBERED,
+        'ref': 'gobhila_grihya_sutra', 'key': 'verse_number',
+    },
+    'hiranyakeshi_grihya_sutra': {
+        'source': 'gRhyam/hiranyakeshi_grihya_sutra/hiranyakeshi_grihya_sutra.md',
+        'levels': [
+            {'closing': r'प्रथमः प्रश्नः समाप्तः', 'tail': True},
+            {'closing': r'\s*{ordinal}\s+पटलः\s*(?:\n|{end})'},
+            {'closing': NUMERAL_LINE, 'tail': True},
+        ],
+        'verses': DEVANAGARI_NUMBERED,
+        'ref': 'hiranyakeshi_grihya_sutra', 'key': 'verse_number',
+    },
+    'drahyayana_grihya_sutra': {
+        'source': 'gRhyam/drahyayana_grihya_sutra/drahyayana_grihya_sutra.md',
+        'levels': [
+            # The source writes 'तृतीय पटलः' without the visarga
+            {'closing': r'\s*इति\s*(?:प्रथमः|द्वितीयः|तृतीय|चतुर्थः|पञ्चमः|षष्ठः|सप्तमः|अष्टमः|नवमः|दशमः)'
+                        r'\s+पटलः\s*(?:\n|{end})', 'unmarked': True},
+            {'closing': r'\s*इति\s*{ordinal}\s+खण्डः\s*(?:\n|{end})'},
+        ],
+        'verses': DEVANAGARI_NUMBERED,
+        'ref': 'drahyayana_grihya_sutra', 'key': 'verse_number',
+    },
+    'kaushitaka_grihya_sutra': {
+        'source': 'gRhyam/kaushitaka_grihya_sutra/kaushitaka_grihya_sutra.md',
+        'levels': [
+            {'closing': r'\s*इति कौषीतकगृह्ये\s*[\s\S]*?\s*(?:\n|{end})', 'unmarked': True},
+            # The first khanda of each adhyaya has no 'अथ' in the source
+            {'opening': r'अथ\s*[\s\S]+?\s*खण्डः', 'first': r'[\s\S]+?\s*खण्डः|खण्डः'},
+        ],
+        'verses': NUMBERED,
+        'ref': None, 'key': 'verse_number',
+    },
+    'kathaka_grihya_sutra': {
+        'source': 'gRhyam/kathaka_grihya_sutra/kathaka_grihya_sutra.md',
+        'levels': [
+            {'closing': r'इति लौगाक्षिसूत्रे गृह्यपञ्चिकायां[^\n]*\n?', 'include_marker': True},
+            {'restart': '१'},
+        ],
+        'verses': NUMBERED,
+        'strip': False,
+        'ref': 'kathaka_grihya_sutra', 'key': 'ref',
+    },
+    'vadhula_grihya_sutra': {
+        'source': 'gRhyam/vadhula_grihya_sutra/vadhula_grihya_sutra.md',
+        'levels': [{'restart': '१'}],
+        'verses': NUMBERED,
+        'strip': False,
+        'ref': 'vadhula_grihya_sutra', 'key': 'ref',
+    },
+    'varaha_grihya_sutra': {
+        'source': 'gRhyam/varaha_grihya_sutra/varaha_grihya_sutra.md',
+        'levels': [{'restart': '१'}],
+        'verses': NUMBERED,
+        'strip': False,
+        'ref': 'varaha_grihya_sutra', 'key': 'ref',
+    },
+    'gautama_dharma_sutra': {
+        'source': 'dharma_sutra/gautama_dharma_sutra/gautama_dharma_sutra.md',
+        'levels': [
+            {'closing': r':({numeral})\s*(?:\n|{end})', 'number': 'marker', 'tail': 'unknown'},
+            {'closing': r'>({numeral})\s*(?:\n|{end})', 'number': 'marker', 'tail': 'unknown'},
+        ],
+        # Split after every number followed by a space
+        'verses': {'end': r'(\d+)(?:\s|{end})', 'min_text': 0},
+        'ref': 'gautama_dharma_sutra', 'key': 'verse_number',
+    },
+    'vasishtha_dharma_sutra': {
+        'source': 'dharma_sutra/vasishtha_dharma_sutra/vasishtha_dharma_sutra.md',
+        'levels': [
+            {'closing': r'इति वासिष्ठधर्मशास्त्रे\s*.*?ऽध्यायः\s*(\d+)', 'number': 'marker'},
+        ],
+        'verses': {'end': r'(\d+)\s*\n', 'min_text': 0},
+        'ref': 'vasishtha_dharma_sutra', 'key': 'verse_number',
+    },
+    'AngIrasa-smRtiH': {
+        'source': 'smRtiH/AngIrasa-smRtiH/AngIrasa-smRtiH.md',
+        'verses': {'paragraph': r'^(.*)\s(\d+)$'},
+        'ref': 'AngIrasa-smRtiH', 'key': 'ref',
+    },
+    'brihaspati-smRtiH': {
+        'source': 'smRtiH/brihaspati-smriti/brihaspati_smriti.md',
+        'verses': {'paragraph': r'^(.*)\s(\d+)$'},
+        'ref': 'brihaspati-smRtiH', 'key': 'ref',
+    },
+    'devala-smRtiH': {
+        'source': 'smRtiH/devala_smriti/devala_smriti.md',
+        'verses': {'paragraph': r'^(.*)\s(\d+)$'},
+        'ref': 'devala-smRtiH', 'key': 'ref',
+    },
+    'naradeyadharmashartam': {
+        'source': 'smRtiH/naradeyadharmashartam/naradeyadharmashartam.md',
+        'levels': [{'restart': '१'}],
+        'verses': {'paragraph': r'^(.*?)\s*॥\s*(\d+)\s*॥$'},
+        'ref': 'naradeyadharmashartam', 'key': 'ref',
+    },
+    'vashishtha_smriti': {
+        'source': 'smRtiH/vashishtha_smriti/vasishtha_smriti.md',
+        'levels': [{'restart': '१'}],
+        'verses': dict(NUMBERED, clean=[
+            r'इति वासिष्ठे धर्मशास्त्रे\s*[^।]+।',   # closing line of the adhyaya
+            r'^.*ऽध्यायः\s*',                      # heading of the next one
+            r'^।\s*',
+        ]),
+        'strip': False,
+        'ref': 'vashishtha_smriti', 'key': 'ref',
+    },
+    'vishwamitra_smriti': {
+        'source': 'smRtiH/vishwamitra_smriti/vishvamitra_smriti.md',
+        'levels': [{'restart': '१'}],
+        'verses': {'paragraph': r'^(.*)\s(\d+)$'},
+        'ref': 'vishwamitra_smriti', 'key': 'ref',
+    },
+    'yogadeepika': {
+        'source': 'smRtiH/yogadeepika/yogadeepika.md',
+        'levels': [{'closing': r'इति योगदीपिकायां', 'tail': True}],
+        # Drop the patala heading in front of a chapter's first verse
+        'verses': {'end': r'॥\s*(\d+)\s*॥', 'min_text': 0, 'clean': [r'^[\s\S]*पटलः']},
+        'ref': 'yogadeepika', 'key': 'ref',
+    },
+}
+
+_segmenters = {}
+
+def get_segmenter(name):
+    """The compiled spec for a text, compiled on first use."""
+    if name not in _segmenters:
+        _segmenters[name] = compile_spec(SPECS[name])
+    return _segmenters[name]
+
+def segment_file(name, md_file=None, clean=True):
+    """
+    Segments a text's markdown file with its spec.
+
+    Args:
+        name (str): Key of SPECS.
+        md_file (str): The markdown file (default: the spec's source in this repository).
+        clean (bool): Apply the spec's verse text cleanup.
+
+    Returns:
+        list: {'verse', 'ref' or 'verse_number'} dicts.
+    """
+    md_file = md_file or os.path.join(REPO_DIR, SPECS[name]['source'])
+    with open(md_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+    return get_segmenter(name).segment(text, clean=clean)
+
+def formatted(verses):
+    """Verses with their refs formatted as ref_format_script.py writes them to output.json."""
+    from ref_format_script import replace_english_name, replace_hindi_numerals
+    result = []
+    for verse in verses:
+        ref = verse.get('ref', verse.get('verse_number'))
+        result.append({'verse': verse['verse'], 'ref': replace_english_name(replace_hindi_numerals(ref))})
+    return result
+
+def check_parity(names):
+    """
+    Compares each spec's output with the text's committed output.json.
+
+    Returns:
+        int: Number of texts whose verses differ.
+    """
+    failed = 0
+    for name in names:
+        spec = SPECS[name]
+        expected_file = os.path.join(REPO_DIR, os.path.dirname(spec['source']), 'output.json')
+        with open(expected_file, 'r', encoding='utf-8') as f:
+            expected = [{'verse': verse['verse'], 'ref': verse['ref']} for verse in json.load(f)]
+        start = time.perf_counter()
+        verses = segment_file(name)
+        elapsed = time.perf_counter() - start
+        actual = formatted(verses)
+        if spec['ref'] is None:
+            # output.json's refs were prefixed by hand
+            prefix = expected[0]['ref'].split('->', 1)[0] if expected and '->' in expected[0]['ref'] else None
+            if prefix:
+                actual = [dict(verse, ref=f"{prefix}->{verse['ref']}") for verse in actual]
+        same = sum(a == b for a, b in zip(actual, expected))
+        if same == len(expected) == len(actual):
+            print(f"  {name}: {len(actual)} verses identical ({elapsed * 1000:.1f} ms)")
+            continue
+        failed += 1
+        print(f"  {name}: {same}/{len(expected)} verses identical, {len(actual)} segmented")
+        for a, b in zip(actual, expected):
+            if a != b:
+                print(f"    expected {json.dumps(b, ensure_ascii=False)[:160]}")
+                print(f"    got      {json.dumps(a, ensure_ascii=False)[:160]}")
+                break
+    print(f"Parity: {len(names) - failed}/{len(names)} texts match their output.json")
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Segment the sutra and smriti texts with their specs.")
+    parser.add_argument("names", nargs="*", help=f"Texts to segment (default: all): {', '.join(SPECS)}")
+    parser.add_argument("--check", action="store_true", help="Compare with each text's output.json instead of writing")
+    parser.add_argument("--output", default=None, help="Write the verses of a single text to this file")
+    args = parser.parse_args()
+
+    names = args.names or list(SPECS)
+    unknown = [name for name in names if name not in SPECS]
+    if unknown:
+        raise SystemExit(f"No spec for {', '.join(unknown)}")
+    if args.check:
+        raise SystemExit(1 if check_parity(names) else 0)
+    for name in names:
+        verses = segment_file(name)
+        output_file = args.output if args.output and len(names) == 1 else os.path.join(
+            REPO_DIR, os.path.dirname(SPECS[name]['source']), 'output.json')
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(formatted(verses), f, ensure_ascii=False, indent=4)
+        print(f"{name}: {len(verses)} verses saved to {output_file}")
@@ -0,0 +1,72 @@
+import os
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from driver_pool import load_page
+
+# In-browser extraction of a page's verse container.
+#
+# Instead of pulling the whole driver.page_source over the WebDriver protocol and
+# re-parsing it with BeautifulSoup, CONTENT_SCRIPT runs inside the loaded page,
+# finds the same elements the Python extractors look for and returns only the
+# heading and the container's text. The text is built the way BeautifulSoup's
+# get_text(separator='\n', strip=True) builds it (every text node, stripped,
+# empty ones dropped, joined by newlines; script/style text skipped), so the
+# existing cleanup and verse splitting produce the same verses.
+#
+# Environment variables:
+#   BROWSER_EXTRACT   set to 1 to extract Selenium-loaded pages in the browser
+#                     (pages extracted this way are not written to the page archive)
+
+CONTENT_SCRIPT = r"""
+const SKIP = new Set(['SCRIPT', 'STYLE', 'TEMPLATE']);
+function textNodes(root) {
+    const walker = document.createTreeWalker(root, NodeFilter.SHOW_TEXT, {
+        acceptNode: node => SKIP.has(node.parentNode.nodeName) ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT
+    });
+    const nodes = [];
+    let node;
+    while ((node = walker.nextNode())) nodes.push(node);
+    return nodes;
+}
+function strippedText(root, separator) {
+    return textNodes(root).map(node => node.nodeValue.trim()).filter(text => text).join(separator);
+}
+
+// Heading: the first h2, else the first h1, else the title
+const headingTag = document.querySelector('h2') || document.querySelector('h1') || document.querySelector('title');
+const heading = headingTag ? strippedText(headingTag, '') : null;
+
+// Content: the first div (in document order) whose text contains a danda, which
+// is the outermost div around the first text node that contains one
+let container = null;
+const first = textNodes(document.documentElement).find(node => node.nodeValue.includes('॥'));
+for (let element = first ? first.parentNode : null; element; element = element.parentNode) {
+    if (element.nodeName === 'DIV') container = element;
+}
+return {heading: heading, text: container ? strippedText(container, '\n') : null};
+"""
+
+def use_browser_extraction():
+    """True when BROWSER_EXTRACT=1 asks for Selenium-loaded pages to be extracted in the browser."""
+    return os.environ.get('BROWSER_EXTRACT', '') not in ('', '0')
+
+def extract_content_in_browser(driver):
+    """
+    Runs CONTENT_SCRIPT in the page the driver has loaded.
+
+    Returns:
+        tuple: (heading, body_text). heading is whitespace-normalized and
+               "Unknown Heading" when the page has no h2/h1/title; body_text is
+               None when no div contains a verse marker.
+    """
+    result = driver.execute_script(CONTENT_SCRIPT) or {}
+    heading = result.get('heading')
+    heading = ' '.join(heading.split()) if heading is not None else "Unknown Heading"
+    return heading, result.get('text')
+
+def load_page_content(driver, url):
+    """Loads a URL (paced by the rate limiter) and returns extract_content_in_browser()'s (heading, body_text)."""
+    load_page(driver, url)
+    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+    return extract_content_in_browser(driver)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import os
+import time
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from filter_urls import USER_AGENT, read_urls_csv, write_filtered_csv, report_throughput, setup_filter_driver
+from scrape_content import extract_verses_from_page_source, save_batch
+from stream_classifier import DEVANAGARI_PATTERN, SCRIPT_PATTERN, has_verse_marker
+from driver_pool import load_page
+from page_archive import archive_page
+from size_scheduler import record_page_size
+from rate_limiter import get_limiter
+from replay_server import rewrite_url
+
+def classify_and_extract_html(html, url):
+    """
+    Classifies one page body and, if it is a verse page, extracts its verses
+    from the same body. The marker is looked for in the parsed, visible text,
+    as filter_urls.py's Selenium check sees it.
+
+    Returns:
+        tuple: (status, verses) where status is 'match', 'no_match' or 'needs_js'.
+    """
+    if not has_verse_marker(html):
+        if not DEVANAGARI_PATTERN.search(html) and SCRIPT_PATTERN.search(html):
+            return 'needs_js', None
+        return 'no_match', None
+    return 'match', extract_verses_from_page_source(html, url)
+
+def keep_fetched_page(url, html, status, duration):
+    """
+    Archives a page fetched over HTTP and records its size. Blocking work (gzip,
+    file and SQLite writes), so the asyncio fetchers run it in a thread; a
+    failure is reported and never stops the crawl.
+    """
+    try:
+        archive_page(url, html, 'http', status=status, duration=duration)
+        record_page_size(url, html)
+    except Exception as e:
+        print(f"  [WARNING could not archive {url}: {type(e).__name__} - {e}]")
+
+def keep_and_classify(url, html, status, duration):
+    """Worker thread: keep_fetched_page() followed by classify_and_extract_html()."""
+    keep_fetched_page(url, html, status, duration)
+    return classify_and_extract_html(html, url)
+
+async def fetch_and_process(session, semaphore, url):
+    """
+    Fetches one URL, then archives it and runs classification + extraction on
+    the body in a worker thread.
+    """
+    limiter = get_limiter()
+    fetch_url = rewrite_url(url)
+    async with semaphore:
+        await limiter.wait_async(fetch_url)
+        start = time.monotonic()
+        status = retry_after = None
+        try:
+            async with session.get(fetch_url) as response:
+                status = response.status
+                retry_after = response.headers.get('Retry-After')
+                response.raise_for_status()
+                body = await response.read()
+        except Exception as e:
+            print(f"[ERROR fetching {url}: {type(e).__name__} - {e}]")
+            return url, 'error', None
+        finally:
+            limiter.record(fetch_url, time.monotonic() - start, status, retry_after)
+
+    html = body.decode('utf-8', errors='replace')
+    try:
+        status, verses = await asyncio.to_thread(keep_and_classify, url, html, status, time.monotonic() - start)
+    except Exception as e:
+        print(f"[ERROR processing {url}: {type(e).__name__} - {e}]")
+        return url, 'error', None
+    return url, status, verses
+
+async def process_all_async(urls, concurrency):
+    """Fetches every URL exactly once and returns {url: (status, verses)}."""
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=30)
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {}
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers={'User-Agent': USER_AGENT}) as session:
+        tasks = [fetch_and_process(session, semaphore, url) for url in urls]
+        for done, future in enumerate(asyncio.as_completed(tasks), start=1):
+            url, status, verses = await future
+            results[url] = (status, verses)
+            found = f", {len(verses)} verses" if verses else ""
+            print(f"Processed {done}/{len(urls)}: {url} [{status.upper()}{found}]")
+
+    return results
+
+def process_with_browser(urls, results):
+    """Loads pages that need JavaScript in Chrome and classifies/extracts the rendered source."""
+    print(f"\n{len(urls)} pages need JavaScript, loading them with Selenium...")
+    driver = None
+    try:
+        driver = setup_filter_driver()
+        for url in urls:
+            try:
+                start = time.monotonic()
+                load_page(driver, url)
+                WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+                page_source = driver.page_source
+                archive_page(url, page_source, 'selenium', duration=time.monotonic() - start)
+                record_page_size(url, page_source)
+                status, verses = classify_and_extract_html(page_source, url)
+                # The browser already rendered the page, so don't ask for it again
+                results[url] = ('no_match' if status == 'needs_js' else status, verses)
+            except TimeoutException:
+                print(f"[TIMEOUT waiting for body on {url}]")
+                results[url] = ('error', None)
+            except Exception as e:
+                print(f"[ERROR processing {url}: {type(e).__name__} - {e}]")
+                results[url] = ('error', None)
+    except Exception as e:
+        print(f"A critical error occurred during the Selenium fallback: {e}")
+    finally:
+        if driver:
+            print("Closing WebDriver...")
+            driver.quit()
+
+def classify_and_extract_urls(urls, concurrency=20):
+    """
+    Fetches every URL once and classifies/extracts it, using Chrome only for
+    pages that need JavaScript.
+
+    Returns:
+        dict: {url: (status, verses)}
+    """
+    results = asyncio.run(process_all_async(urls, concurrency))
+    js_urls = [url for url in urls if results.get(url, ('error', None))[0] == 'needs_js']
+    if js_urls:
+        process_with_browser(js_urls, results)
+    return results
+
+def write_outputs(urls, results, filtered_csv_file, output_dir, output_prefix="output", batch_size=100):
+    """
+    Writes filtered_urls.csv and the batch JSON files for classified URLs,
+    in input order, exactly like filter_urls.py + scrape_content.py.
+
+    Returns:
+        tuple: (number of verse pages, number of pages with extracted verses)
+    """
+    filtered_urls = [url for url in urls if results.get(url, ('error', None))[0] == 'match']
+    write_filtered_csv(filtered_urls, filtered_csv_file)
+
+    total_batches = (len(filtered_urls) + batch_size - 1) // batch_size
+    total_processed = 0
+    for batch_num in range(total_batches):
+        batch_verses = []
+        for url in filtered_urls[batch_num * batch_size:(batch_num + 1) * batch_size]:
+            verses = results[url][1]
+            if verses is not None:
+                batch_verses.extend(verses)
+                total_processed += 1
+        if batch_verses:
+            save_batch(batch_verses, output_dir, output_prefix, batch_num + 1)
+    return len(filtered_urls), total_processed
+
+def classify_and_extract(input_csv_file, filtered_csv_file="filtered_urls.csv", output_prefix="output",
+                         output_dir="output_files", concurrency=20, batch_size=100):
+    """
+    Single-fetch replacement for filter_urls.py + scrape_content.py.
+
+    Every URL is downloaded once; verse pages are detected with the same
+    '॥ n ॥' check as filter_urls.py and extracted from the same body with the
+    scrape_content.py logic. Writes filtered_urls.csv and the output-N.json
+    batches (batches of 100 filtered URLs, in input order) just like the two
+    separate stages.
+
+    Args:
+        input_csv_file (str): CSV of candidate URLs (e.g. shiva_document_links.csv).
+        filtered_csv_file (str): Where to write the verse-page URLs.
+        output_prefix (str): Prefix for the batch JSON files.
+        output_dir (str): Directory for the batch JSON files.
+        concurrency (int): Maximum number of concurrent HTTP requests.
+        batch_size (int): Filtered URLs per batch file.
+    """
+    print(f"\n--- Classifying and extracting from '{input_csv_file}' in one pass ---")
+    urls = read_urls_csv(input_csv_file)
+    if not urls:
+        print("No valid URLs found in the input file.")
+        return False
+
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+    except Exception as e:
+        print(f"Error creating output directory '{output_dir}': {e}")
+        return False
+
+    print(f"Found {len(urls)} URLs to process (concurrency={concurrency}).")
+    start_time = time.time()
+    results = classify_and_extract_urls(urls, concurrency)
+
+    report_throughput("Classify + extract", len(urls), start_time)
+    get_limiter().report()
+
+    # Same outputs as the two-stage pipeline, in input order
+    filtered_count, total_processed = write_outputs(urls, results, filtered_csv_file, output_dir, output_prefix, batch_size)
+    total_batches = (filtered_count + batch_size - 1) // batch_size
+    print(f"\nProcessed {total_processed} URLs successfully across {total_batches} batches.")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Filter and extract verses with a single fetch per URL.")
+    parser.add_argument("--input", default="shiva_document_links.csv", help="CSV of candidate URLs")
+    parser.add_argument("--concurrency", type=int, default=20,
+                        help="Maximum concurrent requests (default: 20)")
+    args = parser.parse_args()
+
+    if not classify_and_extract(args.input, concurrency=args.concurrency):
+        raise SystemExit(1)
+    print("Classify-and-extract process finished.")
@@ -0,0 +1,168 @@
+import json
+import sqlite3
+import threading
+import time
+from url_dedupe import UrlDeduper, canonicalize_url
+
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+
+class CrawlFrontier:
+    """
+    Persistent per-URL crawl state backed by a local SQLite file.
+
+    Pages are keyed by their canonical URL, so http/https, fragment and
+    trailing-slash variants of a page are extracted once. Each page has a
+    state (pending, in_flight, done, failed) and, once done, the verses
+    extracted from it. Each state change is committed immediately, so a crash
+    or a hung browser loses at most the URL that was in flight, and a
+    restarted run picks up exactly where the previous one stopped.
+
+    The current input list is stored separately, row by row as given
+    (position, URL as written, page key), and replaced by every seed(). Only
+    its pages are processed and written out, in its order and with each row's
+    own URL as document_link, so the batches match an uninterrupted run over
+    that input even when the file held pages from an earlier, different list.
+
+    Args:
+        path (str): SQLite file holding the frontier.
+        max_attempts (int): Failed URLs are retried on resume until they have
+                            been attempted this many times.
+    """
+
+    def __init__(self, path="crawl_frontier.sqlite", max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS frontier ('
+            ' url TEXT PRIMARY KEY, position INTEGER NOT NULL, state TEXT NOT NULL,'
+            ' attempts INTEGER NOT NULL DEFAULT 0, verses TEXT, error TEXT, updated_at REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS frontier_state ON frontier (state, position)')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS inputs (position INTEGER PRIMARY KEY, url TEXT NOT NULL, page TEXT NOT NULL)'
+        )
+        self._db.commit()
+        self._seen = None
+
+    def _is_known(self, url):
+        return self._db.execute('SELECT 1 FROM frontier WHERE url = ?', (url,)).fetchone() is not None
+
+    def _seen_urls(self):
+        """
+        Bloom filter over the stored URLs, confirmed against the table, so
+        seeding never loads the whole frontier into memory.
+        """
+        if self._seen is None:
+            count = self._db.execute('SELECT COUNT(*) FROM frontier').fetchone()[0]
+            self._seen = UrlDeduper(capacity=max(100_000, count * 2), confirm=self._is_known)
+            for (url,) in self._db.execute('SELECT url FROM frontier'):
+                self._seen.remember(url)
+        return self._seen
+
+    def seed(self, urls):
+        """
+        Makes urls the current input list and adds the pages that aren't known
+        yet as pending; known pages keep their state. Returns the number added.
+        """
+        now = time.time()
+        added = 0
+        with self._lock:
+            seen = self._seen_urls()
+            offset = self._db.execute('SELECT COALESCE(MAX(position) + 1, 0) FROM frontier').fetchone()[0]
+            self._db.execute('DELETE FROM inputs')
+            for position, url in enumerate(urls):
+                page = canonicalize_url(url)
+                self._db.execute('INSERT INTO inputs (position, url, page) VALUES (?, ?, ?)', (position, url, page))
+                if seen.add(url) is None:
+                    continue
+                self._db.execute(
+                    'INSERT INTO frontier (url, position, state, updated_at) VALUES (?, ?, ?, ?)',
+                    (page, offset + added, PENDING, now),
+                )
+                added += 1
+            self._db.commit()
+        return added
+
+    def reset(self):
+        """Forgets all state so the next run starts from scratch."""
+        with self._lock:
+            self._db.execute('DELETE FROM frontier')
+            self._db.execute('DELETE FROM inputs')
+            self._db.commit()
+            self._seen = None
+
+    def recover(self):
+        """Puts URLs left in flight by a crashed run back to pending; returns how many."""
+        with self._lock:
+            cursor = self._db.execute(
+                'UPDATE frontier SET state = ?, updated_at = ? WHERE state = ?', (PENDING, time.time(), IN_FLIGHT)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def pending(self):
+        """
+        URLs of the current input still to do (pending, or failed with attempts
+        left), in input order, each page once under its first row's URL.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT inputs.url FROM inputs JOIN frontier ON frontier.url = inputs.page'
+                ' WHERE (frontier.state = ? OR (frontier.state = ? AND frontier.attempts < ?))'
+                ' AND inputs.position = (SELECT MIN(position) FROM inputs AS first WHERE first.page = inputs.page)'
+                ' ORDER BY inputs.position',
+                (PENDING, FAILED, self.max_attempts),
+            ).fetchall()
+        return [url for (url,) in rows]
+
+    def _update(self, url, assignments, values):
+        with self._lock:
+            self._db.execute(f'UPDATE frontier SET {assignments}, updated_at = ? WHERE url = ?',
+                             (*values, time.time(), canonicalize_url(url)))
+            self._db.commit()
+
+    def mark_in_flight(self, url):
+        self._update(url, 'state = ?, attempts = attempts + 1', (IN_FLIGHT,))
+
+    def mark_done(self, url, verses):
+        self._update(url, 'state = ?, verses = ?, error = NULL', (DONE, json.dumps(verses, ensure_ascii=False)))
+
+    def mark_failed(self, url, error):
+        self._update(url, 'state = ?, error = ?', (FAILED, error))
+
+    def counts(self):
+        """Returns {state: number of pages} over the current input, for progress reporting."""
+        with self._lock:
+            return dict(self._db.execute(
+                'SELECT state, COUNT(*) FROM frontier WHERE url IN (SELECT page FROM inputs) GROUP BY state'
+            ).fetchall())
+
+    def batches(self, batch_size):
+        """
+        Yields (batch_num, verses) for every batch of the current input,
+        numbered from 1 by input position, with the verses of its done rows in
+        input order. A row listed twice gets its verses twice, and each verse's
+        document_link is the URL as the row gives it.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT inputs.position, inputs.url, frontier.verses FROM inputs'
+                ' JOIN frontier ON frontier.url = inputs.page WHERE frontier.state = ? ORDER BY inputs.position',
+                (DONE,),
+            ).fetchall()
+        batch_verses = {}
+        for position, url, verses in rows:
+            verses = [dict(verse, document_link=url) if 'document_link' in verse else verse
+                      for verse in json.loads(verses)]
+            batch_verses.setdefault(position // batch_size + 1, []).extend(verses)
+        for batch_num in sorted(batch_verses):
+            yield batch_num, batch_verses[batch_num]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin, urlsplit
+from classify_and_extract import classify_and_extract_urls, write_outputs
+from process_verses import combine_outputs
+from size_scheduler import balance_shards, estimate_sizes
+from scrape_urls import extract_listing_links, fetch_listing_static, fetch_listing_with_browser, write_links_csv
+from url_dedupe import UrlDeduper, canonicalize_url, dedupe_urls
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from html_parse import parse_html
+from rate_limiter import get_limiter, report_combined, use_rate_share
+
+SITE_ROOT = "https://sanskritdocuments.org/"
+
+def section_url(section):
+    """Turns 'doc_shiva' (or a full URL) into the section's listing URL."""
+    if section.startswith('http'):
+        return canonicalize_url(section if section.endswith('/') else section + '/')
+    return canonicalize_url(urljoin(SITE_ROOT, section.strip('/') + '/'))
+
+def section_name(root_url):
+    """'https://sanskritdocuments.org/doc_shiva/' -> 'doc_shiva'"""
+    return urlsplit(root_url).path.strip('/').split('/')[-1] or 'site'
+
+def extract_section_links(page_source, root_url):
+    """
+    Finds the document links on a section listing.
+
+    Uses the 'li.devanagari' listing layout when the page has it, otherwise
+    every .html link below the section root.
+    """
+    links = extract_listing_links(page_source, root_url)
+    if links is not None:
+        return links
+
+    soup = parse_html(page_source)
+    links = []
+    seen = UrlDeduper(capacity=100_000)
+    for anchor in soup.find_all('a', href=True):
+        url = canonicalize_url(urljoin(root_url, anchor['href']))
+        if url.startswith(root_url) and url.endswith('.html') and seen.add(url) is not None:
+            links.append(url)
+    return links
+
+def discover_section(root_url):
+    """
+    Returns the document URLs of one section, fetching the listing over plain
+    HTTP and only loading it in Chrome if that fails.
+    """
+    page_source = fetch_listing_static(root_url)
+    links = extract_section_links(page_source, root_url) if page_source is not None else []
+    if not links:
+        print(f"No links in the served HTML of {root_url}, loading it in the browser...")
+        page_source = fetch_listing_with_browser(root_url)
+        links = extract_section_links(page_source, root_url) if page_source is not None else []
+    return links
+
+def crawl_shard(urls, concurrency, workers=1):
+    """
+    Worker process: classify and extract one shard of documents with a
+    1/workers share of the per-host rate.
+
+    Returns:
+        tuple: ({url: (status, verses)}, the worker's rate limiter stats)
+    """
+    if workers > 1:
+        use_rate_share(workers)
+    return classify_and_extract_urls(urls, concurrency), get_limiter().stats()
+
+def crawl_sections(sections, output_root="sections", workers=4, concurrency=10, batch_size=100, longest_first=False):
+    """
+    Harvests whole site sections with the shiva filter and extract stages.
+
+    Every section's listing is scraped for document links, then all documents
+    (from every section) are dealt round-robin to worker processes, each of which
+    fetches its shard once over asyncio, keeps the verse pages and extracts them.
+    The workers share one per-host budget: each gets 1/workers of the
+    RATE_LIMIT_* rates and of the concurrent requests.
+    Each section gets its own directory with the same files as the shiva
+    pipeline: document_links.csv, filtered_urls.csv, output_files/output-N.json
+    and output.json.
+
+    Args:
+        sections (list): Section roots such as 'doc_shiva', or listing URLs.
+        output_root (str): Directory that receives one sub-directory per section.
+        workers (int): Worker processes to spread the documents across.
+        concurrency (int): Concurrent requests in total, split across the workers.
+        batch_size (int): Filtered URLs per batch file.
+        longest_first (bool): Split the documents into shards of similar total
+                              page size, biggest pages first, instead of
+                              round-robin (see size_scheduler.py).
+    """
+    start_time = time.time()
+    section_links = {}
+    for section in sections:
+        root_url = section_url(section)
+        print(f"\n--- Discovering documents in {root_url} ---")
+        links = discover_section(root_url)
+        name = section_name(root_url)
+        section_dir = os.path.join(output_root, name)
+        os.makedirs(section_dir, exist_ok=True)
+        if links:
+            write_links_csv(links, os.path.join(section_dir, "document_links.csv"))
+        print(f"Found {len(links)} documents in {name}")
+        section_links[name] = links
+
+    # Deal documents out round-robin so every worker gets a similar mix of sections
+    all_urls = dedupe_urls([url for links in section_links.values() for url in links])
+    if not all_urls:
+        print("No documents found.")
+        return False
+    workers = max(1, min(workers, len(all_urls)))
+    if longest_first:
+        shards = balance_shards(all_urls, estimate_sizes(all_urls), workers)
+    else:
+        shards = [all_urls[i::workers] for i in range(workers)]
+    shard_concurrency = max(1, -(-concurrency // workers))
+    print(f"\n--- Processing {len(all_urls)} documents with {workers} workers "
+          f"({shard_concurrency} concurrent requests each) ---")
+
+    results = {}
+    worker_stats = []
+    try:
+        if workers == 1:
+            shard_results, stats = crawl_shard(shards[0], shard_concurrency)
+            results.update(shard_results)
+            worker_stats.append(stats)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for shard_results, stats in executor.map(crawl_shard, shards, [shard_concurrency] * workers,
+                                                         [workers] * workers):
+                    results.update(shard_results)
+                    worker_stats.append(stats)
+    except Exception as e:
+        print(f"A critical error occurred while crawling: {e}")
+        return False
+    report_combined(worker_stats)
+
+    for name, links in section_links.items():
+        if not links:
+            continue
+        print(f"\n--- Writing {name} ---")
+        section_dir = os.path.join(output_root, name)
+        output_dir = os.path.join(section_dir, "output_files")
+        os.makedirs(output_dir, exist_ok=True)
+        filtered_count, processed = write_outputs(links, results, os.path.join(section_dir, "filtered_urls.csv"),
+                                                  output_dir, batch_size=batch_size)
+        if processed:
+            combine_outputs(output_dir, os.path.join(section_dir, "output.json"))
+        print(f"{name}: {len(links)} documents, {filtered_count} verse pages, {processed} extracted")
+
+    elapsed = time.time() - start_time
+    print(f"\nCrawled {len(all_urls)} documents from {len(section_links)} sections in {elapsed:.2f}s "
+          f"({len(all_urls) / elapsed:.2f} pages/sec)")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Harvest whole sanskritdocuments.org sections with the shiva pipeline.")
+    parser.add_argument("sections", nargs="+", help="Section roots, e.g. doc_shiva doc_ganesha doc_z_misc_major_works")
+    parser.add_argument("--output-root", default="sections", help="Directory for the per-section outputs (default: sections)")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes (default: 4)")
+    parser.add_argument("--concurrency", type=int, default=10,
+                        help="Concurrent requests in total, split across the workers (default: 10)")
+    parser.add_argument("--longest-first", action="store_true",
+                        help="Balance the workers by page size, biggest pages first")
+    args = parser.parse_args()
+
+    if not crawl_sections(args.sections, args.output_root, args.workers, args.concurrency,
+                          longest_first=args.longest_first):
+        raise SystemExit(1)
+    print("Section crawl finished.")
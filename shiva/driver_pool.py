@@ -0,0 +1,305 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rate_limiter import get_limiter
+from replay_server import SITE_HOSTS, rewrite_url
+
+# Environment variables:
+#   LEAN_BROWSER   set to 1 to start every Chrome (serial, pooled, filtering and
+#                  listing drivers) with the lean profile from chrome_options()
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Requests a lean browser never makes: images, stylesheets and fonts
+LEAN_BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.bmp',
+    '*.css', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+]
+
+def use_lean_browser():
+    """True when LEAN_BROWSER=1 asks for the lean browser profile."""
+    return os.environ.get('LEAN_BROWSER', '') not in ('', '0')
+
+def allowed_hosts():
+    """Hosts a lean browser may contact: the site itself and the replay server, if one is set."""
+    hosts = list(SITE_HOSTS)
+    base_url = os.environ.get('SCRAPER_BASE_URL')
+    if base_url:
+        hosts.append(urlsplit(base_url).hostname)
+    return hosts
+
+def chrome_options(headless=False, lean=False):
+    """
+    Chrome options shared by every driver in the pipeline.
+
+    Args:
+        headless (bool): Run without a window.
+        lean (bool): Lean profile: headless, extensions off, images off, every
+                     third-party host unresolvable and an eager page-load
+                     strategy (driver.get returns at DOMContentLoaded). Images,
+                     stylesheets and fonts are blocked by create_driver().
+    """
+    options = Options()
+    if headless or lean:
+        options.add_argument("--headless=new")
+        options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument(f'user-agent={USER_AGENT}')
+    if lean:
+        options.add_argument("--disable-extensions")
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        # Trackers, ad networks and web fonts never resolve
+        rules = ", ".join(["MAP * ~NOTFOUND"] + [f"EXCLUDE {host}" for host in allowed_hosts()])
+        options.add_argument(f"--host-resolver-rules={rules}")
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        options.page_load_strategy = 'eager'
+    return options
+
+def create_driver(headless=False, lean=None):
+    """
+    Starts Chrome with chrome_options().
+
+    Args:
+        headless (bool): Run without a window.
+        lean (bool): Use the lean profile; defaults to LEAN_BROWSER.
+    """
+    lean = use_lean_browser() if lean is None else lean
+    driver = webdriver.Chrome(options=chrome_options(headless, lean))
+    if lean:
+        # Request interception at the network layer (Chrome DevTools Protocol)
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URLS})
+    return driver
+
+def setup_headless_driver():
+    """Setup and return a headless Chrome WebDriver for pooled scraping."""
+    return create_driver(headless=True)
+
+def load_page(driver, url):
+    """
+    driver.get(url) paced by the shared per-host rate limiter.
+
+    Replaces the fixed time.sleep() politeness delays: the limiter waits only as
+    long as the host's current rate requires and learns from the load time.
+    The URL is redirected to the replay server when SCRAPER_BASE_URL is set.
+    """
+    url = rewrite_url(url)
+    with get_limiter().request(url):
+        driver.get(url)
+
+def compare_profiles(urls, headless=True):
+    """
+    Loads the URLs with the standard and the lean profile and prints the load
+    time of every page (driver.get until <body> is present) for both.
+    """
+    timings = {}
+    for lean in (False, True):
+        label = 'lean' if lean else 'standard'
+        driver = create_driver(headless=headless, lean=lean)
+        try:
+            times = []
+            for url in urls:
+                start = time.monotonic()
+                try:
+                    load_page(driver, url)
+                    WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+                    times.append(time.monotonic() - start)
+                except Exception as e:
+                    print(f"  [{label}] {url}: {type(e).__name__} - {e}")
+                    times.append(None)
+            timings[label] = times
+        finally:
+            quit_driver(driver)
+
+    print(f"\n{'page':<60} {'standard':>9} {'lean':>9}")
+    for url, standard, lean in zip(urls, timings['standard'], timings['lean']):
+        cells = [f"{value:8.2f}s" if value is not None else f"{'failed':>9}" for value in (standard, lean)]
+        print(f"{url[-60:]:<60} {cells[0]} {cells[1]}")
+    averages = {}
+    for label, times in timings.items():
+        loaded = [value for value in times if value is not None]
+        averages[label] = sum(loaded) / len(loaded) if loaded else None
+    if averages['standard'] and averages['lean']:
+        print(f"Average load time: {averages['standard']:.2f}s standard, {averages['lean']:.2f}s lean "
+              f"({averages['standard'] / averages['lean']:.1f}x)")
+
+def is_driver_alive(driver):
+    """Returns True if the browser behind the driver still answers commands."""
+    try:
+        driver.execute_script("return 1")
+        return True
+    except Exception:
+        return False
+
+def quit_driver(driver):
+    """Quits a driver, ignoring errors from a browser that already died."""
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+class _DriverSlot:
+    """One pool slot: a driver plus the number of pages it has loaded."""
+
+    def __init__(self, index):
+        self.index = index
+        self.driver = None
+        self.pages = 0
+
+class DriverPool:
+    """
+    A fixed pool of WebDrivers that URLs are spread across.
+
+    Each worker thread borrows a driver slot for one URL at a time. A driver is
+    recycled (quit and relaunched) after max_pages_per_driver pages to keep
+    Chrome's memory in check, and restarted if the browser crashes mid-page.
+    Results from map() come back in input order.
+
+    Args:
+        size (int): Number of drivers (and worker threads) in the pool.
+        max_pages_per_driver (int): Pages a driver loads before it is recycled.
+        driver_factory (callable): Returns a new WebDriver; defaults to headless Chrome.
+        attempts (int): Tries per URL when the browser crashes on it. Callers
+                        that count attempts themselves (the crawl frontier)
+                        pass 1 so each URL is tried once per call.
+    """
+
+    def __init__(self, size=4, max_pages_per_driver=50, driver_factory=setup_headless_driver, attempts=2):
+        self.size = size
+        self.max_pages_per_driver = max_pages_per_driver
+        self.attempts = attempts
+        self.driver_factory = driver_factory
+        self.restarts = 0
+        self.recycles = 0
+        self._lock = threading.Lock()
+        self._slots = queue.Queue()
+        for index in range(size):
+            self._slots.put(_DriverSlot(index))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _launch(self, slot):
+        """
+        Starts a driver for the slot; returns False (leaving the slot empty for
+        its next URL to try again) if Chrome fails to start.
+        """
+        try:
+            slot.driver = self.driver_factory()
+        except Exception as e:
+            print(f"  [Driver {slot.index} failed to start: {type(e).__name__} - {e}]")
+            slot.driver = None
+            return False
+        slot.pages = 0
+        return True
+
+    def _acquire(self):
+        slot = self._slots.get()
+        if slot.driver is None:
+            self._launch(slot)
+        return slot
+
+    def _release(self, slot):
+        slot.pages += 1
+        if slot.driver is not None and slot.pages >= self.max_pages_per_driver:
+            quit_driver(slot.driver)
+            slot.driver = None
+            with self._lock:
+                self.recycles += 1
+        self._slots.put(slot)
+
+    def _discard(self, slot):
+        """Quits a crashed driver; the slot's next user launches a new one."""
+        quit_driver(slot.driver)
+        slot.driver = None
+
+    def _restart(self, slot):
+        """Relaunches a crashed driver; returns False if Chrome didn't come back."""
+        self._discard(slot)
+        if not self._launch(slot):
+            return False
+        with self._lock:
+            self.restarts += 1
+        return True
+
+    def run(self, func, url):
+        """
+        Runs func(driver, url) on a pooled driver.
+
+        If the browser turns out to be dead after the call (it raised, or returned
+        an empty result), the driver is restarted and the URL retried, up to
+        self.attempts tries in all. After the last one the dead driver is only
+        quit (the slot's next URL launches a new one) and the last result,
+        None if func raised, is returned. If Chrome can't be started for the
+        URL (or restarted after a crash), the URL fails with None and the slot's
+        next URL tries to start it again, so map() still yields one result per
+        URL. Exceptions raised while the browser is still healthy are propagated.
+        """
+        slot = self._acquire()
+        try:
+            result = None
+            if slot.driver is None:
+                print(f"  [No browser for {url}, marking it failed]")
+                return None
+            for attempt in range(1, self.attempts + 1):
+                try:
+                    result = func(slot.driver, url)
+                except Exception:
+                    if is_driver_alive(slot.driver):
+                        raise
+                else:
+                    if result or is_driver_alive(slot.driver):
+                        return result
+                if attempt < self.attempts:
+                    print(f"  [Driver {slot.index} crashed on {url}, restarting (attempt {attempt})]")
+                    if not self._restart(slot):
+                        print(f"  [No browser for {url}, marking it failed]")
+                        return None
+                else:
+                    print(f"  [Driver {slot.index} crashed on {url}, giving up after {attempt} attempt(s)]")
+                    self._discard(slot)
+            return result
+        finally:
+            self._release(slot)
+
+    def map(self, func, urls):
+        """
+        Applies func(driver, url) to every URL across the pool.
+
+        Yields results lazily in the same order as urls, so callers can write
+        out a batch as soon as its last URL is done while the pool moves ahead.
+        """
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            yield from executor.map(lambda url: self.run(func, url), urls)
+
+    def close(self):
+        """Quits every driver in the pool."""
+        while not self._slots.empty():
+            slot = self._slots.get_nowait()
+            if slot.driver is not None:
+                quit_driver(slot.driver)
+                slot.driver = None
+        print(f"Driver pool closed ({self.recycles} recycled, {self.restarts} restarted).")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare page load times of the standard and lean Chrome profiles.")
+    parser.add_argument("urls", nargs="+", help="Pages to load with both profiles")
+    parser.add_argument("--show", action="store_true", help="Run the standard profile with a window, as the serial scrapers do")
+    args = parser.parse_args()
+    compare_profiles(args.urls, headless=not args.show)
@@ -1,24 +1,28 @@
+import argparse
+import asyncio
 import csv
-import re
+import os
 import time
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.chrome.options import Options
+from stream_classifier import VERSE_PATTERN, DEFAULT_BYTE_BUDGET, classify_url_async
+from driver_pool import create_driver, load_page
+from rate_limiter import get_limiter
 
-def filter_urls_by_verse_pattern(input_csv_file, output_csv_file):
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+def read_urls_csv(input_csv_file):
     """
-    Reads URLs from an input CSV, visits each URL, checks for a verse pattern (|| number ||),
-    and saves matching URLs to an output CSV.
+    Reads URLs from the first column of a CSV file with a 'URL' header.
 
     Args:
         input_csv_file (str): Path to the input CSV file containing URLs.
-        output_csv_file (str): Path to the output CSV file for filtered URLs.
+
+    Returns:
+        list: The URLs found in the file, or None if the file could not be read.
     """
-    print(f"\nStarting filtering process: Reading from '{input_csv_file}'")
-    urls_to_check = []
     try:
         with open(input_csv_file, 'r', newline='', encoding='utf-8') as infile:
             reader = csv.reader(infile)
@@ -30,16 +34,78 @@ def filter_urls_by_verse_pattern(input_csv_file, output_csv_file):
                     infile.seek(0)
             except StopIteration: # Handle empty file
                 print(f"Warning: Input file '{input_csv_file}' is empty or has no header.")
-                return # Cannot proceed if file is empty
-            
-            urls_to_check = [row[0] for row in reader if row and row[0].strip()] # Read URLs from the first column, ensure not empty
+                return None # Cannot proceed if file is empty
+
+            return [row[0] for row in reader if row and row[0].strip()] # Read URLs from the first column, ensure not empty
 
     except FileNotFoundError:
         print(f"Error: Input file '{input_csv_file}' not found.")
-        return
+        return None
     except Exception as e:
         print(f"Error reading input CSV '{input_csv_file}': {e}")
-        return
+        return None
+
+def write_filtered_csv(filtered_urls, output_csv_file):
+    """
+    Writes the filtered URLs to the output CSV file under a 'URL' header.
+
+    Args:
+        filtered_urls (list): URLs that matched the verse pattern.
+        output_csv_file (str): Path to the output CSV file for filtered URLs.
+    """
+    if filtered_urls:
+        print(f"\nFound {len(filtered_urls)} URLs matching the pattern.")
+        try:
+            with open(output_csv_file, 'w', newline='', encoding='utf-8') as outfile:
+                writer = csv.writer(outfile)
+                writer.writerow(['URL']) # Write header
+                writer.writerows([[link] for link in filtered_urls])
+            print(f"Successfully saved filtered URLs to '{output_csv_file}'")
+        except Exception as e:
+            print(f"Error writing output CSV '{output_csv_file}': {e}")
+    else:
+        print("\nNo URLs matched the specified verse pattern.")
+
+def report_throughput(label, page_count, start_time):
+    """Prints the elapsed time and pages/sec for a filtering run."""
+    elapsed = time.time() - start_time
+    rate = page_count / elapsed if elapsed > 0 else 0.0
+    print(f"{label}: checked {page_count} pages in {elapsed:.2f}s ({rate:.2f} pages/sec)")
+
+def setup_filter_driver():
+    """Setup and return the Chrome WebDriver used for filtering (lean profile with LEAN_BROWSER=1)."""
+    return create_driver()
+
+def check_url_with_driver(driver, url):
+    """
+    Loads a URL in the browser and checks the rendered body text for the verse pattern.
+
+    Args:
+        driver: Selenium WebDriver instance.
+        url (str): URL to check.
+
+    Returns:
+        bool: True if the rendered page contains a verse marker.
+    """
+    load_page(driver, url)
+    # Wait for body tag to ensure basic page load
+    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+
+    # More robust text extraction - combine sources
+    page_text = driver.find_element(By.TAG_NAME, 'body').text
+    return bool(VERSE_PATTERN.search(page_text))
+
+def filter_urls_by_verse_pattern(input_csv_file, output_csv_file):
+    """
+    Reads URLs from an input CSV, visits each URL, checks for a verse pattern (|| number ||),
+    and saves matching URLs to an output CSV.
+
+    Args:
+        input_csv_file (str): Path to the input CSV file containing URLs.
+        output_csv_file (str): Path to the output CSV file for filtered URLs.
+    """
+    print(f"\nStarting filtering process: Reading from '{input_csv_file}'")
+    urls_to_check = read_urls_csv(input_csv_file)
 
     if not urls_to_check:
         print("No valid URLs found in the input file to filter.")
@@ -47,37 +113,21 @@ def filter_urls_by_verse_pattern(input_csv_file, output_csv_file):
 
     print(f"Found {len(urls_to_check)} URLs to check.")
     filtered_urls = []
-    verse_pattern = re.compile(r'॥\s*\d+\s*॥') # Compile regex for efficiency
-
-    # Setup Chrome options
-    chrome_options = Options()
-    # chrome_options.add_argument("--headless") # Keep headless commented out for now
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+    start_time = time.time()
 
     driver = None
     try:
         print("Initializing WebDriver for filtering...")
-        driver = webdriver.Chrome(options=chrome_options)
-        
+        driver = setup_filter_driver()
+
         for i, url in enumerate(urls_to_check):
             print(f"Checking URL {i+1}/{len(urls_to_check)}: {url}", end=' ')
             try:
-                driver.get(url)
-                # Wait for body tag to ensure basic page load
-                WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-                
-                # More robust text extraction - combine sources
-                page_text = driver.find_element(By.TAG_NAME, 'body').text
-                
-                if verse_pattern.search(page_text):
+                if check_url_with_driver(driver, url):
                     print("[MATCH FOUND]")
                     filtered_urls.append(url)
                 else:
                     print("[No Match]")
-                
-                time.sleep(1) # 1-second delay between requests
 
             except TimeoutException:
                 print(f"[TIMEOUT waiting for body on {url}]")
@@ -94,24 +144,185 @@ def filter_urls_by_verse_pattern(input_csv_file, output_csv_file):
             print("Closing WebDriver...")
             driver.quit()
 
+    report_throughput("Selenium filter", len(urls_to_check), start_time)
+    get_limiter().report()
+
     # Write the filtered URLs to the output CSV file
-    if filtered_urls:
-        print(f"\nFound {len(filtered_urls)} URLs matching the pattern.")
+    write_filtered_csv(filtered_urls, output_csv_file)
+
+async def fetch_and_classify(session, semaphore, url, byte_budget):
+    """
+    Streams a single URL over the shared session and classifies it, stopping
+    the download as soon as a verse marker shows up in the page's visible text
+    (the text the Selenium filter checks, see stream_classifier.py).
+
+    Args:
+        session (aiohttp.ClientSession): Session holding the pooled connections.
+        semaphore (asyncio.Semaphore): Caps the number of requests in flight.
+        url (str): URL to check.
+        byte_budget (int): Maximum body bytes to read per page.
+
+    Returns:
+        tuple: (url, status, bytes_read) where status is 'match', 'no_match', 'needs_js' or 'error'.
+    """
+    async with semaphore:
         try:
-            with open(output_csv_file, 'w', newline='', encoding='utf-8') as outfile:
-                writer = csv.writer(outfile)
-                writer.writerow(['URL']) # Write header
-                writer.writerows([[link] for link in filtered_urls])
-            print(f"Successfully saved filtered URLs to '{output_csv_file}'")
+            scan = await classify_url_async(session, url, VERSE_PATTERN, byte_budget, visible=True)
         except Exception as e:
-            print(f"Error writing output CSV '{output_csv_file}': {e}")
-    else:
-        print("\nNo URLs matched the specified verse pattern.")
+            print(f"[ERROR processing {url}: {type(e).__name__} - {e}]")
+            return url, 'error', 0
+
+    if scan.matched:
+        return url, 'match', scan.bytes_read
+    if scan.needs_javascript():
+        return url, 'needs_js', scan.bytes_read
+    return url, 'no_match', scan.bytes_read
+
+async def classify_urls_async(urls, concurrency, byte_budget=DEFAULT_BYTE_BUDGET):
+    """
+    Classifies all URLs concurrently over keep-alive connections.
+
+    Args:
+        urls (list): URLs to check.
+        concurrency (int): Maximum number of requests in flight at once.
+        byte_budget (int): Maximum body bytes to read per page.
+
+    Returns:
+        tuple: (statuses, total_bytes) - mapping of URL to its classification
+               status, and the body bytes read across all pages.
+    """
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=30)
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = {}
+    total_bytes = 0
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers={'User-Agent': USER_AGENT}) as session:
+        tasks = [fetch_and_classify(session, semaphore, url, byte_budget) for url in urls]
+        for done, future in enumerate(asyncio.as_completed(tasks), start=1):
+            url, status, bytes_read = await future
+            statuses[url] = status
+            total_bytes += bytes_read
+            print(f"Checked {done}/{len(urls)}: {url} [{status.upper()}, {bytes_read / 1024:.1f} KB]")
+
+    return statuses, total_bytes
+
+def filter_urls_async(input_csv_file, output_csv_file, concurrency=20, byte_budget=DEFAULT_BYTE_BUDGET):
+    """
+    Asyncio variant of filter_urls_by_verse_pattern: streams pages concurrently,
+    stops each download at the first verse marker and only opens Selenium for
+    pages that need JavaScript to render their text, or whose Devanagari body
+    was cut off by the byte budget before a marker.
+
+    Args:
+        input_csv_file (str): Path to the input CSV file containing URLs.
+        output_csv_file (str): Path to the output CSV file for filtered URLs.
+        concurrency (int): Maximum number of concurrent HTTP requests.
+        byte_budget (int): Maximum body bytes to read per page.
+    """
+    print(f"\nStarting async filtering process: Reading from '{input_csv_file}'")
+    urls_to_check = read_urls_csv(input_csv_file)
+
+    if not urls_to_check:
+        print("No valid URLs found in the input file to filter.")
+        return
+
+    print(f"Found {len(urls_to_check)} URLs to check (concurrency={concurrency}).")
+    start_time = time.time()
+    statuses, total_bytes = asyncio.run(classify_urls_async(urls_to_check, concurrency, byte_budget))
+    print(f"Read {total_bytes / 1024:.1f} KB of page bodies ({total_bytes / len(urls_to_check) / 1024:.1f} KB/page)")
+
+    js_urls = [url for url in urls_to_check if statuses.get(url) == 'needs_js']
+    if js_urls:
+        print(f"\n{len(js_urls)} pages need JavaScript, checking them with Selenium...")
+        driver = None
+        try:
+            driver = setup_filter_driver()
+            for url in js_urls:
+                try:
+                    statuses[url] = 'match' if check_url_with_driver(driver, url) else 'no_match'
+                except TimeoutException:
+                    print(f"[TIMEOUT waiting for body on {url}]")
+                    statuses[url] = 'error'
+                except Exception as e:
+                    print(f"[ERROR processing {url}: {type(e).__name__} - {e}]")
+                    statuses[url] = 'error'
+        except Exception as e:
+            print(f"A critical error occurred during the Selenium fallback: {e}")
+        finally:
+            if driver:
+                print("Closing WebDriver...")
+                driver.quit()
+
+    report_throughput("Async filter", len(urls_to_check), start_time)
+    get_limiter().report()
+
+    # Keep the input order so the output matches the Selenium path
+    filtered_urls = [url for url in urls_to_check if statuses.get(url) == 'match']
+    write_filtered_csv(filtered_urls, output_csv_file)
+
+def compare_with_selenium(input_csv_file, concurrency=20, byte_budget=DEFAULT_BYTE_BUDGET, limit=None):
+    """
+    Parity check: classifies the same URLs with the async filter and with the
+    Selenium filter and prints every URL they disagree on.
+
+    Returns:
+        int: Number of URLs classified differently.
+    """
+    urls = (read_urls_csv(input_csv_file) or [])[:limit]
+    if not urls:
+        print("No valid URLs found in the input file to compare.")
+        return 0
+    statuses, _ = asyncio.run(classify_urls_async(urls, concurrency, byte_budget))
+    differ = 0
+    driver = setup_filter_driver()
+    try:
+        for url in urls:
+            try:
+                selenium_match = check_url_with_driver(driver, url)
+            except Exception as e:
+                print(f"[Selenium could not check {url}: {type(e).__name__} - {e}]")
+                continue
+            status = statuses.get(url)
+            if status == 'needs_js':
+                continue  # the async filter hands these to Selenium anyway
+            if (status == 'match') != selenium_match:
+                differ += 1
+                print(f"[DIFFERS] {url}: async {status}, Selenium {'match' if selenium_match else 'no_match'}")
+    finally:
+        driver.quit()
+    print(f"Async vs Selenium filter: {len(urls) - differ}/{len(urls)} URLs classified the same")
+    return differ
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Filter URLs that contain Sanskrit verses.")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Fetch pages concurrently over HTTP instead of one at a time in Chrome")
+    parser.add_argument("--concurrency", type=int, default=20,
+                        help="Maximum concurrent requests in async mode (default: 20)")
+    parser.add_argument("--byte-budget", type=int, default=DEFAULT_BYTE_BUDGET,
+                        help=f"Maximum body bytes read per page in async mode (default: {DEFAULT_BYTE_BUDGET})")
+    parser.add_argument("--compare-selenium", action="store_true",
+                        help="Classify the URLs with both filters and list the ones they disagree on (writes nothing)")
+    parser.add_argument("--limit", type=int, default=None, help="With --compare-selenium: check at most this many URLs")
+    parser.add_argument("--lean-browser", action="store_true",
+                        help="Start Chrome headless with images, CSS, fonts, extensions and third-party hosts "
+                             "blocked and an eager page load (same as LEAN_BROWSER=1)")
+    args = parser.parse_args()
+    if args.lean_browser:
+        os.environ['LEAN_BROWSER'] = '1'
+
     input_csv_file = "shiva_document_links.csv"
     filtered_output_file = "filtered_urls.csv"
-    
+
+    if args.compare_selenium:
+        raise SystemExit(1 if compare_with_selenium(input_csv_file, args.concurrency, args.byte_budget, args.limit) else 0)
+
     print("--- Filtering links by verse pattern ---")
-    filter_urls_by_verse_pattern(input_csv_file, filtered_output_file)
-    print("Filtering process finished.") 
\ No newline at end of file
+    if args.use_async:
+        filter_urls_async(input_csv_file, filtered_output_file, args.concurrency, args.byte_budget)
+    else:
+        filter_urls_by_verse_pattern(input_csv_file, filtered_output_file)
+    print("Filtering process finished.")
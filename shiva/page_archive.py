@@ -0,0 +1,148 @@
+import base64
+import gzip
+import hashlib
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+
+# WARC archive of every page the extraction stages fetch.
+#
+# Each page is written as a WARC/1.0 "resource" record (the HTML exactly as it
+# was parsed, i.e. the rendered page_source for Selenium loads) in its own gzip
+# member, appended to one .warc.gz file. Re-running extraction from the archive
+# needs no network or browser at all (see process_verses.py --reprocess).
+#
+# Archiving is off unless asked for: the file only ever grows, one record per
+# page fetched, so each run that wants one names it.
+#
+# Environment variables:
+#   PAGE_ARCHIVE   archive file to append to; 1 means page_archive.warc.gz in
+#                  the working directory (default: unset, no archiving)
+
+DEFAULT_ARCHIVE_FILE = "page_archive.warc.gz"
+
+def _payload_digest(payload):
+    return "sha1:" + base64.b32encode(hashlib.sha1(payload).digest()).decode('ascii')
+
+class PageArchive:
+    """
+    Appends fetched pages to a gzip-compressed WARC file.
+
+    Args:
+        path (str): The .warc.gz file to append to.
+    """
+
+    def __init__(self, path=DEFAULT_ARCHIVE_FILE):
+        self.path = path
+        self.records = 0
+        self._lock = threading.Lock()
+
+    def write(self, url, html, fetch_method, status=None, duration=None):
+        """
+        Archives one page.
+
+        Args:
+            url (str): The page URL (the original one, not a replay-server URL).
+            html (str): The HTML that extraction ran on.
+            fetch_method (str): How the page was fetched, e.g. 'selenium' or 'http'.
+            status (int): HTTP status, when known.
+            duration (float): Seconds the fetch took, when known.
+        """
+        payload = html.encode('utf-8')
+        headers = [
+            ("WARC-Type", "resource"),
+            ("WARC-Record-ID", f"<urn:uuid:{uuid.uuid4()}>"),
+            ("WARC-Date", datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')),
+            ("WARC-Target-URI", url),
+            ("WARC-Payload-Digest", _payload_digest(payload)),
+            ("Content-Type", "text/html; charset=utf-8"),
+            ("X-Fetch-Method", fetch_method),
+        ]
+        if status is not None:
+            headers.append(("X-HTTP-Status", str(status)))
+        if duration is not None:
+            headers.append(("X-Fetch-Duration", f"{duration:.3f}"))
+        headers.append(("Content-Length", str(len(payload))))
+
+        head = "WARC/1.0\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers) + "\r\n"
+        # One gzip member per record, so a crash can only truncate the last one
+        record = gzip.compress(head.encode('utf-8') + payload + b"\r\n\r\n")
+        with self._lock:
+            # Unbuffered append: the record goes out in one write(), so worker
+            # processes sharing the file can't interleave their records
+            with open(self.path, 'ab', buffering=0) as f:
+                f.write(record)
+            self.records += 1
+
+def read_records(path):
+    """
+    Yields (headers, html) for every record in a .warc.gz file, in file order.
+    A record cut short by a crash at the end of the file is skipped.
+    """
+    with gzip.open(path, 'rb') as f:
+        while True:
+            try:
+                line = f.readline()
+                if not line:
+                    return
+                if not line.startswith(b"WARC/"):
+                    continue
+                headers = {}
+                for line in iter(f.readline, b"\r\n"):
+                    if not line:
+                        raise EOFError("record header cut short")
+                    name, _, value = line.decode('utf-8').partition(':')
+                    headers[name.strip()] = value.strip()
+                length = int(headers.get('Content-Length', 0))
+                payload = f.read(length)
+                if len(payload) < length:
+                    raise EOFError("record payload cut short")
+                f.read(4)  # trailing \r\n\r\n
+            except (EOFError, gzip.BadGzipFile) as e:
+                print(f"Warning: stopped reading '{path}' at a damaged record ({e})")
+                return
+            yield headers, payload.decode('utf-8', errors='replace')
+
+def iter_latest_pages(path):
+    """
+    Yields (url, html) for the newest record of every URL in the archive.
+
+    The archive is read twice (once to find the newest record per URL, once to
+    yield it) so only one page body is held in memory at a time.
+    """
+    latest = {}
+    for number, (headers, _) in enumerate(read_records(path)):
+        url = headers.get('WARC-Target-URI')
+        if url:
+            latest[url] = number
+
+    wanted = {number: url for url, number in latest.items()}
+    for number, (headers, html) in enumerate(read_records(path)):
+        url = wanted.get(number)
+        if url is not None:
+            yield url, html
+
+_archive = None
+_archive_lock = threading.Lock()
+
+def get_archive():
+    """Returns the process-wide archive from PAGE_ARCHIVE, or None when archiving is off (the default)."""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            path = os.environ.get('PAGE_ARCHIVE', '')
+            if path == '1':
+                path = DEFAULT_ARCHIVE_FILE
+            _archive = PageArchive(path) if path not in ('', '0') else False
+        return _archive or None
+
+def archive_page(url, html, fetch_method, status=None, duration=None):
+    """Writes a page to the process-wide archive; archiving errors never stop a crawl."""
+    archive = get_archive()
+    if archive is None:
+        return
+    try:
+        archive.write(url, html, fetch_method, status=status, duration=duration)
+    except OSError as e:
+        print(f"  [WARNING could not archive {url}: {e}]")
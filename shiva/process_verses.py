@@ -1,19 +1,34 @@
 #!/usr/bin/env python3
+import argparse
 import os
 import json
 import csv
 import re
 import time
 import glob
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from multiprocessing.util import Finalize
 import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.chrome.options import Options
 from tqdm import tqdm
+from browser_extract import load_page_content, use_browser_extraction
+from driver_pool import DriverPool, create_driver, is_driver_alive, load_page, quit_driver, setup_headless_driver
+from crawl_frontier import CrawlFrontier, DONE, FAILED, PENDING
+from page_archive import archive_page, iter_latest_pages
+from size_scheduler import estimate_sizes, longest_first, record_page_size
+from stream_classifier import DEFAULT_BYTE_BUDGET, classify_url
+from url_dedupe import UrlDeduper
+from verse_extractor import PROCESS_VERSES as EXTRACTOR
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from html_parse import parse_html
+from http_cache import cached_get
+from itx_source import fetch_itx
+from rate_limiter import get_limiter, report_combined, use_rate_share
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -25,29 +40,38 @@ HEADERS = {
     'DNT': '1'
 }
 
+# Any verse danda marks a page as a verse page
+VERSE_MARKER = re.compile('॥')
+
 def setup_driver():
-    """Setup and return a configured Chrome WebDriver."""
-    chrome_options = Options()
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
-    return webdriver.Chrome(options=chrome_options)
+    """Setup and return a configured Chrome WebDriver (lean profile with LEAN_BROWSER=1)."""
+    return create_driver()
 
 def scrape_urls(base_url, output_file="all_urls.csv"):
-    """Scrape all URLs from the base URL."""
+    """
+    Scrape all URLs from the base URL.
+
+    Links are canonicalized (scheme, host case, fragments, tracking parameters,
+    trailing slashes) and each page is written once.
+    """
     print(f"\n--- Scraping URLs from {base_url} ---")
     
     try:
-        response = requests.get(base_url, headers=HEADERS)
+        response = cached_get(base_url, headers=HEADERS, listing=True)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text)
         
         # Find all links
         urls = []
+        seen = UrlDeduper(capacity=100_000)
         for link in soup.find_all('a', href=True):
             url = link['href']
             if url.startswith('http'):
-                urls.append(url)
+                url = seen.add(url)
+                if url is not None:
+                    urls.append(url)
+        if seen.duplicates:
+            print(f"Skipped {seen.duplicates} duplicate links")
         
         # Save URLs to CSV
         with open(output_file, 'w', newline='', encoding='utf-8') as f:
@@ -63,8 +87,13 @@ def scrape_urls(base_url, output_file="all_urls.csv"):
         print(f"Error scraping URLs: {e}")
         return False
 
-def filter_urls(input_file="all_urls.csv", output_file="filtered_urls.csv"):
-    """Filter URLs that contain Sanskrit verses."""
+def filter_urls(input_file="all_urls.csv", output_file="filtered_urls.csv", byte_budget=DEFAULT_BYTE_BUDGET):
+    """
+    Filter URLs that contain Sanskrit verses.
+
+    Each page is streamed and the download stops at the first verse marker
+    (or after byte_budget bytes), so most pages are never read in full.
+    """
     print(f"\n--- Filtering URLs from {input_file} ---")
     
     try:
@@ -74,6 +103,9 @@ def filter_urls(input_file="all_urls.csv", output_file="filtered_urls.csv"):
             urls = [row[0] for row in reader if row and row[0].strip()]
         
         filtered_urls = []
+        bytes_read = 0
+        start_time = time.time()
+        session = requests.Session()
         # Add progress bar and filter for .html URLs
         for url in tqdm(urls, desc="Filtering URLs", unit="url"):
             # Skip if not an HTML file
@@ -81,12 +113,15 @@ def filter_urls(input_file="all_urls.csv", output_file="filtered_urls.csv"):
                 continue
                 
             try:
-                response = requests.get(url, headers=HEADERS)
-                if '॥' in response.text:  # Check for verse markers
+                scan = classify_url(session, url, VERSE_MARKER, byte_budget, headers=HEADERS)
+                bytes_read += scan.bytes_read
+                if scan.matched:  # Check for verse markers
                     filtered_urls.append(url)
             except Exception as e:
                 tqdm.write(f"Error processing {url}: {str(e)}")
                 continue
+        session.close()
+        print(f"Read {bytes_read / 1024:.1f} KB of page bodies in {time.time() - start_time:.2f}s")
         
         # Save filtered URLs
         with open(output_file, 'w', newline='', encoding='utf-8') as f:
@@ -102,85 +137,68 @@ def filter_urls(input_file="all_urls.csv", output_file="filtered_urls.csv"):
         print(f"Error filtering URLs: {e}")
         return False
 
-def extract_verses_from_url(driver, url):
-    """Extract verses from a single URL."""
+def extract_verses_from_html(page_source, url):
+    """Extract verses from the HTML of a single page."""
+    return EXTRACTOR.extract_html(page_source, url)
+
+def clean_body_text(body_text):
+    """Remove the script selector, navigation and English text from a content area's text."""
+    return EXTRACTOR.clean_body_text(body_text)
+
+def extract_verses_from_text(body_text, heading, url, clean_lines=True):
+    """Split the cleaned Devanagari text of a page into verses ending in '॥ n ॥'."""
+    return EXTRACTOR.split_verses(body_text, heading, url, clean_lines)
+
+def extract_verses_from_itx(url):
+    """
+    Extract verses from the page's ITRANS (.itx) source instead of its HTML.
+
+    Falls back to the server-rendered HTML page when there is no .itx source.
+    """
     try:
-        driver.get(url)
-        WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        page_source = driver.page_source
-        soup = BeautifulSoup(page_source, 'html.parser')
-
-        # Extract Heading
-        heading_tag = soup.find('h2') or soup.find('h1') or soup.title
-        heading = heading_tag.get_text(strip=True) if heading_tag else "Unknown Heading"
-        heading = ' '.join(heading.split())
-
-        # Find main content
-        main_content = None
-        for div in soup.find_all('div'):
-            if '॥' in div.get_text():
-                main_content = div
-                break
-        
-        if not main_content:
+        heading, body_text = fetch_itx(url, headers=HEADERS, timeout=30)
+    except Exception as e:
+        print(f"  [No .itx source for {url} ({e}), reading the HTML page instead]")
+        try:
+            response = cached_get(url, headers=HEADERS, timeout=30)
+            response.raise_for_status()
+            return extract_verses_from_html(response.content.decode('utf-8', errors='replace'), url)
+        except Exception as e:
+            print(f"  [ERROR processing {url}: {type(e).__name__} - {e}]")
             return []
+    heading = ' '.join(heading.split()) or "Unknown Heading"
+    return extract_verses_from_text(body_text, heading, url)
 
-        # Extract and clean text
-        body_text = main_content.get_text(separator='\n', strip=True)
-        body_text = re.sub(r'Select script\s*\nHide\s*\nDisplaying in.*?Aksharamukha', '', body_text, flags=re.DOTALL)
-        
-        # Remove unwanted content
-        unwanted_patterns = [
-            r'Home\n.*?PRINT',
-            r'ITX\n.*?PDF',
-            r'^\s*$',
-            r'^\s*\n',
-            r'[A-Za-z]'
-        ]
-        for pattern in unwanted_patterns:
-            body_text = re.sub(pattern, '', body_text, flags=re.MULTILINE)
-
-        # Extract verses
-        verse_pattern = re.compile(r'(.*?॥\s*(\d+)\s*॥)', re.DOTALL)
-        matches = list(verse_pattern.finditer(body_text))
-        if not matches:
-            return []
+def load_rendered_page(driver, url):
+    """Load a URL in the browser, archive the rendered page and return its source."""
+    start = time.monotonic()
+    load_page(driver, url)
+    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+    page_source = driver.page_source
+    archive_page(url, page_source, 'selenium', duration=time.monotonic() - start)
+    record_page_size(url, page_source)
+    return page_source
 
-        page_verses = []
-        for match in matches:
-            full_verse = match.group(1).strip()
-            verse_number = match.group(2)
-            
-            # Clean verse text
-            verse_lines = []
-            for line in full_verse.split('\n'):
-                line = line.strip()
-                if (line and 
-                    not any(word in line.lower() for word in ['home', 'print', 'pdf', 'itx', 'select script']) and
-                    not line.isdigit() and
-                    not re.match(r'^\s*$', line) and
-                    not re.search(r'[A-Za-z]', line)):
-                    verse_lines.append(line)
-            
-            verse_text = '\n'.join(verse_lines)
-            verse_text = re.sub(r'॥\s*\d+\s*॥', '', verse_text).strip()
-            
-            if verse_text:
-                if len(page_verses) == 0 and heading in verse_text:
-                    verse_lines = [line for line in verse_text.split('\n') if heading not in line]
-                    verse_text = '\n'.join(verse_lines).strip()
-                    if not verse_text:
-                        continue
-                
-                ref = f"{heading}->{verse_number}"
-                verse_data = {
-                    "ref": ref,
-                    "verse": verse_text,
-                    "document_link": url
-                }
-                page_verses.append(verse_data)
+def extract_verses_in_browser(driver, url):
+    """
+    Load a URL and extract its verses from the heading and content text found by
+    a script inside the page, without transferring or parsing the page source.
+    """
+    heading, body_text = load_page_content(driver, url)
+    if body_text is None:
+        return []
+    return extract_verses_from_text(clean_body_text(body_text), heading, url)
 
-        return page_verses
+def extract_rendered_page(driver, url):
+    """Load a URL in the browser and extract its verses (in the page itself with BROWSER_EXTRACT=1)."""
+    if use_browser_extraction():
+        return extract_verses_in_browser(driver, url)
+    return extract_verses_from_html(load_rendered_page(driver, url), url)
+
+def extract_verses_from_url(driver, url):
+    """Extract verses from a single URL."""
+    try:
+        return extract_rendered_page(driver, url)
 
     except TimeoutException:
         print(f"  [TIMEOUT processing {url}]")
@@ -189,8 +207,65 @@ def extract_verses_from_url(driver, url):
         print(f"  [ERROR processing {url}: {type(e).__name__} - {e}]")
         return []
 
-def process_urls(input_csv_file, output_dir="output_files", batch_size=100):
-    """Process URLs in batches and save to JSON files."""
+def save_batch(batch_verses, output_dir, batch_num):
+    """Write one batch of verses to output-<batch_num>.json."""
+    output_file = os.path.join(output_dir, f"output-{batch_num}.json")
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(batch_verses, f, ensure_ascii=False, indent=2)
+    print(f"Saved batch {batch_num} with {len(batch_verses)} verses")
+
+class BatchWriter:
+    """
+    Collects (position, verses) results in any order and writes each batch as
+    soon as all of its URLs are in, numbered by input position like a serial run.
+    """
+
+    def __init__(self, total, output_dir, batch_size):
+        self.total = total
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.pending = {}
+        self.written = 0
+        self.verses = 0
+
+    def add(self, position, verses):
+        batch_num = position // self.batch_size + 1
+        batch = self.pending.setdefault(batch_num, {})
+        # None: the pool couldn't get a browser for the URL
+        batch[position] = verses or []
+        batch_len = min(self.batch_size, self.total - (batch_num - 1) * self.batch_size)
+        if len(batch) == batch_len:
+            batch_verses = [verse for pos in sorted(batch) for verse in batch[pos]]
+            if batch_verses:
+                save_batch(batch_verses, self.output_dir, batch_num)
+            self.written += 1
+            self.verses += len(batch_verses)
+            del self.pending[batch_num]
+
+def dispatch_order(urls, longest_first_order=False):
+    """(position, url) pairs in the order to hand them out: input order, or biggest page first."""
+    if longest_first_order:
+        return longest_first(urls, estimate_sizes(urls))
+    return list(enumerate(urls))
+
+def process_urls(input_csv_file, output_dir="output_files", batch_size=100, workers=1, max_pages_per_driver=50,
+                 frontier_file=None, fresh=False, source="html", batch_processes=0, fetch="browser",
+                 longest_first_order=False):
+    """
+    Process URLs in batches and save to JSON files.
+
+    With workers > 1 the URLs are spread across a pool of headless drivers
+    (see driver_pool.DriverPool); batch files are identical to a serial run.
+    With batch_processes > 0 whole batches are handed to that many worker
+    processes instead, each with its own driver (fetch="browser") or HTTP
+    session (fetch="http"); see process_batches().
+    With a frontier_file, progress is recorded per URL (see
+    crawl_frontier.CrawlFrontier) so an interrupted run resumes where it stopped.
+    With source="itx" the pages' ITRANS sources are downloaded instead and no
+    browser is started.
+    With longest_first_order the parallel modes hand out the biggest pages
+    first (see size_scheduler.py), so no single huge page is left for the end.
+    """
     print(f"\n--- Processing URLs from '{input_csv_file}' ---")
     
     # Create output directory
@@ -211,6 +286,21 @@ def process_urls(input_csv_file, output_dir="output_files", batch_size=100):
         print("No URLs found to process")
         return False
 
+    if source == "itx":
+        return process_urls_from_itx(urls_to_process, output_dir, batch_size, workers, longest_first_order)
+
+    if batch_processes > 0:
+        return process_batches(urls_to_process, output_dir, batch_size, batch_processes, fetch, max_pages_per_driver,
+                               longest_first_order=longest_first_order)
+
+    if frontier_file:
+        return process_urls_with_frontier(urls_to_process, output_dir, batch_size, workers, max_pages_per_driver,
+                                          frontier_file, fresh, longest_first_order)
+
+    if workers > 1:
+        return process_urls_with_pool(urls_to_process, output_dir, batch_size, workers, max_pages_per_driver,
+                                      longest_first_order)
+
     # Process in batches
     driver = setup_driver()
     try:
@@ -226,14 +316,10 @@ def process_urls(input_csv_file, output_dir="output_files", batch_size=100):
             for url in current_batch:
                 verses = extract_verses_from_url(driver, url)
                 batch_verses.extend(verses)
-                time.sleep(0.5)
 
             # Save batch
             if batch_verses:
-                output_file = os.path.join(output_dir, f"output-{batch_num + 1}.json")
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(batch_verses, f, ensure_ascii=False, indent=2)
-                print(f"Saved batch {batch_num + 1} with {len(batch_verses)} verses")
+                save_batch(batch_verses, output_dir, batch_num + 1)
 
         return True
 
@@ -243,6 +329,378 @@ def process_urls(input_csv_file, output_dir="output_files", batch_size=100):
     finally:
         driver.quit()
 
+def process_urls_with_pool(urls_to_process, output_dir, batch_size, workers, max_pages_per_driver,
+                           longest_first_order=False):
+    """Process URLs across a pool of headless drivers, writing each batch once all its URLs are done."""
+    print(f"Spreading {len(urls_to_process)} URLs across {workers} headless drivers "
+          f"(recycling every {max_pages_per_driver} pages)")
+
+    try:
+        order = dispatch_order(urls_to_process, longest_first_order)
+        writer = BatchWriter(len(urls_to_process), output_dir, batch_size)
+        with DriverPool(size=workers, max_pages_per_driver=max_pages_per_driver) as pool:
+            results = pool.map(extract_verses_from_url, [url for _, url in order])
+            for (position, _), verses in zip(order, results):
+                writer.add(position, verses)
+
+        return True
+
+    except Exception as e:
+        print(f"Error during processing: {e}")
+        return False
+
+def process_urls_from_itx(urls_to_process, output_dir, batch_size, workers, longest_first_order=False):
+    """Extract verses from the ITRANS sources of the URLs, writing each batch once all its URLs are done."""
+    print(f"Reading the .itx sources of {len(urls_to_process)} URLs with {workers} threads")
+    start_time = time.time()
+
+    try:
+        order = dispatch_order(urls_to_process, longest_first_order)
+        writer = BatchWriter(len(urls_to_process), output_dir, batch_size)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(extract_verses_from_itx, [url for _, url in order])
+            for (position, _), verses in zip(order, results):
+                writer.add(position, verses)
+
+        print(f"Read {len(urls_to_process)} .itx sources in {time.time() - start_time:.2f}s")
+        get_limiter().report()
+        return True
+
+    except Exception as e:
+        print(f"Error during processing: {e}")
+        return False
+
+# State of a batch worker process: its driver or HTTP session (see process_batches)
+_batch_worker = {}
+
+def init_batch_worker(fetch, max_pages_per_driver, processes=1):
+    """
+    Process pool initializer: sets up the worker's fetcher and closes it when the
+    process exits. Each of the processes gets an equal share of the per-host rate.
+    """
+    use_rate_share(processes)
+    _batch_worker.update(fetch=fetch, max_pages=max_pages_per_driver, driver=None, pages=0, session=None)
+    if fetch == "http":
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        _batch_worker['session'] = session
+    # Pool workers leave through multiprocessing's exit hooks, not atexit
+    Finalize(None, close_batch_worker, exitpriority=10)
+
+def close_batch_worker():
+    if _batch_worker.get('driver') is not None:
+        quit_driver(_batch_worker['driver'])
+        _batch_worker['driver'] = None
+    if _batch_worker.get('session') is not None:
+        _batch_worker['session'].close()
+        _batch_worker['session'] = None
+
+def batch_worker_driver():
+    """The worker's driver, restarted when it died or has loaded max_pages pages."""
+    driver = _batch_worker['driver']
+    if driver is not None and (_batch_worker['pages'] >= _batch_worker['max_pages'] or not is_driver_alive(driver)):
+        quit_driver(driver)
+        driver = None
+    if driver is None:
+        driver = setup_headless_driver()
+        _batch_worker.update(driver=driver, pages=0)
+    _batch_worker['pages'] += 1
+    return driver
+
+def extract_over_http(session, url):
+    """Fetch the served HTML of a page with requests and extract its verses; returns (ok, verses or error)."""
+    start = time.monotonic()
+    try:
+        response = cached_get(url, headers=HEADERS, timeout=30, session=session)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"  [ERROR fetching {url}: {type(e).__name__} - {e}]")
+        return False, f"{type(e).__name__}: {e}"
+    html = response.content.decode('utf-8', errors='replace')
+    if not response.from_cache:
+        archive_page(url, html, 'http', status=response.status_code, duration=time.monotonic() - start)
+        record_page_size(url, html)
+    return True, extract_verses_from_html(html, url)
+
+def process_batch(batch_num, urls, output_dir):
+    """
+    Worker process: extract one batch and write output-<batch_num>.json.
+
+    Returns:
+        dict: batch number, URL and verse counts, failed (url, error) pairs and
+              the seconds the batch took.
+    """
+    start = time.monotonic()
+    batch_verses = []
+    failures = []
+    for url in urls:
+        if _batch_worker['fetch'] == "http":
+            ok, payload = extract_over_http(_batch_worker['session'], url)
+        else:
+            try:
+                ok, payload = extract_for_frontier(batch_worker_driver(), url)
+            except Exception as e:
+                # The browser died under this page; the next URL gets a new one
+                ok, payload = False, f"browser crashed: {type(e).__name__}"
+        if ok:
+            batch_verses.extend(payload)
+        else:
+            failures.append((url, payload))
+
+    if batch_verses:
+        save_batch(batch_verses, output_dir, batch_num)
+    return {'batch': batch_num, 'urls': len(urls), 'verses': len(batch_verses), 'failures': failures,
+            'seconds': time.monotonic() - start, 'pid': os.getpid(), 'limiter': get_limiter().stats()}
+
+def process_batches(urls_to_process, output_dir, batch_size, processes, fetch="browser", max_pages_per_driver=50,
+                    failures_file="failed_urls.csv", longest_first_order=False):
+    """
+    Process whole batches in parallel worker processes.
+
+    Batches are numbered by input position exactly as in a serial run, and each
+    worker writes the output-N.json of the batches it is given, so the files are
+    the same whichever worker finished first. Failed URLs are collected per
+    batch, written to failures_file and summarised at the end.
+    The workers share one per-host rate budget: each one's limiter gets
+    1/processes of the RATE_LIMIT_* rates, and the summary reports their
+    combined rate per host.
+
+    Args:
+        urls_to_process (list): URLs in input order.
+        output_dir (str): Directory for the batch files.
+        batch_size (int): URLs per batch.
+        processes (int): Worker processes.
+        fetch (str): "browser" for a headless Chrome per worker, "http" for a
+                     requests session per worker (served HTML, no browser).
+        max_pages_per_driver (int): Pages a worker's driver loads before it is restarted.
+        failures_file (str): CSV receiving batch, URL and error of every failure.
+        longest_first_order (bool): Hand out the batches with the most page bytes first.
+    """
+    batches = [(batch_num + 1, urls_to_process[start_idx:start_idx + batch_size])
+               for batch_num, start_idx in enumerate(range(0, len(urls_to_process), batch_size))]
+    dispatch = batches
+    if longest_first_order:
+        sizes = estimate_sizes(urls_to_process)
+        dispatch = sorted(batches, key=lambda batch: -sum(sizes[url] for url in batch[1]))
+    processes = max(1, min(processes, len(batches)))
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Processing {len(batches)} batches of up to {batch_size} URLs in {processes} worker processes "
+          f"({'headless Chrome' if fetch == 'browser' else 'HTTP session'} per worker)")
+    start_time = time.time()
+
+    summaries = []
+    try:
+        with ProcessPoolExecutor(max_workers=processes, initializer=init_batch_worker,
+                                 initargs=(fetch, max_pages_per_driver, processes)) as executor:
+            futures = {executor.submit(process_batch, batch_num, urls, output_dir): batch_num
+                       for batch_num, urls in dispatch}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Processing batches", unit="batch"):
+                try:
+                    summaries.append(future.result())
+                except Exception as e:
+                    batch_num = futures[future]
+                    urls = batches[batch_num - 1][1]
+                    summaries.append({'batch': batch_num, 'urls': len(urls), 'verses': 0,
+                                      'failures': [(url, f"batch failed: {e}") for url in urls], 'seconds': 0.0})
+    except Exception as e:
+        print(f"Error during processing: {e}")
+        return False
+
+    summaries.sort(key=lambda summary: summary['batch'])
+    failures = [(summary['batch'], url, error) for summary in summaries for url, error in summary['failures']]
+    elapsed = time.time() - start_time
+    busy = sum(summary['seconds'] for summary in summaries)
+
+    print("\nBatch summary:")
+    for summary in summaries:
+        print(f"  batch {summary['batch']}: {summary['urls']} URLs, {summary['verses']} verses, "
+              f"{len(summary['failures'])} failed, {summary['seconds']:.1f}s")
+    print(f"{len(urls_to_process)} URLs in {len(batches)} batches: "
+          f"{sum(summary['verses'] for summary in summaries)} verses, {len(failures)} failed URLs")
+    print(f"Wall time {elapsed:.2f}s for {busy:.2f}s of batch work ({busy / elapsed:.1f}x parallelism)")
+    # Each worker's limiter counts from its start: keep the latest stats of every worker
+    worker_stats = {}
+    for summary in summaries:
+        if 'pid' not in summary:
+            continue
+        requests_seen = sum(stat['requests'] for stat in summary['limiter'].values())
+        latest = worker_stats.get(summary['pid'])
+        if latest is None or requests_seen >= latest[0]:
+            worker_stats[summary['pid']] = (requests_seen, summary['limiter'])
+    report_combined([stats for _, stats in worker_stats.values()])
+
+    # Rewritten on every run so a stale list never outlives the failures it describes
+    with open(failures_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Batch', 'URL', 'Error'])
+        writer.writerows(failures)
+    if failures:
+        print(f"Failed URLs written to '{failures_file}'")
+    return True
+
+def extract_for_frontier(driver, url):
+    """
+    Frontier variant of extract_verses_from_url that tells failures apart from
+    pages without verses.
+
+    Returns:
+        tuple: (True, verses) on success or (False, error message) on failure.
+        Errors from a dead browser are re-raised so the driver pool restarts it.
+    """
+    try:
+        verses = extract_rendered_page(driver, url)
+        return True, verses
+    except TimeoutException:
+        print(f"  [TIMEOUT processing {url}]")
+        return False, "timeout"
+    except Exception as e:
+        if not is_driver_alive(driver):
+            raise
+        print(f"  [ERROR processing {url}: {type(e).__name__} - {e}]")
+        return False, f"{type(e).__name__}: {e}"
+
+def process_urls_with_frontier(urls_to_process, output_dir, batch_size, workers, max_pages_per_driver,
+                               frontier_file, fresh=False, longest_first_order=False):
+    """
+    Process URLs through a persistent SQLite frontier.
+
+    Each URL moves pending -> in_flight -> done/failed and its verses are stored
+    as soon as it completes. A restarted run puts URLs left in flight back to
+    pending, skips the done ones and retries failures; the batch files are then
+    rebuilt from the store with the same numbering as a single uninterrupted run.
+    """
+    frontier = CrawlFrontier(frontier_file)
+    try:
+        if fresh:
+            frontier.reset()
+        added = frontier.seed(urls_to_process)
+        recovered = frontier.recover()
+        todo = frontier.pending()
+        if longest_first_order and todo:
+            # Results are stored per URL, so the dispatch order doesn't affect the batches
+            todo = [url for _, url in longest_first(todo, estimate_sizes(todo))]
+        counts = frontier.counts()
+        print(f"Frontier '{frontier_file}': {added} new URLs, {counts.get(DONE, 0)} already done, "
+              f"{recovered} recovered from an interrupted run, {len(todo)} to process")
+
+        def run_one(driver, url):
+            frontier.mark_in_flight(url)
+            return extract_for_frontier(driver, url)
+
+        if workers > 1:
+            # The frontier counts the attempts (max_attempts across runs), so the
+            # pool tries each URL once instead of retrying it on its own
+            pool = DriverPool(size=workers, max_pages_per_driver=max_pages_per_driver, attempts=1)
+            try:
+                results = pool.map(run_one, todo)
+                for url, result in tqdm(zip(todo, results), total=len(todo), desc="Processing URLs", unit="url"):
+                    # None means the browser crashed on the URL
+                    ok, payload = result if result else (False, "browser crashed")
+                    if ok:
+                        frontier.mark_done(url, payload)
+                    else:
+                        frontier.mark_failed(url, payload)
+            finally:
+                pool.close()
+        elif todo:
+            driver = setup_driver()
+            try:
+                for url in tqdm(todo, desc="Processing URLs", unit="url"):
+                    ok, payload = run_one(driver, url)
+                    if ok:
+                        frontier.mark_done(url, payload)
+                    else:
+                        frontier.mark_failed(url, payload)
+            finally:
+                driver.quit()
+
+        # Rebuild every batch file from the store
+        for batch_num, batch_verses in frontier.batches(batch_size):
+            if batch_verses:
+                save_batch(batch_verses, output_dir, batch_num)
+
+        get_limiter().report()
+        counts = frontier.counts()
+        print(f"Frontier summary: {counts.get(DONE, 0)} done, {counts.get(FAILED, 0)} failed, "
+              f"{counts.get(PENDING, 0)} pending")
+        return True
+
+    except Exception as e:
+        print(f"Error during processing: {e}")
+        print(f"Progress is saved in '{frontier_file}'; run again with --frontier to resume.")
+        return False
+    finally:
+        frontier.close()
+
+def reprocess_archive(archive_file, input_csv_file="filtered_urls.csv", output_dir="output_files", batch_size=100,
+                      workers=None):
+    """
+    Rebuild the batch files from archived pages instead of crawling again.
+
+    Extraction runs on the newest archived copy of every URL, spread across a
+    process pool (all cores by default). When input_csv_file exists, its URLs
+    define the batches exactly as process_urls would; otherwise every archived
+    URL is used in archive order.
+    """
+    print(f"\n--- Reprocessing pages from '{archive_file}' ---")
+    if not os.path.exists(archive_file):
+        print(f"Archive '{archive_file}' not found")
+        return False
+    os.makedirs(output_dir, exist_ok=True)
+
+    positions = None
+    if input_csv_file and os.path.exists(input_csv_file):
+        with open(input_csv_file, 'r', newline='', encoding='utf-8') as infile:
+            reader = csv.reader(infile)
+            next(reader)  # Skip header
+            urls = [row[0] for row in reader if row and row[0].strip()]
+        positions = {}
+        for position, url in enumerate(urls):
+            positions.setdefault(url, position)
+
+    workers = workers or os.cpu_count() or 1
+    start_time = time.time()
+    results = {}
+    seen = set()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+            for url, html in iter_latest_pages(archive_file):
+                if positions is None:
+                    position = len(seen)
+                elif url in positions:
+                    position = positions[url]
+                else:
+                    continue
+                seen.add(url)
+                pending[executor.submit(extract_verses_from_html, html, url)] = position
+                # Keep a bounded number of pages in flight so the archive is streamed
+                if len(pending) >= workers * 4:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results[pending.pop(future)] = future.result()
+            for future in pending:
+                results[pending[future]] = future.result()
+    except Exception as e:
+        print(f"Error during reprocessing: {e}")
+        return False
+
+    if positions is not None:
+        missing = [url for url in positions if url not in seen]
+        if missing:
+            print(f"Warning: {len(missing)} URLs from '{input_csv_file}' are not in the archive")
+
+    batches = {}
+    for position in sorted(results):
+        batches.setdefault(position // batch_size + 1, []).extend(results[position])
+    for batch_num, batch_verses in sorted(batches.items()):
+        if batch_verses:
+            save_batch(batch_verses, output_dir, batch_num)
+
+    elapsed = time.time() - start_time
+    print(f"Reprocessed {len(results)} archived pages with {workers} processes in {elapsed:.2f}s")
+    return True
+
 def combine_outputs(input_dir="output_files", output_file="output.json"):
     """Combine all batch files into a single output file."""
     print(f"\n--- Combining JSON files from '{input_dir}' ---")
@@ -275,15 +733,22 @@ def combine_outputs(input_dir="output_files", output_file="output.json"):
         print(f"Error writing to {output_file}: {e}")
         return False
 
-def main():
+def main(workers=1, max_pages_per_driver=50, frontier_file=None, fresh=False, reprocess_file=None, source="html",
+         batch_processes=0, fetch="browser", longest_first_order=False):
     """Main function to run the complete verse processing pipeline."""
     start_time = time.time()
     
     print("\n📋 Sanskrit Verse Processing Pipeline")
     print("-----------------------------------")
     
-    # Step 3: Process URLs and create batch files
-    if not process_urls("filtered_urls.csv"):
+    # Step 3: Process URLs (or the archived pages) and create batch files
+    if reprocess_file:
+        if not reprocess_archive(reprocess_file, "filtered_urls.csv"):
+            print("Pipeline stopped due to archive reprocessing failure.")
+            return
+    elif not process_urls("filtered_urls.csv", workers=workers, max_pages_per_driver=max_pages_per_driver,
+                          frontier_file=frontier_file, fresh=fresh, source=source,
+                          batch_processes=batch_processes, fetch=fetch, longest_first_order=longest_first_order):
         print("Pipeline stopped due to URL processing failure.")
         return
     
@@ -309,4 +774,42 @@ def main():
             print(f"📄 Output file size: {file_size/1024:.2f} MB")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extract verses from filtered URLs into batch JSON files.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of headless Chrome drivers to spread URLs across (default: 1, serial)")
+    parser.add_argument("--max-pages-per-driver", type=int, default=50,
+                        help="Pages a pooled driver loads before it is recycled (default: 50)")
+    parser.add_argument("--frontier", nargs="?", const="crawl_frontier.sqlite", default=None, metavar="FILE",
+                        help="Record per-URL progress in this SQLite file so an interrupted run can resume "
+                             "(default file: crawl_frontier.sqlite; off unless given)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Discard the saved frontier and start from the first URL")
+    parser.add_argument("--reprocess", nargs="?", const="page_archive.warc.gz", metavar="ARCHIVE",
+                        help="Rebuild the output from archived pages on all cores instead of crawling "
+                             "(default archive: page_archive.warc.gz)")
+    parser.add_argument("--source", choices=["html", "itx"], default="html",
+                        help="Extract from the rendered HTML pages (default) or from their ITRANS .itx sources, "
+                             "which needs no browser")
+    parser.add_argument("--batch-processes", type=int, default=0, metavar="N",
+                        help="Hand whole batches to N worker processes, each with its own driver or HTTP session "
+                             "(the frontier is not used in this mode)")
+    parser.add_argument("--fetch", choices=["browser", "http"], default="browser",
+                        help="With --batch-processes: load pages in headless Chrome (default) or fetch the served "
+                             "HTML over HTTP")
+    parser.add_argument("--extract-in-browser", action="store_true",
+                        help="Find the verse text with a script inside each Chrome page instead of transferring and "
+                             "parsing the page source (same as BROWSER_EXTRACT=1; these pages are not archived)")
+    parser.add_argument("--longest-first", action="store_true",
+                        help="Hand out the biggest pages first (sizes from earlier runs, the cache or HEAD requests) "
+                             "so parallel runs don't end waiting on one huge page")
+    parser.add_argument("--lean-browser", action="store_true",
+                        help="Start Chrome headless with images, CSS, fonts, extensions and third-party hosts "
+                             "blocked and an eager page load (same as LEAN_BROWSER=1)")
+    args = parser.parse_args()
+    # Through the environment so pooled and worker-process drivers see these too
+    if args.extract_in_browser:
+        os.environ['BROWSER_EXTRACT'] = '1'
+    if args.lean_browser:
+        os.environ['LEAN_BROWSER'] = '1'
+    main(args.workers, args.max_pages_per_driver, args.frontier, args.fresh,
+         args.reprocess, args.source, args.batch_processes, args.fetch, args.longest_first) 
\ No newline at end of file
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import glob
+import json
+import os
+import sqlite3
+import time
+import requests
+from tqdm import tqdm
+from process_verses import HEADERS
+from scrape_content import save_batch
+from stream_classifier import has_verse_marker
+from verse_extractor import SCRAPE_CONTENT as EXTRACTOR
+from page_archive import archive_page
+from size_scheduler import record_page_size
+from rate_limiter import get_limiter
+from replay_server import rewrite_url
+from url_dedupe import canonicalize_url
+
+# The recrawl must produce what filter_urls.py + scrape_content.py would: a page
+# is a verse page if its visible text has a '॥ n ॥' marker (the Selenium
+# filter's check), its verses come from scrape_content's extractor, and every
+# row of shiva_document_links.csv is kept with its own spelling and position.
+# Duplicate spellings of one page are downloaded once. Bump STATE_VERSION when
+# either rule changes so verses stored by an older run are extracted again.
+STATE_VERSION = 2
+
+def read_url_lists(csv_files):
+    """
+    Read URLs from several CSV files (header + first column).
+
+    Every row of the first file is kept as written, like filter_urls.py reads it;
+    the later files only add pages the earlier ones don't list.
+    """
+    urls = []
+    seen = set()
+    for csv_file in csv_files:
+        try:
+            with open(csv_file, 'r', newline='', encoding='utf-8') as infile:
+                reader = csv.reader(infile)
+                next(reader, None)  # Skip header
+                known = set(seen)
+                for row in reader:
+                    if not row or not row[0].strip():
+                        continue
+                    canonical_url = canonicalize_url(row[0])
+                    if canonical_url not in known:
+                        urls.append(row[0])
+                        seen.add(canonical_url)
+        except FileNotFoundError:
+            print(f"Warning: URL list '{csv_file}' not found, skipping.")
+    return urls
+
+class RecrawlState:
+    """
+    Per-URL validators and extraction results from previous runs.
+
+    Stores the ETag and Last-Modified headers of every page together with the
+    verses extracted from it, so a 304 can reuse them without a download.
+    """
+
+    def __init__(self, path="recrawl_state.sqlite"):
+        self.db = sqlite3.connect(path)
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != STATE_VERSION:
+            # Verses stored under other extraction rules must not be reused
+            self.db.execute('DROP TABLE IF EXISTS pages')
+            self.db.execute(f'PRAGMA user_version = {STATE_VERSION}')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            ' url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,'
+            ' has_verses INTEGER NOT NULL, verses TEXT NOT NULL, checked_at REAL NOT NULL)'
+        )
+        self.db.commit()
+
+    def get(self, url):
+        row = self.db.execute(
+            'SELECT etag, last_modified, has_verses, verses FROM pages WHERE url = ?', (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, has_verses, verses = row
+        return {
+            'etag': etag,
+            'last_modified': last_modified,
+            'has_verses': bool(has_verses),
+            'verses': json.loads(verses),
+        }
+
+    def put(self, url, etag, last_modified, has_verses, verses):
+        self.db.execute(
+            'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)',
+            (url, etag, last_modified, int(has_verses), json.dumps(verses, ensure_ascii=False), time.time()),
+        )
+
+    def touch(self, url):
+        self.db.execute('UPDATE pages SET checked_at = ? WHERE url = ?', (time.time(), url))
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+def conditional_fetch(session, url, entry):
+    """
+    Fetch a URL, sending If-None-Match / If-Modified-Since when validators are known.
+
+    Returns:
+        requests.Response: The response (status 304 if the page is unchanged).
+    """
+    headers = dict(HEADERS)
+    if entry:
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+    url = rewrite_url(url)
+    with get_limiter().request(url) as outcome:
+        response = session.get(url, headers=headers, timeout=30)
+        outcome.status = response.status_code
+        outcome.retry_after = response.headers.get('Retry-After')
+    return response
+
+def extract_page(html, url):
+    """
+    Classify and extract one page the way filter_urls.py and scrape_content.py do.
+
+    Returns:
+        tuple: (has_verses, verses); verses is [] for a page without any.
+    """
+    if not has_verse_marker(html):
+        return False, []
+    return True, EXTRACTOR.extract_html(html, url) or []
+
+def refresh_page(session, state, canonical_url, url, counts):
+    """
+    Revalidate or download one page and update its stored result.
+
+    Returns:
+        tuple: (has_verses, verses), or None if the page failed and nothing is known about it.
+    """
+    entry = state.get(canonical_url)
+    try:
+        response = conditional_fetch(session, url, entry)
+        if response.status_code == 304 and entry:
+            state.touch(canonical_url)
+            counts['revalidated'] += 1
+            return entry['has_verses'], entry['verses']
+        response.raise_for_status()
+    except Exception as e:
+        tqdm.write(f"Error processing {url}: {e}")
+        counts['failed'] += 1
+        # Keep the last known result rather than dropping the page
+        return (entry['has_verses'], entry['verses']) if entry else None
+
+    # sanskritdocuments.org serves UTF-8 but doesn't always say so
+    html = response.content.decode('utf-8', errors='replace')
+    archive_page(url, html, 'http', status=response.status_code,
+                 duration=response.elapsed.total_seconds())
+    record_page_size(url, html)
+    has_verses, verses = extract_page(html, url)
+    verses = [{key: value for key, value in verse.items() if key != 'document_link'} for verse in verses]
+    state.put(canonical_url, response.headers.get('ETag'), response.headers.get('Last-Modified'), has_verses, verses)
+    counts['refetched' if entry else 'new'] += 1
+    if (counts['refetched'] + counts['new']) % 50 == 0:
+        state.commit()
+    return has_verses, verses
+
+def recrawl(url_lists=("shiva_document_links.csv",), filtered_csv="filtered_urls.csv",
+            output_dir="output_files", state_file="recrawl_state.sqlite", batch_size=100):
+    """
+    Incrementally refresh the verse output using conditional requests.
+
+    Unchanged pages (304) reuse the verses stored from the previous run, changed
+    pages are downloaded and re-extracted, and unknown URLs are fetched for the
+    first time. The filtered URL list and output-N.json batches are rewritten as
+    the full pipeline would write them (see the top of this file).
+    """
+    print(f"\n--- Incremental recrawl of {', '.join(url_lists)} ---")
+    urls = read_url_lists(url_lists)
+    if not urls:
+        print("No URLs found to recrawl")
+        return False
+
+    os.makedirs(output_dir, exist_ok=True)
+    state = RecrawlState(state_file)
+    counts = {'revalidated': 0, 'refetched': 0, 'new': 0, 'failed': 0}
+    # canonical URL -> (has_verses, verses without document_link)
+    pages = {}
+    page_results = []
+    start_time = time.time()
+
+    try:
+        with requests.Session() as session:
+            for url in tqdm(urls, desc="Recrawling", unit="url"):
+                canonical_url = canonicalize_url(url)
+                if canonical_url not in pages:
+                    pages[canonical_url] = refresh_page(session, state, canonical_url, url, counts)
+                result = pages[canonical_url]
+                if result is None:
+                    continue
+                has_verses, verses = result
+                # Each row links to its own spelling, as in a full run
+                page_results.append((url, has_verses, [dict(verse, document_link=url) for verse in verses]))
+
+    finally:
+        state.close()
+
+    # Rewrite the filtered list and batches exactly as the full pipeline would
+    verse_urls = [url for url, has_verses, _ in page_results if has_verses]
+    with open(filtered_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['URL'])
+        for url in verse_urls:
+            writer.writerow([url])
+
+    verse_pages = [verses for _, has_verses, verses in page_results if has_verses]
+    total_batches = (len(verse_pages) + batch_size - 1) // batch_size
+    written = set()
+    for batch_num in range(total_batches):
+        batch_verses = []
+        for verses in verse_pages[batch_num * batch_size:(batch_num + 1) * batch_size]:
+            batch_verses.extend(verses)
+        if batch_verses:
+            save_batch(batch_verses, output_dir, "output", batch_num + 1)
+            written.add(batch_num + 1)
+    # Batches left over from a run with more verse pages would be combined too
+    stale = remove_stale_batches(output_dir, written)
+    if stale:
+        print(f"Removed {stale} stale batch files from '{output_dir}'")
+
+    duration = time.time() - start_time
+    print(f"\nRecrawl finished in {duration:.2f}s: "
+          f"{counts['revalidated']} revalidated (304), {counts['refetched']} refetched, "
+          f"{counts['new']} newly discovered, {counts['failed']} failed")
+    print(f"{len(verse_urls)} URLs contain verses, written in {total_batches} batches to '{output_dir}'")
+    return True
+
+def remove_stale_batches(output_dir, keep, prefix="output"):
+    """Deletes the output-N.json batches whose N is not in keep; returns how many were removed."""
+    removed = 0
+    for path in glob.glob(os.path.join(output_dir, f"{prefix}-*.json")):
+        batch_num = os.path.basename(path)[len(prefix) + 1:-len(".json")]
+        if batch_num.isdigit() and int(batch_num) not in keep:
+            os.remove(path)
+            removed += 1
+    return removed
+
+def load_batches(output_dir, prefix="output"):
+    """Read output-N.json batches into {batch_num: verses}."""
+    batches = {}
+    for path in glob.glob(os.path.join(output_dir, f"{prefix}-*.json")):
+        batch_num = os.path.basename(path)[len(prefix) + 1:-len(".json")]
+        if batch_num.isdigit():
+            with open(path, encoding='utf-8') as f:
+                batches[int(batch_num)] = json.load(f)
+    return batches
+
+def compare_with_full_run(full_run_dir, filtered_csv="filtered_urls.csv", output_dir="output_files"):
+    """
+    Parity check: compares the recrawl's filtered list and batches with the
+    filtered_urls.csv and output_files/ of a full pipeline run in full_run_dir.
+
+    Returns:
+        int: Number of differences found (0 means identical output).
+    """
+    def read_filtered(path):
+        with open(path, newline='', encoding='utf-8') as f:
+            return [row[0] for row in list(csv.reader(f))[1:] if row]
+
+    differ = 0
+    expected_urls = read_filtered(os.path.join(full_run_dir, "filtered_urls.csv"))
+    actual_urls = read_filtered(filtered_csv)
+    if expected_urls != actual_urls:
+        differ += 1
+        print(f"[DIFFERS] filtered URLs: full run {len(expected_urls)}, recrawl {len(actual_urls)}")
+        for url in sorted(set(expected_urls) ^ set(actual_urls)):
+            print(f"  only in {'full run' if url in expected_urls else 'recrawl'}: {url}")
+
+    expected = load_batches(os.path.join(full_run_dir, "output_files"))
+    actual = load_batches(output_dir)
+    for batch_num in sorted(set(expected) | set(actual)):
+        expected_verses, actual_verses = expected.get(batch_num), actual.get(batch_num)
+        if expected_verses == actual_verses:
+            continue
+        differ += 1
+        if expected_verses is None or actual_verses is None:
+            print(f"[DIFFERS] output-{batch_num}.json only written by the {'recrawl' if expected_verses is None else 'full run'}")
+            continue
+        mismatch = next((i for i, pair in enumerate(zip(expected_verses, actual_verses)) if pair[0] != pair[1]),
+                        min(len(expected_verses), len(actual_verses)))
+        print(f"[DIFFERS] output-{batch_num}.json: {len(expected_verses)} vs {len(actual_verses)} verses, "
+              f"first difference at verse {mismatch}")
+    print(f"Recrawl vs full run: {'identical' if not differ else f'{differ} difference(s)'}")
+    return differ
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally recrawl the shiva URL lists with conditional requests.")
+    parser.add_argument("--url-lists", nargs="+", default=["shiva_document_links.csv"],
+                        help="CSV files with the URLs to recrawl (default: shiva_document_links.csv, the list "
+                             "filter_urls.py reads; later files only add pages the first one lacks)")
+    parser.add_argument("--output-dir", default="output_files", help="Directory for output-N.json batches")
+    parser.add_argument("--state-file", default="recrawl_state.sqlite",
+                        help="SQLite file holding validators and extracted verses per URL")
+    parser.add_argument("--compare-with", metavar="DIR",
+                        help="After the recrawl, compare its output with the filtered_urls.csv and output_files/ "
+                             "of a full pipeline run in DIR and exit non-zero if they differ")
+    args = parser.parse_args()
+    if not recrawl(args.url_lists, output_dir=args.output_dir, state_file=args.state_file):
+        raise SystemExit(1)
+    if args.compare_with and compare_with_full_run(args.compare_with, output_dir=args.output_dir):
+        raise SystemExit(1)
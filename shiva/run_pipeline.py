@@ -1,16 +1,18 @@
 #!/usr/bin/env python3
+import argparse
 import os
 import subprocess
 import sys
 import time
 
-def run_script(script_name, description):
+def run_script(script_name, description, args=None):
     """
     Runs a Python script and handles its execution.
     
     Args:
         script_name (str): The name of the script to run.
         description (str): Description of what the script does.
+        args (list): Extra command-line arguments for the script.
     
     Returns:
         bool: True if the script executed successfully, False otherwise.
@@ -20,7 +22,7 @@ def run_script(script_name, description):
     print(f"{'=' * 50}")
     
     try:
-        result = subprocess.run([sys.executable, script_name], check=True)
+        result = subprocess.run([sys.executable, script_name] + (args or []), check=True)
         if result.returncode == 0:
             print(f"\n✅ {script_name} completed successfully.")
             return True
@@ -34,9 +36,15 @@ def run_script(script_name, description):
         print(f"\n❌ Error running {script_name}: {e}")
         return False
 
-def main():
+def main(incremental=False, single_fetch=False):
     """
     Main function to run the Sanskrit text scraping pipeline.
+
+    Args:
+        incremental (bool): Revalidate known pages with conditional requests
+                            instead of downloading everything again.
+        single_fetch (bool): Filter and extract in one stage that downloads
+                             every page only once.
     """
     start_time = time.time()
     
@@ -48,15 +56,31 @@ def main():
         print("Pipeline stopped due to URL scraping failure.")
         return
     
-    # Step 2: Filter URLs
-    if not run_script("filter_urls.py", "Filtering URLs that contain Sanskrit verses"):
-        print("Pipeline stopped due to URL filtering failure.")
-        return
-    
-    # Step 3: Extract content from URLs
-    if not run_script("scrape_content.py", "Extracting Sanskrit verses from filtered URLs"):
-        print("Pipeline stopped due to content extraction failure.")
+    if incremental:
+        # Steps 2 + 3: one conditional pass over the URLs filter_urls.py would check
+        url_lists = ["shiva_document_links.csv"]
+        if not run_script("recrawl.py", "Revalidating and refreshing changed pages", ["--url-lists"] + url_lists):
+            print("Pipeline stopped due to incremental recrawl failure.")
+            return
+        print("\n🎉 Incremental refresh finished successfully!")
+        print(f"⏱️ Total execution time: {time.time() - start_time:.2f} seconds")
         return
+
+    if single_fetch:
+        # Steps 2 + 3 merged: each page is fetched once, classified and extracted
+        if not run_script("classify_and_extract.py", "Filtering and extracting verses in a single fetch"):
+            print("Pipeline stopped due to classify-and-extract failure.")
+            return
+    else:
+        # Step 2: Filter URLs
+        if not run_script("filter_urls.py", "Filtering URLs that contain Sanskrit verses"):
+            print("Pipeline stopped due to URL filtering failure.")
+            return
+        
+        # Step 3: Extract content from URLs
+        if not run_script("scrape_content.py", "Extracting Sanskrit verses from filtered URLs"):
+            print("Pipeline stopped due to content extraction failure.")
+            return
     
     # Calculate total execution time
     end_time = time.time()
@@ -76,4 +100,10 @@ def main():
             print(f"📄 Output file size: {file_size/1024:.2f} MB")
     
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the Sanskrit text extraction pipeline.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only download pages that changed since the last run (ETag / Last-Modified)")
+    parser.add_argument("--single-fetch", action="store_true",
+                        help="Filter and extract in one stage that downloads every page only once")
+    args = parser.parse_args()
+    main(args.incremental, args.single_fetch) 
\ No newline at end of file
@@ -1,17 +1,126 @@
 import csv
-import re
-import time
 import json
+import time
 import os
-from bs4 import BeautifulSoup
-from selenium import webdriver
+import argparse
+import itertools
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.chrome.options import Options
+from browser_extract import load_page_content, use_browser_extraction
+from driver_pool import DriverPool, create_driver, load_page
+from page_archive import archive_page
+from size_scheduler import record_page_size
+from verse_extractor import SCRAPE_CONTENT as EXTRACTOR
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from http_cache import cached_get
+from itx_source import fetch_itx
+
+def extract_verses_from_page_source(page_source, url):
+    """
+    Extracts verses from the HTML of a single page.
+
+    Args:
+        page_source (str): HTML of the page (browser-rendered or raw HTTP body).
+        url (str): URL of the page, recorded as each verse's document_link.
+
+    Returns:
+        list: Verse dicts with 'ref', 'verse' and 'document_link', or None if the
+              page has no verse content.
+    """
+    return EXTRACTOR.extract_html(page_source, url)
+
+def clean_body_text(body_text):
+    """Removes the script selector, navigation and English text from a content area's text."""
+    return EXTRACTOR.clean_body_text(body_text)
+
+def extract_verses_from_body_text(body_text, heading, url, clean_lines=True):
+    """
+    Splits the cleaned Devanagari text of a page into verses ending in '॥ n ॥'.
+
+    Returns:
+        list: Verse dicts, or None if the text has no verse markers.
+    """
+    return EXTRACTOR.split_verses(body_text, heading, url, clean_lines)
+
+def extract_page_verses(driver, url):
+    """
+    Loads a single URL and extracts its verses.
+
+    Args:
+        driver: Selenium WebDriver instance.
+        url (str): URL of the page to extract.
+
+    Returns:
+        list: Verse dicts with 'ref', 'verse' and 'document_link', or None if the
+              page could not be processed.
+    """
+    try:
+        if use_browser_extraction():
+            # The verse container is found inside the page; only its text comes back
+            heading, body_text = load_page_content(driver, url)
+            if body_text is None:
+                print("  [Warning: No main content area found]")
+                return None
+            return extract_verses_from_body_text(clean_body_text(body_text), heading, url)
+
+        start = time.monotonic()
+        load_page(driver, url)
+        WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        page_source = driver.page_source
+        archive_page(url, page_source, 'selenium', duration=time.monotonic() - start)
+        record_page_size(url, page_source)
+        return extract_verses_from_page_source(page_source, url)
+
+    except TimeoutException:
+        print(f"  [TIMEOUT processing {url}]")
+    except Exception as e:
+        print(f"  [ERROR processing {url}: {type(e).__name__} - {e}]")
+    return None
 
-def extract_verses_to_json(input_csv_file, output_prefix="output", output_dir="output_files"):
+def extract_page_verses_from_itx(url):
+    """
+    Extracts a page's verses from its ITRANS (.itx) source, without a browser.
+
+    Falls back to the server-rendered HTML page when there is no .itx source.
+
+    Returns:
+        list: Verse dicts, or None if the page could not be processed.
+    """
+    try:
+        heading, body_text = fetch_itx(url, timeout=30)
+    except Exception as e:
+        print(f"  [No .itx source for {url} ({e}), reading the HTML page instead]")
+        try:
+            response = cached_get(url, timeout=30)
+            response.raise_for_status()
+            return extract_verses_from_page_source(response.content.decode('utf-8', errors='replace'), url)
+        except Exception as e:
+            print(f"  [ERROR processing {url}: {type(e).__name__} - {e}]")
+            return None
+    heading = ' '.join(heading.split()) or "Unknown Heading"
+    return extract_verses_from_body_text(body_text, heading, url)
+
+def setup_driver():
+    """Setup and return the Chrome WebDriver used for serial verse extraction (lean profile with LEAN_BROWSER=1)."""
+    return create_driver()
+
+def save_batch(batch_verses, output_dir, output_prefix, batch_num):
+    """Save one batch of verses to '<output_prefix>-<batch_num>.json' in the output directory."""
+    output_file = os.path.join(output_dir, f"{output_prefix}-{batch_num}.json")
+    try:
+        with open(output_file, 'w', encoding='utf-8') as outfile:
+            json.dump(batch_verses, outfile, ensure_ascii=False, indent=2)
+        print(f"Saved batch {batch_num} to '{output_file}' with {len(batch_verses)} verses")
+    except Exception as e:
+        print(f"Error saving batch {batch_num} to '{output_file}': {e}")
+
+def extract_verses_to_json(input_csv_file, output_prefix="output", output_dir="output_files", workers=1, max_pages_per_driver=50,
+                           source="html"):
     """
     Reads URLs from the filtered CSV, processes them in batches of 100,
     and saves each batch to a separate JSON file in the specified output directory.
@@ -20,6 +129,10 @@ def extract_verses_to_json(input_csv_file, output_prefix="output", output_dir="o
         input_csv_file (str): Path to the input CSV file (filtered URLs).
         output_prefix (str): Prefix for output JSON files (e.g., 'output' will generate 'output-1.json', 'output-2.json', etc.)
         output_dir (str): Directory to save output JSON files
+        workers (int): Number of headless drivers to spread URLs across; 1 keeps the single visible browser
+        max_pages_per_driver (int): Pages a pooled driver loads before it is recycled
+        source (str): 'html' to load the pages in Chrome, or 'itx' to read their
+                      ITRANS sources over plain HTTP (workers is then the number of threads)
     """
     print(f"\n--- Extracting Verses to JSON from '{input_csv_file}' --- ")
     
@@ -57,153 +170,80 @@ def extract_verses_to_json(input_csv_file, output_prefix="output", output_dir="o
 
     print(f"Found {len(urls_to_process)} URLs to process for verse extraction.")
 
-    # Verse pattern to match the full verse including the number
-    verse_pattern = re.compile(r'(.*?॥\s*(\d+)\s*॥)', re.DOTALL)
-    script_selection_pattern = re.compile(r'Select script\s*\nHide\s*\nDisplaying in.*?Aksharamukha', re.DOTALL)
-    
-    # Patterns to identify and remove unwanted content
-    unwanted_patterns = [
-        re.compile(r'Home\n.*?PRINT', re.DOTALL),  # Navigation elements
-        re.compile(r'ITX\n.*?PDF', re.DOTALL),     # Format options
-        re.compile(r'^\s*$', re.MULTILINE),        # Empty lines
-        re.compile(r'^\s*\n', re.MULTILINE),       # Lines with only whitespace
-        re.compile(r'[A-Za-z]', re.MULTILINE),     # English text
-    ]
-
-    # Setup Chrome options
-    chrome_options = Options()
-    # chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
-
-    driver = None
-    try:
-        print("Initializing WebDriver for verse extraction...")
-        driver = webdriver.Chrome(options=chrome_options)
-
-        # Process URLs in batches of 100
-        batch_size = 100
-        total_batches = (len(urls_to_process) + batch_size - 1) // batch_size
-        total_processed = 0
-
-        for batch_num in range(total_batches):
-            start_idx = batch_num * batch_size
-            end_idx = min((batch_num + 1) * batch_size, len(urls_to_process))
-            current_batch = urls_to_process[start_idx:end_idx]
-            
-            print(f"\nProcessing batch {batch_num + 1}/{total_batches} ({len(current_batch)} URLs)")
-            print(f"Processing URLs {start_idx} to {end_idx - 1}")
-
-            batch_verses = []
-            for i, url in enumerate(current_batch):
-                print(f"Processing URL {i+1}/{len(current_batch)} in batch: {url}")
-                try:
-                    driver.get(url)
-                    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-                    page_source = driver.page_source
-                    soup = BeautifulSoup(page_source, 'html.parser')
-
-                    # Extract Heading (h2 > h1 > title)
-                    heading_tag = soup.find('h2') or soup.find('h1') or soup.title
-                    heading = heading_tag.get_text(strip=True) if heading_tag else "Unknown Heading"
-                    heading = ' '.join(heading.split()) # Normalize whitespace
-
-                    # Find the main content area - look for divs with Sanskrit text
-                    main_content = None
-                    for div in soup.find_all('div'):
-                        if '॥' in div.get_text():  # Look for verse markers
-                            main_content = div
-                            break
-                    
-                    if not main_content:
-                        print("  [Warning: No main content area found]")
-                        continue
-
-                    # Extract text from main content area
-                    body_text = main_content.get_text(separator='\n', strip=True)
-                    
-                    # Remove script selection text
-                    body_text = script_selection_pattern.sub('', body_text)
-                    
-                    # Remove other unwanted content
-                    for pattern in unwanted_patterns:
-                        body_text = pattern.sub('', body_text)
-
-                    # Find verses using the marker pattern
-                    matches = list(verse_pattern.finditer(body_text))
-                    if not matches:
-                        print("  [No verse markers found in body text]")
-                        continue
-
-                    page_verses = []
-                    for match in matches:
-                        full_verse = match.group(1).strip()
-                        verse_number = match.group(2)
-                        
-                        # Clean the verse text
-                        verse_lines = []
-                        for line in full_verse.split('\n'):
-                            line = line.strip()
-                            # Skip lines that are likely navigation or unwanted content
-                            if (line and 
-                                not any(word in line.lower() for word in ['home', 'print', 'pdf', 'itx', 'select script']) and
-                                not line.isdigit() and  # Skip line numbers
-                                not re.match(r'^\s*$', line) and  # Skip empty lines
-                                not re.search(r'[A-Za-z]', line)):  # Skip lines with English text
-                                verse_lines.append(line)
-                        
-                        verse_text = '\n'.join(verse_lines)
-                        
-                        # Remove the verse number from the text
-                        verse_text = re.sub(r'॥\s*\d+\s*॥', '', verse_text).strip()
-                        
-                        if verse_text:
-                            # For the first verse, remove the heading if it's present
-                            if len(page_verses) == 0 and heading in verse_text:
-                                # Split the verse text by newlines and remove lines containing the heading
-                                verse_lines = [line for line in verse_text.split('\n') if heading not in line]
-                                verse_text = '\n'.join(verse_lines).strip()
-                                if not verse_text:  # If nothing left after removing heading
-                                    continue
-                                
-                            ref = f"{heading}.{verse_number}"
-                            verse_data = {
-                                "ref": ref,
-                                "verse": verse_text,
-                                "document_link": url
-                            }
-                            page_verses.append(verse_data)
-                            print(f"    Found Verse: {ref}")
-                        else:
-                            print(f"    Verse {verse_number} marker found, but no text extracted before it.")
-                    
-                    batch_verses.extend(page_verses)
-                    total_processed += 1
-                    time.sleep(0.5)
-
-                except TimeoutException:
-                    print(f"  [TIMEOUT processing {url}]")
-                except Exception as e:
-                    print(f"  [ERROR processing {url}: {type(e).__name__} - {e}]")
-                    continue
-
-            # Save the current batch to a separate file in the output directory
-            if batch_verses:
-                output_file = os.path.join(output_dir, f"{output_prefix}-{batch_num + 1}.json")
-                try:
-                    with open(output_file, 'w', encoding='utf-8') as outfile:
-                        json.dump(batch_verses, outfile, ensure_ascii=False, indent=2)
-                    print(f"Saved batch {batch_num + 1} to '{output_file}' with {len(batch_verses)} verses")
-                except Exception as e:
-                    print(f"Error saving batch {batch_num + 1} to '{output_file}': {e}")
+    batch_size = 100
+    total_batches = (len(urls_to_process) + batch_size - 1) // batch_size
+    total_processed = 0
 
-    except Exception as e:
-        print(f"A critical error occurred during the verse extraction process: {e}")
-    finally:
-        if driver:
-            print("Closing WebDriver...")
-            driver.quit()
+    if source == "itx" or workers > 1:
+        pool = None
+        executor = None
+        try:
+            if source == "itx":
+                print(f"Reading the .itx sources with {workers} threads...")
+                executor = ThreadPoolExecutor(max_workers=workers)
+                results = executor.map(extract_page_verses_from_itx, urls_to_process)
+            else:
+                print(f"Spreading URLs across {workers} headless drivers (recycling every {max_pages_per_driver} pages)...")
+                pool = DriverPool(size=workers, max_pages_per_driver=max_pages_per_driver)
+                results = pool.map(extract_page_verses, urls_to_process)
+            for batch_num in range(total_batches):
+                start_idx = batch_num * batch_size
+                end_idx = min((batch_num + 1) * batch_size, len(urls_to_process))
+
+                print(f"\nProcessing batch {batch_num + 1}/{total_batches} ({end_idx - start_idx} URLs)")
+                print(f"Processing URLs {start_idx} to {end_idx - 1}")
+
+                # Results arrive in input order, so the batch matches a serial run
+                batch_verses = []
+                for page_verses in itertools.islice(results, end_idx - start_idx):
+                    if page_verses is not None:
+                        batch_verses.extend(page_verses)
+                        total_processed += 1
+
+                if batch_verses:
+                    save_batch(batch_verses, output_dir, output_prefix, batch_num + 1)
+
+        except Exception as e:
+            print(f"A critical error occurred during the verse extraction process: {e}")
+        finally:
+            if pool:
+                pool.close()
+            if executor:
+                executor.shutdown()
+
+    else:
+        driver = None
+        try:
+            print("Initializing WebDriver for verse extraction...")
+            driver = setup_driver()
+
+            # Process URLs in batches of 100
+            for batch_num in range(total_batches):
+                start_idx = batch_num * batch_size
+                end_idx = min((batch_num + 1) * batch_size, len(urls_to_process))
+                current_batch = urls_to_process[start_idx:end_idx]
+                
+                print(f"\nProcessing batch {batch_num + 1}/{total_batches} ({len(current_batch)} URLs)")
+                print(f"Processing URLs {start_idx} to {end_idx - 1}")
+
+                batch_verses = []
+                for i, url in enumerate(current_batch):
+                    print(f"Processing URL {i+1}/{len(current_batch)} in batch: {url}")
+                    page_verses = extract_page_verses(driver, url)
+                    if page_verses is not None:
+                        batch_verses.extend(page_verses)
+                        total_processed += 1
+
+                # Save the current batch to a separate file in the output directory
+                if batch_verses:
+                    save_batch(batch_verses, output_dir, output_prefix, batch_num + 1)
+
+        except Exception as e:
+            print(f"A critical error occurred during the verse extraction process: {e}")
+        finally:
+            if driver:
+                print("Closing WebDriver...")
+                driver.quit()
 
     # Final summary
     print(f"\nProcessed {total_processed} URLs successfully across {total_batches} batches.")
@@ -214,6 +254,27 @@ if __name__ == "__main__":
     output_prefix = "output"  # Will generate output-1.json, output-2.json, etc.
     output_dir = "output_files"  # Directory to save output files
     
+    parser = argparse.ArgumentParser(description="Extract Sanskrit verses from filtered URLs.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of headless Chrome drivers to spread URLs across (default: 1)")
+    parser.add_argument("--max-pages-per-driver", type=int, default=50,
+                        help="Pages a pooled driver loads before it is recycled (default: 50)")
+    parser.add_argument("--source", choices=["html", "itx"], default="html",
+                        help="Load the pages in Chrome (default) or read their ITRANS .itx sources, "
+                             "which needs no browser")
+    parser.add_argument("--extract-in-browser", action="store_true",
+                        help="Find the verse text with a script inside each Chrome page instead of transferring and "
+                             "parsing the page source (same as BROWSER_EXTRACT=1; these pages are not archived)")
+    parser.add_argument("--lean-browser", action="store_true",
+                        help="Start Chrome headless with images, CSS, fonts, extensions and third-party hosts "
+                             "blocked and an eager page load (same as LEAN_BROWSER=1)")
+    args = parser.parse_args()
+    if args.extract_in_browser:
+        os.environ['BROWSER_EXTRACT'] = '1'
+    if args.lean_browser:
+        os.environ['LEAN_BROWSER'] = '1'
+
     print("--- Extracting verses from filtered URLs ---")
-    extract_verses_to_json(filtered_input_file, output_prefix, output_dir)
+    extract_verses_to_json(filtered_input_file, output_prefix, output_dir, args.workers, args.max_pages_per_driver,
+                           args.source)
     print("Verse extraction process finished.") 
\ No newline at end of file
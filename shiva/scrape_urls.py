@@ -1,110 +1,194 @@
+import argparse
 import csv
+import os
+import sys
+import time
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
-from selenium import webdriver
+import requests
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.chrome.options import Options
+from driver_pool import create_driver, load_page
+from url_dedupe import UrlDeduper
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from html_parse import parse_html
+from rate_limiter import get_limiter
+from replay_server import rewrite_url
 
 # Define a common browser User-Agent
 headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
 
-def scrape_shiva_links(url, output_csv_file):
+def extract_listing_links(page_source, url):
     """
-    Scrapes specific links from the given URL using Selenium to handle dynamic content,
-    and saves them to a CSV file.
+    Extracts the document links from a listing page.
+
+    The links are the third anchor of every 'li.devanagari' item inside
+    <ul style='list-style-type:none'>.
 
     Args:
-        url (str): The URL of the webpage to scrape.
-        output_csv_file (str): The name of the CSV file to save the links to.
+        page_source (str): HTML of the listing page.
+        url (str): URL of the listing page, used to resolve relative links.
+
+    Returns:
+        list: Canonical link URLs, each page once, or None if the page doesn't
+              contain the list.
     """
+    soup = parse_html(page_source)
+
+    # Find the specific UL tag
+    target_ul = soup.find('ul', style='list-style-type:none')
+    if not target_ul:
+        return None
+
+    # Find all list items with class="devanagari" within the target UL
+    list_items = target_ul.find_all('li', class_='devanagari')
+    if not list_items:
+        return None
+
     extracted_links = []
-    
-    # Setup Chrome options
-    chrome_options = Options()
-    # chrome_options.add_argument("--headless") # Uncomment to run Chrome in the background
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument(f"user-agent={headers['User-Agent']}")
-    
+    seen = UrlDeduper(capacity=100_000)
+    for item in list_items:
+        # Find all anchor tags within the current list item
+        anchor_tags = item.find_all('a')
+
+        # Check if there are at least 3 anchor tags
+        if len(anchor_tags) >= 3:
+            # Get the href attribute of the third anchor tag (index 2)
+            href = anchor_tags[2].get('href')
+            if href:
+                # Resolve the URL (handles both absolute and relative URLs)
+                link = seen.add(urljoin(url, href))
+                if link is not None:
+                    extracted_links.append(link)
+    return extracted_links
+
+def fetch_listing_static(url):
+    """
+    Fetches the server-rendered HTML of a listing page with a plain HTTP request.
+
+    Returns:
+        str: The page HTML, or None if the request failed.
+    """
+    fetch_url = rewrite_url(url)
+    try:
+        with get_limiter().request(fetch_url) as outcome:
+            response = requests.get(fetch_url, headers=headers, timeout=30)
+            outcome.status = response.status_code
+            outcome.retry_after = response.headers.get('Retry-After')
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"Static fetch of {url} failed: {e}")
+        return None
+    # sanskritdocuments.org serves UTF-8 but doesn't always say so
+    return response.content.decode('utf-8', errors='replace')
+
+def fetch_listing_with_browser(url):
+    """
+    Loads a listing page in Chrome and waits for the 'li.devanagari' items.
+
+    Returns:
+        str: The rendered page source, or None if the list never appeared.
+    """
     driver = None
     try:
-        # Initialize WebDriver
-        driver = webdriver.Chrome(options=chrome_options)
-        
+        # Initialize WebDriver (lean profile with LEAN_BROWSER=1)
+        driver = create_driver()
+
         # Navigate to the URL
-        driver.get(url)
+        load_page(driver, url)
 
         # Wait for the list items with class 'devanagari' to be present
         wait = WebDriverWait(driver, 20)
         wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "li.devanagari")))
 
         # Get the page source after waiting for elements
-        page_source = driver.page_source
-
-        # Parse the HTML content with BeautifulSoup
-        soup = BeautifulSoup(page_source, 'html.parser')
-
-        # Find the specific UL tag
-        target_ul = soup.find('ul', style='list-style-type:none')
-
-        if not target_ul:
-            print("Error: Could not find the target UL tag (<ul style='list-style-type:none'>)")
-            return
-
-        # Find all list items with class="devanagari" within the target UL
-        list_items = target_ul.find_all('li', class_='devanagari')
-
-        if not list_items:
-            print(f"No list items with class 'devanagari' found within the target UL on {url} after waiting.")
-            return
-
-        # Iterate through the found list items
-        for item in list_items:
-            # Find all anchor tags within the current list item
-            anchor_tags = item.find_all('a')
-
-            # Check if there are at least 3 anchor tags
-            if len(anchor_tags) >= 3:
-                # Get the href attribute of the third anchor tag (index 2)
-                third_anchor = anchor_tags[2]
-                href = third_anchor.get('href')
-
-                if href:
-                    # Resolve the URL (handles both absolute and relative URLs)
-                    full_url = urljoin(url, href)
-                    extracted_links.append(full_url)
-
-        # Write the extracted links to a CSV file
-        if extracted_links:
-            with open(output_csv_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(['URL']) # Write header
-                writer.writerows([[link] for link in extracted_links]) # Write links
-            print(f"Successfully scraped {len(extracted_links)} links and saved them to '{output_csv_file}'")
-        else:
-            print("No links found matching the criteria (3rd 'a' tag in 'li.devanagari').")
+        return driver.page_source
 
     except TimeoutException:
         print(f"Error: Timed out waiting for 'li.devanagari' elements to load on {url}")
     except Exception as e:
-        print(f"An error occurred during scraping: {e}")
+        print(f"An error occurred while loading {url} in the browser: {e}")
     finally:
         # Ensure the browser is closed even if errors occur
         if driver:
             driver.quit()
+    return None
+
+def write_links_csv(links, output_csv_file):
+    """Writes the links to a CSV file with a 'URL' header."""
+    with open(output_csv_file, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['URL']) # Write header
+        writer.writerows([[link] for link in links]) # Write links
+
+def scrape_shiva_links(url, output_csv_file, use_browser=False):
+    """
+    Scrapes specific links from the given URL and saves them to a CSV file.
+
+    The listing is server-rendered, so a plain HTTP fetch is tried first;
+    Selenium is only started when that HTML doesn't contain the list.
+
+    Args:
+        url (str): The URL of the webpage to scrape.
+        output_csv_file (str): The name of the CSV file to save the links to.
+        use_browser (bool): Skip the HTTP fast path and always use Selenium.
+    """
+    start_time = time.time()
+    extracted_links = None
+    path_used = None
+
+    if not use_browser:
+        page_source = fetch_listing_static(url)
+        if page_source is not None:
+            extracted_links = extract_listing_links(page_source, url)
+            if extracted_links is not None:
+                path_used = "static HTML"
+            else:
+                print("The server-rendered HTML has no 'li.devanagari' list, falling back to the browser.")
+
+    if extracted_links is None:
+        page_source = fetch_listing_with_browser(url)
+        if page_source is None:
+            return
+        extracted_links = extract_listing_links(page_source, url)
+        if extracted_links is None:
+            print(f"Error: Could not find the 'li.devanagari' list in <ul style='list-style-type:none'> on {url}")
+            return
+        path_used = "browser"
+
+    print(f"Discovered links via {path_used} in {time.time() - start_time:.2f}s")
+
+    # Write the extracted links to a CSV file
+    if extracted_links:
+        try:
+            write_links_csv(extracted_links, output_csv_file)
+        except Exception as e:
+            print(f"An error occurred while writing '{output_csv_file}': {e}")
+            return
+        print(f"Successfully scraped {len(extracted_links)} links and saved them to '{output_csv_file}'")
+    else:
+        print("No links found matching the criteria (3rd 'a' tag in 'li.devanagari').")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape the document links from the doc_shiva listing.")
+    parser.add_argument("--browser", action="store_true",
+                        help="Always load the listing in Chrome instead of trying a plain HTTP fetch first")
+    parser.add_argument("--lean-browser", action="store_true",
+                        help="Start Chrome headless with images, CSS, fonts, extensions and third-party hosts "
+                             "blocked and an eager page load (same as LEAN_BROWSER=1)")
+    args = parser.parse_args()
+    if args.lean_browser:
+        os.environ['LEAN_BROWSER'] = '1'
+
     target_url = "https://sanskritdocuments.org/doc_shiva/"
     initial_output_file = "shiva_document_links.csv"
-    
+
     print("--- Scraping initial links ---")
     print("Starting scraping process...")
-    print("Requires: selenium, beautifulsoup4")
-    print("Requires: WebDriver (e.g., chromedriver) installed and in PATH.")
-    scrape_shiva_links(target_url, initial_output_file)
-    print("Scraping process finished.") 
\ No newline at end of file
+    print("Requires: requests, beautifulsoup4 (selenium + chromedriver only if the browser fallback is needed)")
+    scrape_shiva_links(target_url, initial_output_file, use_browser=args.browser)
+    print("Scraping process finished.")
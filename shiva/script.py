@@ -1,9 +1,9 @@
 import csv
+import os
+import sys
 from urllib.parse import urljoin
 import re # Import regex module
-import time # Import time for delays
 import json # Import JSON module
-from bs4 import BeautifulSoup
 # Selenium imports
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -12,6 +12,10 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from driver_pool import load_page
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from html_parse import parse_html
 
 # Define a common browser User-Agent (might not be strictly needed with Selenium, but doesn't hurt)
 headers = {
@@ -46,7 +50,7 @@ def scrape_shiva_links(url, output_csv_file):
         driver = webdriver.Chrome(options=chrome_options)
         
         # Navigate to the URL
-        driver.get(url)
+        load_page(driver, url)
 
         # Wait up to 20 seconds for the list items with class 'devanagari' to be present
         wait = WebDriverWait(driver, 20)
@@ -56,7 +60,7 @@ def scrape_shiva_links(url, output_csv_file):
         page_source = driver.page_source
 
         # Parse the HTML content with BeautifulSoup
-        soup = BeautifulSoup(page_source, 'html.parser')
+        soup = parse_html(page_source)
 
         # Find the specific UL tag
         target_ul = soup.find('ul', style='list-style-type:none')
@@ -166,7 +170,7 @@ def filter_urls_by_verse_pattern(input_csv_file, output_csv_file):
         for i, url in enumerate(urls_to_check):
             print(f"Checking URL {i+1}/{len(urls_to_check)}: {url}", end=' ')
             try:
-                driver.get(url)
+                load_page(driver, url)
                 # Wait for body tag to ensure basic page load
                 WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
                 
@@ -178,8 +182,7 @@ def filter_urls_by_verse_pattern(input_csv_file, output_csv_file):
                     filtered_urls.append(url)
                 else:
                     print("[No Match]")
-                
-                time.sleep(1) # 1-second delay between requests
+
 
             except TimeoutException:
                 print(f"[TIMEOUT waiting for body on {url}]")
@@ -284,10 +287,10 @@ def extract_verses_to_json(input_csv_file, output_json_file):
         for i, url in enumerate(urls_to_process):
             print(f"Processing URL {i+1}/{len(urls_to_process)}: {url}")
             try:
-                driver.get(url)
+                load_page(driver, url)
                 WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
                 page_source = driver.page_source
-                soup = BeautifulSoup(page_source, 'html.parser')
+                soup = parse_html(page_source)
 
                 # Extract Heading (h2 > h1 > title)
                 heading_tag = soup.find('h2') or soup.find('h1') or soup.title
@@ -333,7 +336,6 @@ def extract_verses_to_json(input_csv_file, output_json_file):
                 
                 all_verses_data.extend(page_verses)
                 processed_count += 1
-                time.sleep(0.5) # Shorter delay for potentially faster pages
 
             except TimeoutException:
                 print(f"  [TIMEOUT processing {url}]")
@@ -0,0 +1,300 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import Counter
+from page_archive import iter_latest_pages
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from html_parse import default_backend, parse_html
+from http_cache import cached_get
+
+# Learned site profile for sanskritdocuments.org document pages.
+#
+# Every document page is generated from the same template, so the verse text
+# always sits at the same place in the DOM. learn_profile() looks at a sample of
+# pages once and records:
+#   - the path from the document root to the element that holds all the verse
+#     markers (the lowest common ancestor of every text containing a danda),
+#   - the template nodes inside that element (script selector, navigation,
+#     format links) whose text is the same on (nearly) every sample,
+#   - how many danda characters a page carries outside that element.
+# The profile is saved as JSON. With it, extraction walks the path straight to
+# the content node, drops the template nodes and reads its text, instead of
+# scanning every div for a danda and scrubbing the whole text line by line with
+# regexes. A page whose structure doesn't match (missing path, or verse markers
+# outside the content node) returns None and goes through the old logic.
+#
+# Environment variables:
+#   SITE_PROFILE   profile file (default: site_profile.json in the working
+#                  directory, used when it exists); set to 0 to ignore profiles
+
+DEFAULT_PROFILE_FILE = "site_profile.json"
+VERSE_MARKER = '॥'
+
+def node_path(node, root=None):
+    """
+    Returns the path from root (default: the document) down to node, one step
+    per element: {'tag', 'nth'} where nth counts same-tag siblings, plus 'id'
+    when the element has one.
+    """
+    steps = []
+    while node is not None and node is not root and node.parent is not None:
+        step = {'tag': node.name,
+                'nth': sum(1 for sibling in node.find_previous_siblings(node.name, recursive=False))}
+        if node.get('id'):
+            step['id'] = node['id']
+        steps.append(step)
+        node = node.parent
+    return steps[::-1]
+
+def follow_path(root, path):
+    """Returns the element at path below root, or None if the page doesn't have it."""
+    node = root
+    for step in path:
+        if 'id' in step:
+            node = node.find(step['tag'], id=step['id'], recursive=False)
+        else:
+            children = node.find_all(step['tag'], recursive=False, limit=step['nth'] + 1)
+            node = children[step['nth']] if len(children) > step['nth'] else None
+        if node is None:
+            return None
+    return node
+
+def describe_path(path):
+    """A node_path() as a readable selector, e.g. html > body > div#main > pre[0]."""
+    return ' > '.join(f"{step['tag']}#{step['id']}" if 'id' in step else f"{step['tag']}[{step['nth']}]"
+                      for step in path)
+
+def find_content_node(soup):
+    """
+    The element holding every verse marker of the page: the lowest common
+    ancestor of all text nodes that contain a danda, or None if there are none.
+    """
+    marked = soup.find_all(string=lambda text: VERSE_MARKER in text)
+    if not marked:
+        return None
+    common = list(marked[0].parents)
+    for text in marked[1:]:
+        ancestors = set(map(id, text.parents))
+        common = [node for node in common if id(node) in ancestors]
+    # parents run innermost first; skip the BeautifulSoup object itself
+    return next((node for node in common if node.parent is not None), None)
+
+def _element_texts(content):
+    """(relative path key, text) for every element below the content node."""
+    texts = {}
+    for element in content.find_all(True):
+        key = json.dumps(node_path(element, content), sort_keys=True)
+        texts[key] = element.get_text(separator='\n', strip=True)
+    return texts
+
+class SiteProfile:
+    """
+    Where the verse text lives on the site's pages.
+
+    Args:
+        content_path (list): node_path() steps from the document to the content node.
+        boilerplate (list): {'path', 'text'} template nodes below the content node.
+        outside_markers (int): Danda characters a page has outside the content node.
+        parser (str): Parser backend the paths were learned with.
+        samples (int): Pages the profile was learned from.
+    """
+
+    def __init__(self, content_path, boilerplate=(), outside_markers=0, parser=None, samples=0):
+        self.content_path = content_path
+        self.boilerplate = list(boilerplate)
+        self.outside_markers = outside_markers
+        self.parser = parser
+        self.samples = samples
+
+    def to_dict(self):
+        return {'content_path': self.content_path, 'boilerplate': self.boilerplate,
+                'outside_markers': self.outside_markers, 'parser': self.parser, 'samples': self.samples}
+
+    def save(self, path=DEFAULT_PROFILE_FILE):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PROFILE_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(**json.load(f))
+
+    def content_text(self, soup, page_source):
+        """
+        Returns the text of the page's content node without the template nodes
+        (as get_text(separator='\\n', strip=True)), or None when the page doesn't
+        match the profile.
+
+        Args:
+            soup (BeautifulSoup): The parsed page.
+            page_source (str): The page's HTML, used to check that no verse
+                               marker lies outside the content node.
+        """
+        content = follow_path(soup, self.content_path)
+        if content is None:
+            return None
+        removed = []
+        for node in self.boilerplate:
+            element = follow_path(content, node['path'])
+            if element is not None and element.get_text(separator='\n', strip=True) == node['text']:
+                removed.append((element, element.parent, element.parent.index(element)))
+        for element, _, _ in removed:
+            element.extract()
+        text = content.get_text(separator='\n', strip=True)
+        inside = text.count(VERSE_MARKER)
+        if inside and page_source.count(VERSE_MARKER) - inside == self.outside_markers:
+            return text
+        # Not the template: put the page back together for the full cleanup
+        for element, parent, index in reversed(removed):
+            parent.insert(index, element)
+        return None
+
+def learn_profile(pages, min_support=0.8):
+    """
+    Learns the site profile from sample pages.
+
+    Args:
+        pages (list): (url, html) pairs; pages without verse markers are ignored.
+        min_support (float): Share of the samples on which a node's text must be
+                             identical for it to count as template boilerplate.
+
+    Returns:
+        SiteProfile: The profile, or None if no sample has verse content.
+    """
+    paths = Counter()
+    outside = Counter()
+    samples = []
+    for url, html in pages:
+        soup = parse_html(html)
+        content = find_content_node(soup)
+        if content is None:
+            continue
+        path = node_path(content)
+        paths[json.dumps(path, sort_keys=True)] += 1
+        samples.append((html, soup, path))
+
+    if not samples:
+        return None
+    content_key, support = paths.most_common(1)[0]
+    content_path = json.loads(content_key)
+    print(f"Content node found at the same path on {support}/{len(samples)} sample pages: {describe_path(content_path)}")
+
+    # Template nodes: same path and same text on most pages, no verse marker
+    seen = Counter()
+    for html, soup, path in samples:
+        content = follow_path(soup, content_path)
+        if content is None:
+            continue
+        outside[html.count(VERSE_MARKER) - content.get_text().count(VERSE_MARKER)] += 1
+        for key, text in _element_texts(content).items():
+            if text and VERSE_MARKER not in text:
+                seen[(key, text)] += 1
+    boilerplate = []
+    for (key, text), count in sorted(seen.items(), key=lambda item: len(item[0][0])):
+        path = json.loads(key)
+        # Keep only the outermost template nodes
+        if count >= min_support * len(samples) and not any(
+                path[:len(node['path'])] == node['path'] for node in boilerplate):
+            boilerplate.append({'path': path, 'text': text})
+
+    outside_markers = outside.most_common(1)[0][0] if outside else 0
+    print(f"Template nodes inside the content node: {len(boilerplate)}; "
+          f"verse markers outside it: {outside_markers}")
+    return SiteProfile(content_path, boilerplate, outside_markers, default_backend(), len(samples))
+
+_profile = None
+_profile_loaded = False
+
+def get_site_profile():
+    """
+    Returns the profile from SITE_PROFILE (default: site_profile.json), or None if
+    there is no profile, profiles are disabled, or it was learned with another
+    parser backend (whose trees can differ).
+    """
+    global _profile, _profile_loaded
+    if not _profile_loaded:
+        _profile_loaded = True
+        path = os.environ.get('SITE_PROFILE', DEFAULT_PROFILE_FILE)
+        if path in ('', '0') or not os.path.exists(path):
+            return None
+        try:
+            profile = SiteProfile.load(path)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Warning: could not read site profile {path}: {e}")
+            return None
+        if profile.parser and profile.parser != default_backend():
+            print(f"Warning: site profile {path} was learned with {profile.parser}, "
+                  f"not {default_backend()}; ignoring it (learn it again)")
+            return None
+        _profile = profile
+    return _profile
+
+def sample_urls(input_csv_file, sample_size):
+    """Every n-th URL of the CSV's first column (after its header), sample_size of them."""
+    with open(input_csv_file, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None) # Skip header row
+        urls = [row[0].strip() for row in reader if row and row[0].strip()]
+    step = max(1, len(urls) // sample_size) if sample_size else 1
+    return urls[::step][:sample_size]
+
+def load_sample_pages(urls=(), archive_file=None, sample_size=30):
+    """
+    Collects (url, html) samples: the newest pages of a page archive, or the
+    served HTML of the given URLs (through the response cache).
+    """
+    pages = []
+    if archive_file:
+        for url, html in iter_latest_pages(archive_file):
+            pages.append((url, html))
+            if len(pages) >= sample_size:
+                break
+        return pages
+    for url in urls:
+        try:
+            response = cached_get(url, timeout=30)
+            response.raise_for_status()
+            pages.append((url, response.content.decode('utf-8', errors='replace')))
+        except Exception as e:
+            print(f"  [Skipping sample {url}: {type(e).__name__} - {e}]")
+    return pages
+
+if __name__ == "__main__":
+    from verse_extractor import PROCESS_VERSES
+
+    parser = argparse.ArgumentParser(description="Learn where the verse text sits on the site's pages.")
+    parser.add_argument("--input", default="filtered_urls.csv", help="CSV of page URLs to sample (default: filtered_urls.csv)")
+    parser.add_argument("--archive", default=None, help="Sample pages from this page archive instead of fetching them")
+    parser.add_argument("--sample", type=int, default=30, help="Number of sample pages (default: 30)")
+    parser.add_argument("--output", default=os.environ.get('SITE_PROFILE', DEFAULT_PROFILE_FILE),
+                        help="Profile file to write (default: SITE_PROFILE or site_profile.json)")
+    args = parser.parse_args()
+
+    urls = [] if args.archive else sample_urls(args.input, args.sample)
+    pages = load_sample_pages(urls, args.archive, args.sample)
+    print(f"Learning the site profile from {len(pages)} pages...")
+    profile = learn_profile(pages)
+    if profile is None:
+        raise SystemExit("No sample page has verse markers; nothing to learn.")
+
+    # Check the profile against the full cleanup on the samples before saving it
+    os.environ['SITE_PROFILE'] = '0'
+    agree = matched = 0
+    for url, html in pages:
+        expected = PROCESS_VERSES.extract_html(html, url)
+        verses = PROCESS_VERSES.extract_with_profile(profile, parse_html(html), html, url)
+        if verses is None:
+            continue
+        matched += 1
+        if verses == expected:
+            agree += 1
+        else:
+            print(f"  [Profile output differs from the full cleanup on {url}]")
+    print(f"Profile matches {matched}/{len(pages)} samples; same verses as the full cleanup on {agree}/{matched}")
+    if not matched or agree < matched:
+        raise SystemExit("Not saving the profile: it doesn't reproduce the full cleanup on every matched sample.")
+    profile.save(args.output)
+    print(f"Saved site profile to {args.output}")
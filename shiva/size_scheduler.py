@@ -0,0 +1,173 @@
+import heapq
+import os
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from http_cache import get_default_cache
+from rate_limiter import get_limiter
+from replay_server import rewrite_url
+
+# Longest-first scheduling for the parallel extraction paths.
+#
+# Pages range from a few verses to thousands, and in plain CSV order one huge
+# page handed out last keeps a single worker busy long after the others are
+# idle. Each URL's cost is estimated as its page size in bytes, from (in order)
+# the sizes remembered from earlier runs, the HTTP response cache, or a HEAD
+# request's Content-Length; the biggest pages are then dispatched first. The
+# extraction stages record the size of every page they actually fetch
+# (record_page_size), so later runs know it without asking the server.
+#
+# Environment variables:
+#   PAGE_SIZE_STATS   SQLite file remembering page sizes between runs
+#                     (default: page_sizes.sqlite in the working directory)
+
+DEFAULT_STATS_FILE = "page_sizes.sqlite"
+HEAD_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    # Ask for the uncompressed length, not the gzip transfer size
+    'Accept-Encoding': 'identity',
+}
+
+class PageSizeStats:
+    """
+    Page sizes (bytes of HTML) seen in earlier runs.
+
+    Args:
+        path (str): SQLite file holding the sizes.
+    """
+
+    def __init__(self, path=DEFAULT_STATS_FILE):
+        # Extraction workers in other processes write to the same file
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS page_sizes ('
+            ' url TEXT PRIMARY KEY, size INTEGER NOT NULL, source TEXT NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self._db.commit()
+
+    def get_many(self, urls):
+        """Returns {url: size} for the URLs with a remembered size."""
+        sizes = {}
+        for url in urls:
+            row = self._db.execute('SELECT size FROM page_sizes WHERE url = ?', (url,)).fetchone()
+            if row is not None:
+                sizes[url] = row[0]
+        return sizes
+
+    def put_many(self, sizes, source):
+        now = time.time()
+        self._db.executemany(
+            'INSERT OR REPLACE INTO page_sizes (url, size, source, updated_at) VALUES (?, ?, ?, ?)',
+            [(url, size, source, now) for url, size in sizes.items()],
+        )
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+def record_page_size(url, html):
+    """
+    Remembers the size of a page an extraction stage fetched, in the
+    process-wide PageSizeStats (PAGE_SIZE_STATS); errors never stop a crawl.
+    """
+    global _recorder
+    size = len(html.encode('utf-8')) if isinstance(html, str) else len(html)
+    with _recorder_lock:
+        try:
+            if _recorder is None:
+                _recorder = PageSizeStats(os.environ.get('PAGE_SIZE_STATS', DEFAULT_STATS_FILE))
+            _recorder.put_many({url: size}, 'fetch')
+        except sqlite3.Error as e:
+            print(f"  [WARNING could not record the size of {url}: {e}]")
+
+def head_size(session, url):
+    """Returns the Content-Length a HEAD request reports for the URL, or None."""
+    fetch_url = rewrite_url(url)
+    try:
+        with get_limiter().request(fetch_url) as outcome:
+            response = session.head(fetch_url, headers=HEAD_HEADERS, timeout=15, allow_redirects=True)
+            outcome.status = response.status_code
+            outcome.retry_after = response.headers.get('Retry-After')
+        length = response.headers.get('Content-Length')
+        return int(length) if response.ok and length and length.isdigit() else None
+    except requests.RequestException:
+        return None
+
+def estimate_sizes(urls, stats_file=None, use_head=True, head_workers=8):
+    """
+    Estimates the page size of every URL.
+
+    Args:
+        urls (list): URLs to estimate.
+        stats_file (str): Size store from earlier runs (default: PAGE_SIZE_STATS or page_sizes.sqlite).
+        use_head (bool): Send HEAD requests for URLs with no known size.
+        head_workers (int): Concurrent HEAD requests.
+
+    Returns:
+        dict: {url: size in bytes}. URLs whose size could not be found get the
+              median of the known sizes.
+    """
+    stats = PageSizeStats(stats_file or os.environ.get('PAGE_SIZE_STATS', DEFAULT_STATS_FILE))
+    try:
+        unique_urls = list(dict.fromkeys(urls))
+        sizes = stats.get_many(unique_urls)
+        from_stats = len(sizes)
+
+        cache = get_default_cache()
+        cached = {}
+        for url in unique_urls:
+            if url not in sizes:
+                size = cache.body_size(url)
+                if size is not None:
+                    cached[url] = size
+        sizes.update(cached)
+
+        headed = {}
+        missing = [url for url in unique_urls if url not in sizes]
+        if use_head and missing:
+            with requests.Session() as session, ThreadPoolExecutor(max_workers=head_workers) as executor:
+                for url, size in zip(missing, executor.map(lambda url: head_size(session, url), missing)):
+                    if size is not None:
+                        headed[url] = size
+            sizes.update(headed)
+
+        stats.put_many(cached, 'cache')
+        stats.put_many(headed, 'head')
+    finally:
+        stats.close()
+
+    unknown = [url for url in unique_urls if url not in sizes]
+    default = int(statistics.median(sizes.values())) if sizes else 0
+    print(f"Page sizes: {from_stats} from earlier runs, {len(cached)} from the cache, {len(headed)} from HEAD, "
+          f"{len(unknown)} unknown (assumed {default / 1024:.1f} KB)")
+    sizes.update({url: default for url in unknown})
+    return sizes
+
+def longest_first(urls, sizes):
+    """
+    Returns (position, url) pairs for the URLs, biggest page first; pages of
+    equal size keep their input order.
+    """
+    return sorted(enumerate(urls), key=lambda item: -sizes.get(item[1], 0))
+
+def balance_shards(urls, sizes, workers):
+    """
+    Splits URLs into shards of similar total size: biggest first, each onto the
+    currently lightest shard. Each shard lists its URLs biggest first.
+    """
+    shards = [[] for _ in range(workers)]
+    heap = [(0, index) for index in range(workers)]
+    for _, url in longest_first(urls, sizes):
+        load, index = heapq.heappop(heap)
+        shards[index].append(url)
+        heapq.heappush(heap, (load + sizes.get(url, 0), index))
+    return shards
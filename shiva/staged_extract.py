@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from filter_urls import USER_AGENT
+from classify_and_extract import keep_fetched_page
+from process_verses import BatchWriter, combine_outputs, dispatch_order, extract_verses_from_html
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rate_limiter import get_limiter
+from replay_server import rewrite_url
+
+# Staged extraction pipeline for process_verses.py's verse pages.
+#
+#   fetchers (asyncio)  --html queue-->  parsers (process pool)  --result queue-->  writer
+#
+# Fetching is network-bound and BeautifulSoup parsing is CPU-bound, so each
+# runs in its own stage: a handful of asyncio tasks keep requests in flight,
+# a process pool parses on every core, and a single writer assembles the batch
+# files. Both queues are bounded, so a slow stage makes the stage before it
+# wait instead of piling up pages in memory.
+
+class StageStats:
+    """Busy and blocked time of one pipeline stage, summed over its workers."""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+
+    def report(self, elapsed):
+        capacity = self.workers * elapsed or 1.0
+        print(f"  {self.name:<7} {self.workers:>3} workers  {self.items:>6} items  "
+              f"{100 * self.busy / capacity:5.1f}% busy  {100 * self.blocked / capacity:5.1f}% blocked on a full queue  "
+              f"{100 * (1 - (self.busy + self.blocked) / capacity):5.1f}% waiting for input")
+
+async def fetch_stage(session, url_queue, html_queue, stats):
+    """Fetcher task: downloads URLs and hands the HTML to the parsers."""
+    limiter = get_limiter()
+    while True:
+        item = await url_queue.get()
+        if item is None:
+            return
+        position, url = item
+        fetch_url = rewrite_url(url)
+        start = time.monotonic()
+        await limiter.wait_async(fetch_url)
+        fetch_start = time.monotonic()
+        status = retry_after = None
+        html = None
+        try:
+            async with session.get(fetch_url) as response:
+                status = response.status
+                retry_after = response.headers.get('Retry-After')
+                response.raise_for_status()
+                html = (await response.read()).decode('utf-8', errors='replace')
+        except Exception as e:
+            print(f"  [ERROR fetching {url}: {type(e).__name__} - {e}]")
+        finally:
+            limiter.record(fetch_url, time.monotonic() - fetch_start, status, retry_after)
+        if html is not None:
+            # Archiving blocks (gzip, file and SQLite writes) and must not end the run if it fails
+            try:
+                await asyncio.to_thread(keep_fetched_page, url, html, status, time.monotonic() - fetch_start)
+            except Exception as e:
+                print(f"  [WARNING could not archive {url}: {type(e).__name__} - {e}]")
+        stats.busy += time.monotonic() - start
+        stats.items += 1
+
+        start = time.monotonic()
+        await html_queue.put((position, url, html))
+        stats.blocked += time.monotonic() - start
+
+async def parse_stage(executor, html_queue, result_queue, stats):
+    """Parser slot: runs extract_verses_from_html for one page at a time in the process pool."""
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await html_queue.get()
+        if item is None:
+            return
+        position, url, html = item
+        start = time.monotonic()
+        verses = []
+        if html is not None:
+            try:
+                verses = await loop.run_in_executor(executor, extract_verses_from_html, html, url)
+            except Exception as e:
+                print(f"  [ERROR processing {url}: {type(e).__name__} - {e}]")
+        stats.busy += time.monotonic() - start
+        stats.items += 1
+
+        start = time.monotonic()
+        await result_queue.put((position, url, verses, html is None))
+        stats.blocked += time.monotonic() - start
+
+async def write_stage(writer, result_queue, stats, failed):
+    """Writer: assembles the batch files in input order."""
+    while True:
+        item = await result_queue.get()
+        if item is None:
+            return
+        position, url, verses, fetch_failed = item
+        start = time.monotonic()
+        if fetch_failed:
+            failed.append(url)
+        writer.add(position, verses)
+        stats.busy += time.monotonic() - start
+        stats.items += 1
+
+async def run_stages(urls, output_dir, batch_size, fetchers, parsers, queue_size, longest_first_order=False):
+    import aiohttp
+
+    url_queue = asyncio.Queue()
+    html_queue = asyncio.Queue(maxsize=queue_size)
+    result_queue = asyncio.Queue(maxsize=queue_size)
+    fetch_stats = StageStats('fetch', fetchers)
+    parse_stats = StageStats('parse', parsers)
+    write_stats = StageStats('write', 1)
+    writer = BatchWriter(len(urls), output_dir, batch_size)
+    failed = []
+
+    for item in dispatch_order(urls, longest_first_order):
+        url_queue.put_nowait(item)
+    for _ in range(fetchers):
+        url_queue.put_nowait(None)
+
+    connector = aiohttp.TCPConnector(limit=fetchers, limit_per_host=fetchers, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=30)
+    start_time = time.monotonic()
+    with ProcessPoolExecutor(max_workers=parsers) as executor:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={'User-Agent': USER_AGENT}) as session:
+            fetch_tasks = [asyncio.create_task(fetch_stage(session, url_queue, html_queue, fetch_stats))
+                           for _ in range(fetchers)]
+            parse_tasks = [asyncio.create_task(parse_stage(executor, html_queue, result_queue, parse_stats))
+                           for _ in range(parsers)]
+            write_task = asyncio.create_task(write_stage(writer, result_queue, write_stats, failed))
+
+            # Shut the stages down in order, each once the one before it has drained
+            await asyncio.gather(*fetch_tasks)
+            for _ in range(parsers):
+                await html_queue.put(None)
+            await asyncio.gather(*parse_tasks)
+            await result_queue.put(None)
+            await write_task
+    elapsed = time.monotonic() - start_time
+    return writer, failed, elapsed, (fetch_stats, parse_stats, write_stats)
+
+def run_staged_extraction(urls, output_dir="output_files", batch_size=100, fetchers=8, parsers=None, queue_size=None,
+                          longest_first_order=False):
+    """
+    Extracts verses from the served HTML of the URLs with the staged pipeline.
+
+    Args:
+        urls (list): Verse page URLs in input order.
+        output_dir (str): Directory for the output-N.json batch files.
+        batch_size (int): URLs per batch.
+        fetchers (int): Concurrent asyncio fetchers.
+        parsers (int): Parser processes (default: all cores).
+        queue_size (int): Capacity of each inter-stage queue (default: 2 per parser).
+        longest_first_order (bool): Fetch the biggest pages first (see size_scheduler.py).
+
+    Returns:
+        bool: True if the run completed.
+    """
+    parsers = parsers or os.cpu_count() or 1
+    queue_size = queue_size or parsers * 2
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Staged extraction of {len(urls)} URLs: {fetchers} fetchers -> queue({queue_size}) -> "
+          f"{parsers} parser processes -> queue({queue_size}) -> writer")
+
+    try:
+        writer, failed, elapsed, stages = asyncio.run(
+            run_stages(urls, output_dir, batch_size, fetchers, parsers, queue_size, longest_first_order))
+    except Exception as e:
+        print(f"Error during staged extraction: {e}")
+        return False
+
+    print(f"\nExtracted {writer.verses} verses from {len(urls)} URLs into {writer.written} batches "
+          f"in {elapsed:.2f}s ({len(urls) / elapsed:.2f} pages/sec), {len(failed)} fetches failed")
+    print("Stage utilization:")
+    for stats in stages:
+        stats.report(elapsed)
+    fetch_stats, parse_stats = stages[0], stages[1]
+    if parse_stats.busy / (parse_stats.workers * elapsed or 1.0) > 0.9 and fetch_stats.blocked > fetch_stats.busy:
+        print("Parsers are the bottleneck: add --parsers or lower --fetchers.")
+    elif fetch_stats.busy / (fetch_stats.workers * elapsed or 1.0) > 0.9:
+        print("Fetchers are the bottleneck: add --fetchers (or raise RATE_LIMIT_MAX).")
+    get_limiter().report()
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract verses with asyncio fetchers feeding a parser process pool.")
+    parser.add_argument("--input", default="filtered_urls.csv", help="CSV of verse page URLs (default: filtered_urls.csv)")
+    parser.add_argument("--output-dir", default="output_files", help="Directory for the batch files (default: output_files)")
+    parser.add_argument("--batch-size", type=int, default=100, help="URLs per batch file (default: 100)")
+    parser.add_argument("--fetchers", type=int, default=8, help="Concurrent fetchers (default: 8)")
+    parser.add_argument("--parsers", type=int, default=None, help="Parser processes (default: all cores)")
+    parser.add_argument("--queue-size", type=int, default=None,
+                        help="Capacity of each inter-stage queue (default: 2 per parser)")
+    parser.add_argument("--longest-first", action="store_true", help="Fetch the biggest pages first")
+    args = parser.parse_args()
+
+    try:
+        with open(args.input, 'r', newline='', encoding='utf-8') as infile:
+            reader = csv.reader(infile)
+            next(reader, None)  # Skip header
+            input_urls = [row[0] for row in reader if row and row[0].strip()]
+    except OSError as e:
+        raise SystemExit(f"Error reading '{args.input}': {e}")
+
+    if not run_staged_extraction(input_urls, args.output_dir, args.batch_size, args.fetchers, args.parsers,
+                                 args.queue_size, args.longest_first):
+        raise SystemExit(1)
+    combine_outputs(args.output_dir, "output.json")
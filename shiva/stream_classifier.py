@@ -0,0 +1,199 @@
+import asyncio
+import codecs
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from html_parse import parse_html
+from rate_limiter import get_limiter
+from replay_server import rewrite_url
+
+# Streaming verse-page classifier.
+#
+# Verse pages show their first "॥ n ॥" marker within the first few kilobytes,
+# so the filter stages don't need the whole body: the response is read in
+# chunks, decoded incrementally and the download stops at the first match or
+# once the byte budget is spent.
+#
+# The Selenium filter looks for the marker in the page's rendered text. A raw
+# match can sit in a script or comment, and a rendered marker can be split by
+# tags or written as entities ('&#2405;'), so with visible=True a raw match is
+# confirmed on the parsed text of what was read so far, and a body without a
+# raw match is parsed once at the end before it counts as no match. feed()
+# itself never parses: it only flags that a confirmation is due, and the caller
+# runs confirm() (in a thread, in the asyncio fetchers). After a failed
+# confirmation the next one waits until the body has doubled, so a page full of
+# raw hits in scripts costs a few parses, not one per chunk.
+
+VERSE_PATTERN = re.compile(r'॥\s*\d+\s*॥')
+DEVANAGARI_PATTERN = re.compile(r'[\u0900-\u097F]')
+SCRIPT_PATTERN = re.compile(r'<script', re.IGNORECASE)
+# Elements whose text a browser doesn't show
+HIDDEN_TAGS = ['script', 'style', 'noscript', 'template']
+CHUNK_SIZE = 4096
+DEFAULT_BYTE_BUDGET = 256 * 1024
+# Characters carried over between chunks so a marker split across them still matches
+OVERLAP = 64
+
+def visible_text(html):
+    """The text of a page's body as a browser shows it (without scripts and styles), parsed."""
+    soup = parse_html(html)
+    for element in soup(HIDDEN_TAGS):
+        element.decompose()
+    return (soup.body or soup).get_text(' ')
+
+def has_verse_marker(html, pattern=VERSE_PATTERN):
+    """True if the page's visible text has a verse marker, as the Selenium filter sees it."""
+    return pattern.search(visible_text(html)) is not None
+
+class StreamScan:
+    """
+    Incremental scan state for one response body.
+
+    Attributes:
+        matched (bool): The pattern was found.
+        bytes_read (int): Body bytes consumed before stopping.
+        truncated (bool): Reading stopped because the byte budget ran out.
+        saw_devanagari (bool): Any Devanagari text was seen.
+        saw_script (bool): A <script> tag was seen.
+        visible (bool): Match on the parsed, visible text (see the top of this
+                        file) instead of the raw HTML.
+    """
+
+    def __init__(self, pattern=VERSE_PATTERN, visible=False):
+        self.pattern = pattern
+        self.visible = visible
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.parts = []
+        self.chars_read = 0
+        self.tail = ''
+        self.raw_hit = False
+        self.confirm_due = False
+        self.next_confirm = 0
+        self.confirmed_chars = -1
+        self.matched = False
+        self.bytes_read = 0
+        self.truncated = False
+        self.saw_devanagari = False
+        self.saw_script = False
+
+    def feed(self, chunk):
+        """
+        Consume one chunk of the body; returns True once the pattern has matched.
+        With visible=True a raw match only sets confirm_due; call confirm().
+        """
+        self.bytes_read += len(chunk)
+        decoded = self.decoder.decode(chunk)
+        if self.visible:
+            self.parts.append(decoded)
+            self.chars_read += len(decoded)
+        text = self.tail + decoded
+        if not self.saw_devanagari and DEVANAGARI_PATTERN.search(text):
+            self.saw_devanagari = True
+        if not self.saw_script and SCRIPT_PATTERN.search(text):
+            self.saw_script = True
+        if self.pattern.search(text):
+            if self.visible:
+                self.raw_hit = True
+            else:
+                self.matched = True
+        if self.raw_hit and self.chars_read >= self.next_confirm:
+            self.confirm_due = True
+        self.tail = text[-OVERLAP:]
+        return self.matched
+
+    def confirm(self):
+        """Checks the parsed text of the body read so far; returns True if it has a visible match."""
+        self.raw_hit = self.confirm_due = False
+        if not self.matched and self.confirmed_chars != self.chars_read:
+            self.matched = has_verse_marker(''.join(self.parts), self.pattern)
+            self.confirmed_chars = self.chars_read
+            self.next_confirm = 2 * self.chars_read
+        return self.matched
+
+    def finish(self):
+        """Called when reading stops without a match: checks the parsed text of the body read."""
+        if self.visible:
+            self.confirm()
+        return self.matched
+
+    def needs_javascript(self):
+        """
+        Guesses whether the page needs a browser to show its verses: no
+        Devanagari at all in what was read, but scripts that could render it,
+        or (matching on visible text) Devanagari in a body cut off by the byte
+        budget before any marker, which only the whole page can settle.
+        """
+        if self.matched:
+            return False
+        return (not self.saw_devanagari and self.saw_script) or (self.visible and self.truncated and self.saw_devanagari)
+
+def classify_url(session, url, pattern=VERSE_PATTERN, byte_budget=DEFAULT_BYTE_BUDGET, headers=None, timeout=30,
+                 visible=False):
+    """
+    Streams a URL with requests and stops as soon as the pattern matches.
+
+    Args:
+        session (requests.Session): Session to fetch with.
+        url (str): URL to classify.
+        pattern (re.Pattern): Pattern marking a verse page.
+        byte_budget (int): Maximum body bytes to read before giving up.
+        visible (bool): Match on the visible text, as the Selenium filter does.
+
+    Returns:
+        StreamScan: The scan result.
+    """
+    scan = StreamScan(pattern, visible)
+    url = rewrite_url(url)
+    with get_limiter().request(url) as outcome:
+        with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+            outcome.status = response.status_code
+            outcome.retry_after = response.headers.get('Retry-After')
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if scan.feed(chunk) or (scan.confirm_due and scan.confirm()):
+                    break
+                if scan.bytes_read >= byte_budget:
+                    scan.truncated = True
+                    break
+    scan.finish()
+    return scan
+
+async def classify_url_async(session, url, pattern=VERSE_PATTERN, byte_budget=DEFAULT_BYTE_BUDGET, visible=False):
+    """
+    aiohttp counterpart of classify_url.
+
+    Args:
+        session (aiohttp.ClientSession): Session to fetch with.
+        url (str): URL to classify.
+        pattern (re.Pattern): Pattern marking a verse page.
+        byte_budget (int): Maximum body bytes to read before giving up.
+        visible (bool): Match on the visible text, as the Selenium filter does.
+
+    Returns:
+        StreamScan: The scan result.
+    """
+    scan = StreamScan(pattern, visible)
+    url = rewrite_url(url)
+    limiter = get_limiter()
+    await limiter.wait_async(url)
+    start = time.monotonic()
+    status = retry_after = None
+    try:
+        async with session.get(url) as response:
+            status = response.status
+            retry_after = response.headers.get('Retry-After')
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                # Parsing is CPU work; keep it off the event loop
+                if scan.feed(chunk) or (scan.confirm_due and await asyncio.to_thread(scan.confirm)):
+                    break
+                if scan.bytes_read >= byte_budget:
+                    scan.truncated = True
+                    break
+    finally:
+        limiter.record(url, time.monotonic() - start, status, retry_after)
+    await asyncio.to_thread(scan.finish)
+    return scan
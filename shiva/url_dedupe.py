@@ -0,0 +1,187 @@
+import hashlib
+import math
+import posixpath
+import re
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
+
+# URL canonicalization and memory-bounded "seen" checks for the crawl stages.
+#
+# canonicalize_url() maps the spellings of one document (http/https, host case,
+# default ports, fragments, tracking parameters, trailing slashes, dot
+# segments) to a single URL. UrlDeduper puts a Bloom filter in front of an exact
+# membership check: a Bloom miss proves the URL is new without touching the
+# exact store, which only has to confirm the rare "maybe seen" answers.
+
+# Hosts served over https whose www. prefix is optional
+CANONICAL_HOSTS = {'sanskritdocuments.org': 'sanskritdocuments.org', 'www.sanskritdocuments.org': 'sanskritdocuments.org'}
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# Query parameters that never change the page: these names exactly, and utm_*
+NOISE_PARAMS = {'fbclid', 'gclid', 'mc_cid', 'mc_eid'}
+NOISE_PARAM_PREFIX = 'utm_'
+# Tracking tags only on the site's own pages; elsewhere they can select content
+SITE_NOISE_PARAMS = {'ref', 'source'}
+PATH_SAFE_CHARS = "/:@!$&'()*+,;=-._~%"
+PERCENT_ESCAPE = re.compile(r'%([0-9A-Fa-f]{2})')
+UNRESERVED = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~')
+
+def _normalize_escape(match):
+    """'%7e' -> '~' for unreserved characters; every other escape (%2F, %3F, UTF-8 bytes) kept, upper-cased."""
+    char = chr(int(match.group(1), 16))
+    return char if char in UNRESERVED else '%' + match.group(1).upper()
+
+def is_noise_param(key, site=False):
+    key = key.lower()
+    return key in NOISE_PARAMS or key.startswith(NOISE_PARAM_PREFIX) or (site and key in SITE_NOISE_PARAMS)
+
+def canonicalize_url(url):
+    """
+    Returns the canonical form of a URL.
+
+    - scheme and host are lower-cased, http becomes https for the site's hosts
+      and default ports are dropped
+    - '.' / '..' segments and repeated slashes are resolved; escapes of
+      unreserved characters are decoded and the others (%2F stays %2F) only
+      upper-cased, and characters that need it are escaped
+    - on the site's hosts, where /doc_shiva and /doc_shiva/ are the same
+      listing, a trailing slash is added to extensionless paths and dropped
+      from file names; other hosts keep the slash as given
+    - the fragment and tracking parameters (utm_*, fbclid, gclid, mc_*;
+      matched by exact name, plus ref and source on the site's hosts) are
+      dropped; the remaining query parameters are sorted
+
+    Args:
+        url (str): An absolute http(s) URL.
+
+    Returns:
+        str: The canonical URL (non-http URLs are returned stripped but unchanged).
+    """
+    url = url.strip()
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ('http', 'https'):
+        return url
+
+    host = (parts.hostname or '').lower().rstrip('.')
+    if host in CANONICAL_HOSTS:
+        host = CANONICAL_HOSTS[host]
+        scheme = 'https'
+    netloc = host
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+
+    path = PERCENT_ESCAPE.sub(_normalize_escape, parts.path or '/')
+    is_directory = path.endswith('/')
+    path = posixpath.normpath(path)
+    if path.startswith('//'):
+        path = '/' + path.lstrip('/')
+    last_segment = path.rsplit('/', 1)[-1]
+    if host in CANONICAL_HOSTS.values():
+        # /doc_shiva and /doc_shiva/ are the same listing; /page.html/ is /page.html
+        if path != '/' and (is_directory or '.' not in last_segment):
+            path = path.rstrip('/') + '/'
+        if '.' in last_segment:
+            path = path.rstrip('/')
+    elif is_directory and path != '/':
+        path += '/'
+    path = quote(path, safe=PATH_SAFE_CHARS)
+
+    site = host in CANONICAL_HOSTS.values()
+    params = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+              if not is_noise_param(key, site)]
+    query = urlencode(sorted(params))
+
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter for strings.
+
+    Args:
+        capacity (int): Number of items it is sized for.
+        error_rate (float): False-positive rate at that capacity.
+    """
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def memory_bytes(self):
+        return len(self.bits)
+
+class UrlDeduper:
+    """
+    Remembers canonical URLs and tells whether a URL was seen before.
+
+    Args:
+        capacity (int): Expected number of distinct URLs (sizes the Bloom filter).
+        error_rate (float): Bloom filter false-positive rate.
+        confirm (callable): Exact check confirm(canonical_url) -> bool used when
+                            the Bloom filter says "maybe seen", e.g. a lookup in
+                            the crawl frontier's SQLite table. Defaults to an
+                            in-memory set of the URLs added.
+    """
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001, confirm=None):
+        self.bloom = BloomFilter(capacity, error_rate)
+        self._exact = set() if confirm is None else None
+        self._confirm = confirm or self._exact.__contains__
+        self.duplicates = 0
+        self.confirmations = 0
+
+    def seen(self, canonical_url):
+        """True if the canonical URL was added before."""
+        if canonical_url not in self.bloom:
+            return False
+        self.confirmations += 1
+        return self._confirm(canonical_url)
+
+    def remember(self, canonical_url):
+        """Records a canonical URL without checking it."""
+        self.bloom.add(canonical_url)
+        if self._exact is not None:
+            self._exact.add(canonical_url)
+
+    def add(self, url):
+        """
+        Canonicalizes a URL and records it.
+
+        Returns:
+            str: The canonical URL if it is new, or None if it is a duplicate.
+        """
+        canonical_url = canonicalize_url(url)
+        if self.seen(canonical_url):
+            self.duplicates += 1
+            return None
+        self.remember(canonical_url)
+        return canonical_url
+
+def dedupe_urls(urls, capacity=None):
+    """Returns the canonical form of each distinct URL, in first-seen order."""
+    deduper = UrlDeduper(capacity=max(1000, capacity or len(urls)))
+    unique = []
+    for url in urls:
+        canonical_url = deduper.add(url)
+        if canonical_url is not None:
+            unique.append(canonical_url)
+    return unique
@@ -0,0 +1,180 @@
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from site_template import get_site_profile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from html_parse import parse_html
+
+# Verse extraction for the Shiva pages, shared by process_verses.py and
+# scrape_content.py.
+#
+# A page's verse text is the first div containing a danda (or the content node
+# of a learned site profile, see site_template.py). The script selector,
+# navigation, format links and English text are cleaned out of it, and the rest
+# is split into verses ending in '॥ n ॥'. Every pattern is compiled once, here.
+#
+# Each line of a verse is kept by one classifier (keep_line): every navigation
+# keyword the scrapers used to look for ('home', 'print', 'pdf', 'itx',
+# 'select script') is Latin text, so a single search for Latin letters drops
+# those lines together with the English ones.
+
+# A verse runs from the end of the previous '॥ n ॥' marker to the end of its
+# own. Scanning for the markers is the same split as finditer() over
+# r'(.*?॥\s*(\d+)\s*॥)' with DOTALL, without that pattern retrying from every
+# character of a tail that has no marker left (quadratic on pages whose markers
+# are written '॥ १.१॥').
+VERSE_END = re.compile(r'॥\s*(\d+)\s*॥')
+VERSE_NUMBER = re.compile(r'॥\s*\d+\s*॥')
+SCRIPT_SELECTOR = re.compile(r'Select script\s*\nHide\s*\nDisplaying in.*?Aksharamukha', re.DOTALL)
+EMPTY_LINES = re.compile(r'^\s*$', re.MULTILINE)
+BLANK_LINES = re.compile(r'^\s*\n', re.MULTILINE)
+LATIN = re.compile(r'[A-Za-z]')
+VERSE_MARKER = '॥'
+
+def keep_line(line):
+    """True for a stripped verse line worth keeping: not empty, not a bare number, no Latin text."""
+    return bool(line) and not line.isdigit() and LATIN.search(line) is None
+
+def page_heading(soup):
+    """The page's heading (h2 > h1 > title), whitespace-normalized."""
+    heading_tag = soup.find('h2') or soup.find('h1') or soup.title
+    heading = heading_tag.get_text(strip=True) if heading_tag else "Unknown Heading"
+    return ' '.join(heading.split())
+
+class VerseExtractor:
+    """
+    Extracts verse dicts ({'ref', 'verse', 'document_link'}) from Shiva pages.
+
+    Args:
+        ref_separator (str): Between heading and verse number in 'ref'
+                             ('->' in process_verses.py, '.' in scrape_content.py).
+        navigation_spans_lines (bool): Remove 'Home ... PRINT' and 'ITX ... PDF'
+                                       across lines; otherwise only when the end
+                                       word is on the line after the start word.
+        missing: Returned for a page without verse content ([] or None).
+        verbose (bool): Print what was found, as scrape_content.py does.
+    """
+
+    def __init__(self, ref_separator='->', navigation_spans_lines=False, missing=(), verbose=False):
+        self.ref_separator = ref_separator
+        flags = re.DOTALL if navigation_spans_lines else re.MULTILINE
+        self.navigation = [re.compile(r'Home\n.*?PRINT', flags), re.compile(r'ITX\n.*?PDF', flags)]
+        self.missing = list(missing) if missing is not None else None
+        self.verbose = verbose
+
+    def _missing(self, message):
+        if self.verbose:
+            print(message)
+        return list(self.missing) if self.missing is not None else None
+
+    def clean_body_text(self, body_text):
+        """Removes the script selector, navigation and English text from a content area's text."""
+        body_text = SCRIPT_SELECTOR.sub('', body_text)
+        for pattern in self.navigation:
+            body_text = pattern.sub('', body_text)
+        body_text = EMPTY_LINES.sub('', body_text)
+        body_text = BLANK_LINES.sub('', body_text)
+        return LATIN.sub('', body_text)
+
+    def split_verses(self, body_text, heading, url, clean_lines=True):
+        """
+        Splits the cleaned Devanagari text of a page into verses ending in '॥ n ॥'.
+
+        Args:
+            clean_lines (bool): Drop navigation and English lines; False for text
+                                already known to have no Latin characters.
+        """
+        matches = list(VERSE_END.finditer(body_text))
+        if not matches:
+            return self._missing("  [No verse markers found in body text]")
+
+        page_verses = []
+        start = 0
+        for match in matches:
+            verse_number = match.group(1)
+            full_verse, start = body_text[start:match.end()], match.end()
+            lines = (line.strip() for line in full_verse.strip().split('\n'))
+            if clean_lines:
+                verse_lines = [line for line in lines if keep_line(line)]
+            else:
+                verse_lines = [line for line in lines if line and not line.isdigit()]
+            verse_text = VERSE_NUMBER.sub('', '\n'.join(verse_lines)).strip()
+
+            if not verse_text:
+                if self.verbose:
+                    print(f"    Verse {verse_number} marker found, but no text extracted before it.")
+                continue
+            # For the first verse, remove the heading if it's present
+            if not page_verses and heading in verse_text:
+                verse_text = '\n'.join(line for line in verse_text.split('\n') if heading not in line).strip()
+                if not verse_text:
+                    continue
+
+            ref = f"{heading}{self.ref_separator}{verse_number}"
+            page_verses.append({"ref": ref, "verse": verse_text, "document_link": url})
+            if self.verbose:
+                print(f"    Found Verse: {ref}")
+        return page_verses
+
+    def extract_text(self, body_text, heading, url):
+        """Extracts the verses from a content area's raw text (cleaned here)."""
+        return self.split_verses(self.clean_body_text(body_text), heading, url)
+
+    def extract_with_profile(self, profile, soup, page_source, url):
+        """
+        Extracts verses from the content node a site profile points to, or
+        returns None when the page doesn't match the profile. Content without
+        Latin text is split directly, without the regex cleanup.
+        """
+        body_text = profile.content_text(soup, page_source)
+        if body_text is None:
+            return None
+        if LATIN.search(body_text) is None:
+            return self.split_verses(body_text, page_heading(soup), url, clean_lines=False)
+        return self.extract_text(body_text, page_heading(soup), url)
+
+    def extract_html(self, page_source, url):
+        """Extracts the verses from the HTML of a single page."""
+        soup = parse_html(page_source)
+
+        profile = get_site_profile()
+        if profile is not None and isinstance(page_source, str):
+            verses = self.extract_with_profile(profile, soup, page_source, url)
+            if verses is not None:
+                return verses
+
+        heading = page_heading(soup)
+        main_content = next((div for div in soup.find_all('div') if VERSE_MARKER in div.get_text()), None)
+        if main_content is None:
+            return self._missing("  [Warning: No main content area found]")
+        return self.extract_text(main_content.get_text(separator='\n', strip=True), heading, url)
+
+    def extract_many(self, pages, processes=1, chunksize=8):
+        """
+        Extracts the verses of many pages.
+
+        Args:
+            pages (iterable): (url, html) pairs.
+            processes (int): Worker processes; 1 extracts in this process.
+            chunksize (int): Pages handed to a worker at a time.
+
+        Returns:
+            list: One result per page, in input order.
+        """
+        pages = list(pages)
+        urls = [url for url, _ in pages]
+        htmls = [html for _, html in pages]
+        if processes <= 1:
+            return [self.extract_html(html, url) for url, html in zip(urls, htmls)]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            return list(executor.map(self.extract_html, htmls, urls, chunksize=chunksize))
+
+# The two flavours in use: process_verses.py's and scrape_content.py's
+PROCESS_VERSES = VerseExtractor()
+SCRAPE_CONTENT = VerseExtractor(ref_separator='.', navigation_spans_lines=True, missing=None, verbose=True)
+
+def extract_many(pages, extractor=PROCESS_VERSES, processes=1):
+    """Extracts the verses of (url, html) pairs with one of the extractors; see VerseExtractor.extract_many."""
+    return extractor.extract_many(pages, processes=processes)
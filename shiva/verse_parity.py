@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import sys
+import time
+from page_archive import iter_latest_pages
+from verse_extractor import PROCESS_VERSES, SCRAPE_CONTENT
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from html_parse import load_recorded_pages, parse_html
+
+# Parity check and throughput benchmark for verse_extractor.py.
+#
+# legacy_extract() is a frozen copy of the two extractors verse_extractor.py
+# replaced (process_verses.py's, refs 'heading->n', and scrape_content.py's,
+# refs 'heading.n', whose navigation patterns span lines), kept only to compare
+# against. Every page is extracted both ways in both flavours (verses and, for
+# scrape_content, the printed messages), and its content text is also split
+# uncleaned, as .itx sources are, to exercise the line classifier.
+#
+# The legacy split takes quadratic time on long text after the last '॥ n ॥'
+# marker (pages numbering their verses '॥ १.१॥'), so leave such pages out.
+
+def legacy_clean_body_text(body_text, flavour):
+    body_text = re.sub(r'Select script\s*\nHide\s*\nDisplaying in.*?Aksharamukha', '', body_text, flags=re.DOTALL)
+    navigation_flags = re.DOTALL if flavour == 'scrape_content' else re.MULTILINE
+    for pattern in [r'Home\n.*?PRINT', r'ITX\n.*?PDF']:
+        body_text = re.sub(pattern, '', body_text, flags=navigation_flags)
+    for pattern in [r'^\s*$', r'^\s*\n', r'[A-Za-z]']:
+        body_text = re.sub(pattern, '', body_text, flags=re.MULTILINE)
+    return body_text
+
+def legacy_extract_verses_from_text(body_text, heading, url, flavour):
+    verbose = flavour == 'scrape_content'
+    verse_pattern = re.compile(r'(.*?॥\s*(\d+)\s*॥)', re.DOTALL)
+    matches = list(verse_pattern.finditer(body_text))
+    if not matches:
+        if verbose:
+            print("  [No verse markers found in body text]")
+        return None if verbose else []
+
+    page_verses = []
+    for match in matches:
+        full_verse = match.group(1).strip()
+        verse_number = match.group(2)
+        verse_lines = []
+        for line in full_verse.split('\n'):
+            line = line.strip()
+            if (line and
+                not any(word in line.lower() for word in ['home', 'print', 'pdf', 'itx', 'select script']) and
+                not line.isdigit() and
+                not re.match(r'^\s*$', line) and
+                not re.search(r'[A-Za-z]', line)):
+                verse_lines.append(line)
+        verse_text = '\n'.join(verse_lines)
+        verse_text = re.sub(r'॥\s*\d+\s*॥', '', verse_text).strip()
+        if verse_text:
+            if len(page_verses) == 0 and heading in verse_text:
+                verse_lines = [line for line in verse_text.split('\n') if heading not in line]
+                verse_text = '\n'.join(verse_lines).strip()
+                if not verse_text:
+                    continue
+            ref = f"{heading}.{verse_number}" if verbose else f"{heading}->{verse_number}"
+            page_verses.append({"ref": ref, "verse": verse_text, "document_link": url})
+            if verbose:
+                print(f"    Found Verse: {ref}")
+        elif verbose:
+            print(f"    Verse {verse_number} marker found, but no text extracted before it.")
+    return page_verses
+
+def legacy_extract(page_source, url, flavour='process_verses'):
+    """The extractor as it was in process_verses.py or scrape_content.py (flavour)."""
+    soup = parse_html(page_source)
+    heading_tag = soup.find('h2') or soup.find('h1') or soup.title
+    heading = heading_tag.get_text(strip=True) if heading_tag else "Unknown Heading"
+    heading = ' '.join(heading.split())
+    main_content = None
+    for div in soup.find_all('div'):
+        if '॥' in div.get_text():
+            main_content = div
+            break
+    if not main_content:
+        if flavour == 'scrape_content':
+            print("  [Warning: No main content area found]")
+            return None
+        return []
+    body_text = main_content.get_text(separator='\n', strip=True)
+    return legacy_extract_verses_from_text(legacy_clean_body_text(body_text, flavour), heading, url, flavour)
+
+def synthetic_pages(count, seed=0):
+    """Pages shaped like the site's, with the chrome and stray English the cleanup has to remove."""
+    rng = random.Random(seed)
+    noise = ['Home', 'PRINT', 'ITX', 'PDF', 'Select script', 'Hide', 'Displaying in Devanagari via Aksharamukha',
+             'Encoded by Someone', 'Proofread', 'home page', '१२', '42', '   ', '', 'text with ॥ but ascii']
+    pages = []
+    for number in range(count):
+        title = f"शिवस्तोत्रम् {number}"
+        lines = [title] if rng.random() < 0.5 else []
+        for verse in range(1, rng.randint(1, 60)):
+            for _ in range(rng.randint(1, 4)):
+                lines.append(rng.choice(noise) if rng.random() < 0.15 else "पदम् " * rng.randint(1, 8))
+            lines.append(f"अन्त्यपादः ॥ {verse if rng.random() < 0.9 else '१' + str(verse)} ॥")
+        chrome = "Select script\nHide\nDisplaying in Devanagari via Aksharamukha\nHome\nShiva\nPRINT\nITX\nhtml\nPDF\n"
+        body = '<br>\n'.join(lines)
+        pages.append((f"https://sanskritdocuments.org/doc_shiva/synthetic{number}.html",
+                      f"<html><head><title>{title}</title></head><body><div id='nav'>{chrome}</div>"
+                      f"<h2>{title}</h2><div class='content'><p>{body}</p></div></body></html>"))
+    return pages
+
+def check_parity(pages):
+    """
+    Compares verse_extractor with the legacy code on every page.
+
+    Returns:
+        int: Number of pages whose output differed.
+    """
+    mismatches = 0
+    for url, html in pages:
+        differs = []
+        if PROCESS_VERSES.extract_html(html, url) != legacy_extract(html, url, 'process_verses'):
+            differs.append('process_verses')
+        new_log, old_log = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(new_log):
+            new = SCRAPE_CONTENT.extract_html(html, url)
+        with contextlib.redirect_stdout(old_log):
+            old = legacy_extract(html, url, 'scrape_content')
+        if new != old or new_log.getvalue() != old_log.getvalue():
+            differs.append('scrape_content')
+        # Uncleaned content text, as .itx sources are split
+        soup = parse_html(html)
+        content = next((div for div in soup.find_all('div') if '॥' in div.get_text()), None)
+        if content is not None:
+            text = content.get_text(separator='\n', strip=True)
+            if PROCESS_VERSES.split_verses(text, 'H', url) != legacy_extract_verses_from_text(text, 'H', url, 'process_verses'):
+                differs.append('uncleaned text')
+        if differs:
+            mismatches += 1
+            print(f"  [Differs ({', '.join(differs)}): {url}]")
+    print(f"Parity: {len(pages) - mismatches}/{len(pages)} pages identical in both flavours")
+    return mismatches
+
+def benchmark(pages, repeat=3, processes=(1,)):
+    """Prints pages/sec for the legacy extractor and for extract_many with each process count."""
+    total_mb = sum(len(html.encode('utf-8')) for _, html in pages) / 1e6
+
+    def timed(run):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    legacy = timed(lambda: [legacy_extract(html, url) for url, html in pages])
+    print(f"\nThroughput over {len(pages)} pages ({total_mb:.1f} MB), best of {repeat}:")
+    print(f"  legacy process_verses      {len(pages) / legacy:8.1f} pages/s  {total_mb / legacy:6.2f} MB/s")
+    for count in processes:
+        elapsed = timed(lambda: PROCESS_VERSES.extract_many(pages, processes=count))
+        print(f"  extract_many, {count:>2} process{'es' if count > 1 else '  '} {len(pages) / elapsed:8.1f} pages/s  "
+              f"{total_mb / elapsed:6.2f} MB/s  ({legacy / elapsed:.2f}x)")
+
+    # The part the shared library changed: cleanup and splitting of the content text
+    texts = []
+    for url, html in pages:
+        soup = parse_html(html)
+        content = next((div for div in soup.find_all('div') if '॥' in div.get_text()), None)
+        if content is not None:
+            texts.append((url, content.get_text(separator='\n', strip=True)))
+    old = timed(lambda: [legacy_extract_verses_from_text(legacy_clean_body_text(text, 'process_verses'), 'H', url,
+                                                         'process_verses') for url, text in texts])
+    new = timed(lambda: [PROCESS_VERSES.extract_text(text, 'H', url) for url, text in texts])
+    print(f"  cleanup + split only: legacy {old * 1000:.1f} ms, verse_extractor {new * 1000:.1f} ms ({old / new:.2f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check verse_extractor.py against the previous extractors and time it.")
+    parser.add_argument("files", nargs="*", help="HTML files (glob patterns) to add to the corpus")
+    parser.add_argument("--archive", default=None, help="Use the pages of this page archive")
+    parser.add_argument("--cache-dir", default=None, help="Use the HTML pages of this response cache")
+    parser.add_argument("--synthetic", type=int, default=0, help="Add this many generated pages")
+    parser.add_argument("--limit", type=int, default=None, help="Use at most this many pages")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs, best one counts (default: 3)")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, os.cpu_count() or 1],
+                        help="Process counts to time extract_many with (default: 1 and all cores)")
+    args = parser.parse_args()
+
+    # The legacy code knows nothing about site profiles
+    os.environ['SITE_PROFILE'] = '0'
+    corpus = load_recorded_pages(args.cache_dir, None, args.files)
+    if args.archive:
+        corpus.extend(iter_latest_pages(args.archive))
+    corpus.extend(synthetic_pages(args.synthetic))
+    corpus = corpus[:args.limit] if args.limit else corpus
+    if not corpus:
+        raise SystemExit("No pages: pass HTML files, --archive, --cache-dir or --synthetic N.")
+
+    failed = check_parity(corpus)
+    benchmark(corpus, args.repeat, args.processes)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,335 @@
+import re
+
+# Declarative segmentation of the sutra and smriti markdown texts.
+#
+# A text is described by a spec (a dict, see segment_specs.py) instead of a
+# chain of split functions. Levels run from the outermost (prapathaka, patala,
+# adhyaya, ...) down to the verses:
+#
+#   'levels': list of dicts, outermost first, each with one of
+#       'closing'   regex that ends a unit ('इति प्रथमः प्रपाठकः', a numeral line)
+#       'opening'   regex that starts one ('अथ ... खण्डः'); text before the first
+#                   opening of a parent unit is dropped
+#       'restart'   verse number that starts a new unit, for texts whose only
+#                   division is the verse numbering starting over at '१'
+#     and optionally
+#       'number'          'sequence' (default): units counted from 1 within their
+#                         parent; 'marker': group 1 of the marker
+#       'tail'            text after the last closing of a parent unit: dropped
+#                         (default), True to keep it as one more unit, or a label
+#                         to number it with ('unknown')
+#       'first'           regex opening the first unit of every parent unit, for
+#                         sources that leave out the opening keyword there
+#       'include_marker'  the closing marker's text belongs to the unit (its
+#                         verse numbers count)
+#       'unmarked'        a parent unit without any closing of this level is
+#                         one unit, numbered 1, instead of being dropped
+#   'verses': dict with
+#       'end'        regex ending a verse, its number in group 1; the verse is
+#                    the text since the previous marker or verse
+#       'min_text'   characters a verse needs before its end marker (default 1,
+#                    0 for texts split at every marker)
+#     or
+#       'paragraph'  regex matched against each blank-line separated paragraph
+#                    (lines joined with spaces): group 1 text, group 2 number
+#     and optionally
+#       'clean'      regexes removed from every verse text, in order
+#   'ref', 'key'     ref prefix ('gobhila_grihya_sutra->...', None for none) and
+#                    the output key for it ('ref' or 'verse_number')
+#   'strip'          units start at their first non-space character (default
+#                    True); False where the old scripts matched on raw text
+#
+# Patterns may use {numeral} (Devanagari digits), {ordinal} (प्रथमः ... दशमः)
+# and {end}, the end of the enclosing unit (where its own closing or any outer
+# marker begins, or the end of the text).
+#
+# compile_spec() joins every marker and the verse end into one alternation, and
+# Segmenter.segment() walks the text once with it, keeping a counter and the
+# pending verses per level, so no level rescans the text of another. Counted
+# numbers come out in Devanagari digits, numbers taken from the text as they
+# appear, as the old scripts wrote them.
+
+PLACEHOLDERS = {
+    '{numeral}': '[०१२३४५६७८९]+',
+    '{ordinal}': '(?:प्रथमः|द्वितीयः|तृतीयः|चतुर्थः|पञ्चमः|षष्ठः|सप्तमः|अष्टमः|नवमः|दशमः)',
+}
+NON_SPACE = re.compile(r'\S')
+DEVANAGARI_DIGITS = str.maketrans('0123456789', '०१२३४५६७८९')
+
+def devanagari_number(number):
+    """An int (or digit string) in Devanagari digits, e.g. 12 -> '१२'."""
+    return str(number).translate(DEVANAGARI_DIGITS)
+
+def _expand(pattern, end):
+    for name, value in PLACEHOLDERS.items():
+        pattern = pattern.replace(name, value)
+    return pattern.replace('{end}', end)
+
+def _end_lookahead(markers):
+    """{end} for a pattern inside a unit bounded by these (expanded) marker patterns."""
+    if not markers:
+        return r'(?=\s*\Z)'
+    alternatives = '|'.join(f'(?:{marker})' for marker in markers)
+    return rf'(?=\s*(?:{alternatives})|\s*\Z)'
+
+def _any_of(markers):
+    """The markers that end a unit's text, as one pattern (None at the top level)."""
+    return re.compile('|'.join(f'(?:{marker})' for marker in markers)) if markers else None
+
+class Segmenter:
+    """A compiled spec; segment(text) returns its verse dicts."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.levels = spec.get('levels', [])
+        self.strip = spec.get('strip', True)
+        self.ref = spec.get('ref')
+        self.key = spec.get('key', 'ref')
+        verses = spec['verses']
+        self.min_text = verses.get('min_text', 1)
+        self.clean = [re.compile(pattern) for pattern in verses.get('clean', ())]
+
+        # One alternative per marker level, outermost first (so an outer marker
+        # wins over an inner one starting at the same place), then the verse end
+        alternatives = []
+        self.first_patterns = {}
+        self.bounds = {}
+        bounding = []    # expanded markers of the levels so far
+        for index, level in enumerate(self.levels):
+            marker = level.get('closing') or level.get('opening')
+            if marker is None:
+                continue
+            end = _end_lookahead(bounding)
+            marker = _expand(marker, end)
+            alternatives.append((index, marker))
+            if 'first' in level:
+                self.first_patterns[index] = re.compile(_expand(level['first'], end))
+            self.bounds[index] = _any_of(bounding)
+            bounding.append(marker)
+        if 'paragraph' in verses:
+            self.paragraph = re.compile(verses['paragraph'], re.DOTALL)
+            alternatives.append(('verse', r'\n\n'))
+        else:
+            self.paragraph = None
+            alternatives.append(('verse', _expand(verses['end'], _end_lookahead(bounding))))
+            self.bounds['verse'] = _any_of(bounding)
+        self.verse_end = re.compile(alternatives[-1][1])
+
+        # Map each alternative's wrapping group to the group holding its number
+        source = []
+        self.alternatives = {}
+        group = 1
+        for kind, pattern in alternatives:
+            source.append(f'({pattern})')
+            self.alternatives[group] = (kind, group + 1)
+            group += 1 + re.compile(pattern).groups
+        self.scanner = re.compile('|'.join(source))
+
+    def _unit_start(self, text, position):
+        """Where a unit's text begins: its first non-space character when stripping."""
+        if not self.strip:
+            return position
+        match = NON_SPACE.search(text, position)
+        return match.start() if match else len(text)
+
+    def _verse_text(self, verse_text):
+        verse_text = verse_text.strip()
+        for pattern in self.clean:
+            verse_text = pattern.sub('', verse_text).strip()
+        return verse_text
+
+    def segment(self, text, clean=True):
+        """
+        Splits a text into verses.
+
+        Args:
+            text (str): The markdown text.
+            clean (bool): Apply the spec's 'clean' patterns to the verse texts.
+
+        Returns:
+            list: {'verse', key: ref} dicts in text order.
+        """
+        levels = self.levels
+        depth = len(levels)
+        counts = [0] * depth                  # units closed so far in the current parent
+        restarts = [0] * depth                # restart counters
+        is_open = [not level.get('opening') for level in levels]
+        pending = [[] for _ in range(depth + 1)]   # pending[i + 1]: verses of the open level-i unit
+        output = pending[0]
+
+        def add_verse(verse_text, number):
+            numbers = [None] * depth
+            for index, level in enumerate(levels):
+                if 'restart' in level:
+                    if number == level['restart']:
+                        restarts[index] += 1
+                    numbers[index] = devanagari_number(restarts[index])
+            if not all(is_open[index] for index in range(depth)):
+                return  # outside any unit (before the first opening)
+            if clean and self.clean:
+                verse_text = self._verse_text(verse_text)
+            else:
+                verse_text = verse_text.strip()
+            pending[depth].append([verse_text, number, numbers])
+
+        def close(index, number):
+            """Numbers the open level-index unit and hands its verses to the parent."""
+            if number is not None:
+                for verse in pending[index + 1]:
+                    verse[2][index] = number
+            pending[index].extend(pending[index + 1])
+            pending[index + 1].clear()
+
+        def close_inner(index):
+            """Closes every unit below level index as its parent ends."""
+            for inner in range(depth - 1, index, -1):
+                level = levels[inner]
+                if 'restart' in level:
+                    close(inner, None)
+                elif level.get('opening'):
+                    if is_open[inner]:
+                        close(inner, devanagari_number(counts[inner] + 1))
+                    else:
+                        pending[inner + 1].clear()
+                    is_open[inner] = False
+                else:
+                    tail = level.get('tail', False)
+                    if tail is False and counts[inner] == 0 and level.get('unmarked'):
+                        tail = True
+                    if tail is False:
+                        pending[inner + 1].clear()
+                    else:
+                        close(inner, tail if isinstance(tail, str) else devanagari_number(counts[inner] + 1))
+                counts[inner] = 0
+                restarts[inner] = 0
+
+        found = {}
+
+        def boundary(kind, start):
+            """
+            Where the next marker of an outer level starts, at or after start: the
+            end of the text a kind's pattern may match in (None: the end of the text).
+            A pattern spanning an outer marker would run past its unit, which the
+            old scripts never saw whole.
+            """
+            pattern = self.bounds.get(kind)
+            if pattern is None:
+                return None
+            match = found.get(kind, False)
+            if match is False or (match is not None and match.start() < start):
+                match = found[kind] = pattern.search(text, start)
+            return match.start() if match is not None else None
+
+        def marker_number(index, match, group):
+            if levels[index].get('number') == 'marker':
+                return match.group(group).strip()
+            return devanagari_number(counts[index] + 1)
+
+        def scan_verses(start, end, verse_from, min_start):
+            """Verse ends inside a closing marker that belongs to its unit."""
+            while True:
+                match = self.verse_end.search(text, start, end)
+                if match is None:
+                    return
+                if match.start() < min_start:
+                    start = match.start() + 1
+                    continue
+                add_verse(text[verse_from:match.start()], match.group(1))
+                start = verse_from = match.end()
+                min_start = verse_from + self.min_text
+
+        def open_first(index, position):
+            """Opens the first unit of an 'opening' level whose source leaves out the keyword."""
+            first = self.first_patterns.get(index)
+            if first is None:
+                return position
+            start = self._unit_start(text, position)
+            limit = boundary(index, start)
+            match = first.match(text, start, len(text) if limit is None else limit)
+            if match is None:
+                return position
+            is_open[index] = True
+            return match.end()
+
+        # floors[i]: where the text of the unit a level-i marker is looked for
+        # in begins; the old scripts never saw the whitespace in front of it
+        floors = [self._unit_start(text, 0)] * depth
+        position = 0
+        for index in self.first_patterns:
+            position = open_first(index, position)
+        verse_from = position
+        min_start = self._unit_start(text, position) + self.min_text
+        while True:
+            match = self.scanner.search(text, position)
+            if match is None:
+                break
+            kind, group = self.alternatives[match.lastindex]
+            limit = boundary(kind, match.start() + 1)
+            while limit is not None and limit < match.end():
+                # Look again within the unit only
+                match = self.scanner.search(text, position, limit)
+                if match is None:
+                    break
+                kind, group = self.alternatives[match.lastindex]
+                limit = boundary(kind, match.start() + 1)
+            if match is None:
+                position = limit
+                continue
+            if kind == 'verse':
+                if self.paragraph is not None:
+                    self._add_paragraph(text[verse_from:match.start()], add_verse)
+                elif match.start() < min_start:
+                    position = match.start() + 1
+                    continue
+                else:
+                    add_verse(text[verse_from:match.start()], match.group(group))
+                position = verse_from = match.end()
+                min_start = (verse_from if self.paragraph is None else 0) + self.min_text
+                continue
+
+            index = kind
+            if match.start() < floors[index]:
+                position = match.start() + 1
+                continue
+            level = levels[index]
+            if level.get('include_marker'):
+                scan_verses(match.start(), match.end(), verse_from, min_start)
+            close_inner(index)
+            if level.get('opening'):
+                if is_open[index]:
+                    close(index, devanagari_number(counts[index] + 1))
+                    counts[index] += 1
+                else:
+                    pending[index + 1].clear()
+                is_open[index] = True
+            else:
+                close(index, marker_number(index, match, group))
+                counts[index] += 1
+            position = match.end()
+            floors[index + 1:] = [self._unit_start(text, position)] * (depth - index - 1)
+            for inner in range(index + 1, depth):
+                position = open_first(inner, position)
+            verse_from = position
+            min_start = self._unit_start(text, position) + self.min_text
+
+        if self.paragraph is not None:
+            self._add_paragraph(text[verse_from:], add_verse)
+        close_inner(-1)
+        return [{'verse': verse_text, self.key: self._ref(numbers, number)}
+                for verse_text, number, numbers in output]
+
+    def _add_paragraph(self, paragraph, add_verse):
+        lines = [line.strip() for line in paragraph.split('\n') if line.strip()]
+        if not lines:
+            return
+        match = self.paragraph.match(' '.join(lines))
+        if match:
+            add_verse(' '.join(match.group(1).split()), match.group(2))
+
+    def _ref(self, numbers, number):
+        ref = '.'.join([n for n in numbers if n is not None] + [number])
+        return f"{self.ref}->{ref}" if self.ref else ref
+
+def compile_spec(spec):
+    """Compiles a segmentation spec (see the top of this file) into a Segmenter."""
+    return Segmenter(spec)